@@ -0,0 +1,42 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("paperless-import-legacy")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--checkpoint", help="Checkpoint file (default: <directory>/.paperless-import.jsonl)")
+@click.option("--workers", default=8, type=int, help="Concurrent uploads")
+@click.option("--limit", default=0, type=int, help="Stop after this many uploads")
+@click.option("--poll-batch", default=200, type=int, help="Pending tasks that trigger a poll")
+@click.option("--poll-interval", default=10, type=float, help="Seconds between task polls")
+@click.option("--skip-failed", is_flag=True, help="Do not retry documents that failed before")
+@pass_context
+def import_legacy(context, directory, checkpoint, workers, limit, poll_batch, poll_interval, skip_failed):
+    """Upload a legacy Inoxision archive (JSON + PDF) to Paperless-ngx."""
+    import frappe
+
+    from frappe_goes_paperless.frappe_goes_paperless.legacy_import import import_legacy_archive
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        result = import_legacy_archive(
+            directory,
+            checkpoint=checkpoint,
+            workers=workers,
+            limit=limit or None,
+            poll_batch=poll_batch,
+            poll_interval=poll_interval,
+            retry_failed=not skip_failed,
+            progress=click.echo,
+        )
+        click.echo(result)
+    finally:
+        frappe.destroy()
+
+
+commands = [import_legacy]
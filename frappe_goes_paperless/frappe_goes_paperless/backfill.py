@@ -0,0 +1,273 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+from frappe.utils import cint
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+from frappe_goes_paperless.frappe_goes_paperless.fulltext import get_document_fulltext
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import (
+    EXTRACTOR_VERSION,
+    METADATA_SOURCES,
+    SOURCE_FULLTEXT,
+    SOURCE_MANUAL,
+    extract_invoice_date_from_text,
+)
+from frappe_goes_paperless.frappe_goes_paperless.progress import publish_progress
+
+DOCTYPE = "Paperless Document"
+DEFAULT_BATCH_SIZE = 1000
+MAX_PROCESSES = 8
+# kleine Batches lohnen den Start eines Prozess-Pools nicht
+POOL_THRESHOLD = 200
+# Zeilen pro UPDATE-Statement
+WRITE_CHUNK_SIZE = 500
+# von set_invoice_date gesetzte Felder
+INVOICE_DATE_FIELDS = (
+    "invoice_date",
+    "invoice_date_source",
+    "invoice_date_extracted",
+    "invoice_date_hash",
+    "invoice_date_version",
+    "invoice_date_checked",
+)
+
+
+class InvoiceDateParser:
+    """Run `extract_invoice_date_from_text` over batches of texts in a process pool.
+
+    The pool is started on the first batch that is large enough; smaller
+    batches and `processes=1` are parsed in the calling process. `parse()`
+    returns a lazy iterator, so the next batch can be read from the database
+    while the workers are still busy.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = cint(processes) or min(os.cpu_count() or 1, MAX_PROCESSES)
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+            self.executor = None
+
+    def parse(self, texts):
+        if self.processes <= 1 or len(texts) < POOL_THRESHOLD:
+            return map(extract_invoice_date_from_text, texts)
+
+        if not self.executor:
+            # "spawn": die Worker erben weder die DB-Verbindung noch frappe.local
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        chunksize = max(1, len(texts) // (self.processes * 4))
+        return self.executor.map(extract_invoice_date_from_text, texts, chunksize=chunksize)
+
+
+def extraction_is_current(doc):
+    """True if the invoice date of `doc` was extracted from its current text
+    with the current `EXTRACTOR_VERSION`."""
+    return (
+        cint(doc.get("invoice_date_version")) >= EXTRACTOR_VERSION
+        and (doc.get("invoice_date_hash") or "") == (doc.get("fulltext_hash") or "")
+    )
+
+
+def invoice_date_outdated(doc, resolved=None):
+    """True if `set_invoice_date` would change the invoice date of `doc`."""
+    if resolved:
+        parsed, source = resolved
+        return str(parsed) != str(doc.get("invoice_date_extracted") or "") or doc.get(
+            "invoice_date_source"
+        ) not in (source, SOURCE_MANUAL)
+    # Custom Field / created entfallen -> wieder aus dem Text
+    return doc.get("invoice_date_source") in METADATA_SOURCES or not extraction_is_current(doc)
+
+
+def set_invoice_date(doc, content, resolved=None, force=False):
+    """Resolve the invoice date of a Paperless Document.
+
+    `resolved` is the `(date, source)` found in the Paperless metadata (see
+    `SyncLookups.invoice_date_metadata`); without it the date is extracted
+    from `content`, unless the text and the extractor version did not change
+    since the last extraction (`set_fulltext` has to be called first) and
+    `force` is not set. A date that differs from the last resolved one was
+    entered by hand and is kept, also with `force`. Returns True if the date
+    was resolved again.
+    """
+    if not force and not invoice_date_outdated(doc, resolved):
+        return False
+    if resolved:
+        parsed, source = resolved
+    else:
+        parsed, source = extract_invoice_date_from_text(content or ""), SOURCE_FULLTEXT
+    if not doc.invoice_date or str(doc.invoice_date) == str(doc.invoice_date_extracted or ""):
+        doc.invoice_date = parsed
+        doc.invoice_date_source = source if parsed else None
+    doc.invoice_date_extracted = parsed
+    doc.invoice_date_hash = doc.fulltext_hash
+    doc.invoice_date_version = EXTRACTOR_VERSION
+    doc.invoice_date_checked = 1
+    doc.flags.invoice_date_resolved = True
+    return True
+
+
+def iter_backfill_batches(batch_size=DEFAULT_BATCH_SIZE, limit=None):
+    """Yield batches of documents whose invoice date has to be extracted.
+
+    These are documents that were never checked, whose fulltext changed since
+    the last extraction or that were checked with an older `EXTRACTOR_VERSION`.
+    Dates taken from the Paperless metadata or entered by hand are left alone.
+    Rows are read in primary key order from a cursor, so each row is read
+    once per run even before the previous batch has been written back.
+    """
+    after = ""
+    remaining = cint(limit) or None
+    while remaining is None or remaining > 0:
+        page_length = batch_size if remaining is None else min(batch_size, remaining)
+        rows = frappe.db.sql(
+            """
+            select name, paperless_document_id, document_fulltext, fulltext_complete, fulltext_hash
+            from `tabPaperless Document`
+            where name > %(after)s
+                and coalesce(invoice_date_source, '') in ('', %(fulltext)s)
+                and (
+                    invoice_date_version < %(version)s
+                    or coalesce(invoice_date_hash, '') != coalesce(fulltext_hash, '')
+                )
+            order by name asc
+            limit %(page_length)s
+            """,
+            {
+                "after": after,
+                "fulltext": SOURCE_FULLTEXT,
+                "version": EXTRACTOR_VERSION,
+                "page_length": page_length,
+            },
+            as_dict=True,
+        )
+        if not rows:
+            return
+        yield rows
+
+        if len(rows) < page_length:
+            return
+        after = rows[-1].name
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def write_invoice_dates(results):
+    """Write `(name, fulltext_hash, invoice_date or None)` back in set-based UPDATEs.
+
+    Every row is stored with the hash of the parsed text and the current
+    `EXTRACTOR_VERSION`, so it is only read again when one of them changes.
+    An invoice_date that differs from the last extracted one (entered by hand)
+    is kept. `modified` is not touched.
+    """
+    for start in range(0, len(results), WRITE_CHUNK_SIZE):
+        chunk = results[start: start + WRITE_CHUNK_SIZE]
+        values = {
+            "names": tuple(name for name, _hash, _parsed in chunk),
+            "version": EXTRACTOR_VERSION,
+            "fulltext": SOURCE_FULLTEXT,
+        }
+        date_cases = []
+        source_cases = []
+        hash_cases = []
+        for i, (name, text_hash, parsed) in enumerate(chunk):
+            values[f"name_{i}"] = name
+            values[f"hash_{i}"] = text_hash
+            hash_cases.append(f"when %(name_{i})s then %(hash_{i})s")
+            if parsed:
+                values[f"date_{i}"] = parsed
+                date_cases.append(f"when %(name_{i})s then %(date_{i})s")
+                source_cases.append(f"when %(name_{i})s then %(fulltext)s")
+
+        extracted = f"case name {' '.join(date_cases)} end" if date_cases else "null"
+        source = f"case name {' '.join(source_cases)} end" if source_cases else "null"
+        # Die SET-Ausdruecke lesen keine Spalten (MariaDB wertet SET von links
+        # nach rechts aus, Postgres mit den alten Werten), die Bedingung fuer
+        # von Hand gesetzte Daten steht im WHERE. Deshalb zuerst das Datum,
+        # dann invoice_date_extracted.
+        frappe.db.sql(
+            f"""
+            update `tabPaperless Document`
+            set invoice_date = {extracted}, invoice_date_source = {source}
+            where name in %(names)s
+                and (invoice_date is null or invoice_date = invoice_date_extracted)
+            """,
+            values,
+        )
+        frappe.db.sql(
+            f"""
+            update `tabPaperless Document`
+            set invoice_date_extracted = {extracted},
+                invoice_date_hash = case name {' '.join(hash_cases)} end,
+                invoice_date_version = %(version)s,
+                invoice_date_checked = 1
+            where name in %(names)s
+            """,
+            values,
+        )
+
+
+def run_backfill(batch_size=DEFAULT_BATCH_SIZE, max_batches=0, limit=None, processes=None, job_id=None, user=None):
+    """Set invoice_date from document_fulltext for all documents that need it.
+
+    Documents whose text and extractor version did not change since the last
+    run are not read at all (see `iter_backfill_batches`).
+
+    Batches are parsed in a process pool; while one batch is parsed the next
+    one is read and the previous one written and committed. Documents stored
+    as excerpt are parsed on their complete text (see `get_document_fulltext`).
+    With `job_id` the counters are pushed to the desk after every batch.
+    """
+    batch_size = cint(batch_size) or DEFAULT_BATCH_SIZE
+    max_batches = cint(max_batches)
+    result = {"batches": 0, "total_seen": 0, "total_updated": 0, "total_skipped": 0}
+
+    def write(rows, parsed):
+        # wartet auf die Worker-Prozesse
+        with metrics.stage("backfill_parse"):
+            pairs = list(zip((row.name for row in rows), (row.fulltext_hash for row in rows), parsed))
+        with metrics.stage("backfill_write"):
+            write_invoice_dates(pairs)
+        with metrics.stage("commit"):
+            frappe.db.commit()
+
+        updated = sum(1 for _name, _hash, d in pairs if d)
+        result["batches"] += 1
+        result["total_seen"] += len(pairs)
+        result["total_updated"] += updated
+        result["total_skipped"] += len(pairs) - updated
+        metrics.count("invoice_dates_set", updated)
+        metrics.count("invoice_dates_not_found", len(pairs) - updated)
+        if job_id:
+            publish_progress(job_id, {"status": "started", **result}, user=user)
+
+    pending = None
+    with metrics.collect(), InvoiceDateParser(processes) as parser:
+        batches = iter_backfill_batches(batch_size, limit)
+        for rows in metrics.timed_iter("backfill_read", batches):
+            parsed = parser.parse([get_document_fulltext(row) or "" for row in rows])
+            if pending:
+                write(*pending)
+            pending = (rows, parsed)
+
+            if max_batches and result["batches"] + 1 >= max_batches:
+                break
+        if pending:
+            write(*pending)
+
+    if job_id:
+        publish_progress(job_id, {"status": "finished", **result}, user=user)
+    return result
@@ -0,0 +1,296 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Anonymisierte Rechnungstexte mit dem richtigen Rechnungsdatum.
+
+Aufbau und OCR-Eigenheiten (Zeilenumbrüche, Dezimalkommas, mehrere Daten
+pro Beleg) sind echten Paperless-Volltexten nachempfunden; Namen, Adressen
+und Nummern sind erfunden. Das Label ist das Datum, das ein Mensch als
+Rechnungsdatum ablesen würde, nicht das, was die Erkennung liefert.
+"""
+
+from datetime import date
+
+# (Schlüssel, Sprache, Text, Rechnungsdatum oder None)
+LABELED_CORPUS = [
+    (
+        "de_hosting",
+        "de",
+        """Musterhost GmbH · Beispielweg 12 · 12345 Musterstadt
+Muster AG
+Frau Erika Mustermann
+Hauptstraße 1
+54321 Beispielhausen
+Rechnung
+Rechnungsnummer: RE-2025-004711
+Kundennummer: 100231
+Rechnungsdatum: 14.10.2025
+Leistungszeitraum: 01.10.2025 - 31.10.2025
+Pos. Beschreibung Menge Einzelpreis Gesamt
+1 Managed Server M 1 89,00 € 89,00 €
+2 Backup-Speicher 100 GB 1 9,90 € 9,90 €
+Nettobetrag 98,90 €
+USt. 19 % 18,79 €
+Gesamtbetrag 117,69 €
+Der Betrag wird am 21.10.2025 von Ihrem Konto abgebucht.""",
+        date(2025, 10, 14),
+    ),
+    (
+        "de_handwerker",
+        "de",
+        """Malerbetrieb Beispiel
+Inh. Max Muster
+Am Markt 3, 98765 Musterdorf
+Tel. 01234 / 56789
+Rechnung Nr. 2024-118
+Datum: 03.06.2024
+Bauvorhaben: Umbau Büro EG, Hauptstraße 1
+Ausführungszeitraum 13.05.2024 bis 24.05.2024
+Wände spachteln und streichen 124,5 m² à 18,50 € 2.303,25 €
+Material pauschal 412,80 €
+Summe netto 2.716,05 €
+zzgl. 19 % MwSt. 516,05 €
+Rechnungsbetrag 3.232,10 €
+Zahlbar bis 17.06.2024 ohne Abzug.""",
+        date(2024, 6, 3),
+    ),
+    (
+        "de_quittung",
+        "de",
+        """BÄCKEREI MUSTERMANN
+Filiale Bahnhof
+Quittungsdatum 3/2/2024 10:42
+2x Brötchen 0,90
+1x Kaffee groß 3,20
+SUMME EUR 4,10
+BAR 5,00
+RÜCKGELD 0,90
+Vielen Dank für Ihren Einkauf!""",
+        date(2024, 2, 3),
+    ),
+    (
+        "de_rechnung_vom",
+        "de",
+        """Beispiel Büroservice e.K.
+Rechnung vom 30 Oktober 2025
+Ihre Bestellung 4500012345 vom 22 Oktober 2025
+Kopierpapier A4, 80 g, 10 Pakete 42,90
+Toner schwarz 1 Stück 89,00
+Versand 5,95
+Gesamt 137,85 EUR inkl. MwSt.""",
+        date(2025, 10, 30),
+    ),
+    (
+        "de_beleg_iso",
+        "de",
+        """Musterfirma Software GmbH
+Belegdatum 2025-11-05
+Beleg-Nr. 2025-0815
+Lizenz Musterprogramm Business, 12 Monate
+Laufzeit 2025-11-05 bis 2026-11-04
+Betrag 1.188,00 EUR
+Umsatzsteuer 225,72 EUR
+Summe 1.413,72 EUR""",
+        date(2025, 11, 5),
+    ),
+    (
+        "de_monatsname",
+        "de",
+        """Steuerberatung Muster & Partner
+Datum: 14. März 2025
+Honorarrechnung 25/0314
+für Ihre Einkommensteuererklärung 2024
+Gegenstandswert 48.000,00 €
+Gebühr nach § 24 StBVV 612,00 €
+Auslagenpauschale 20,00 €
+Summe 632,00 €
+zzgl. 19 % USt 120,08 €
+Rechnungsbetrag 752,08 €""",
+        date(2025, 3, 14),
+    ),
+    (
+        "de_lieferschein_vorher",
+        "de",
+        """Großhandel Beispiel KG
+Lieferschein 776655 Lieferdatum 01.10.2025
+Rechnung 998877
+Rechnungsdatum 14.10.25.
+Artikel 4711-0815 Schrauben M6 500 Stk. 23,50
+Artikel 4711-0816 Muttern M6 500 Stk. 12,40
+Netto 35,90 MwSt 6,82 Brutto 42,72""",
+        date(2025, 10, 14),
+    ),
+    (
+        "de_kfz",
+        "de",
+        """Autohaus Muster GmbH
+Werkstattrechnung
+Fahrzeug: Beispiel Kombi, Erstzulassung 12.03.2019
+Kilometerstand 84.512
+Auftragsdatum 08.01.2025
+Rechnungsdatum 09.01.2025
+Inspektion nach Herstellervorgabe 289,00
+Motoröl 5W-30 5,2 l 84,24
+Bremsflüssigkeit wechseln 59,90
+Summe 433,14 zzgl. MwSt.""",
+        date(2025, 1, 9),
+    ),
+    (
+        "de_strom",
+        "de",
+        """Stadtwerke Musterstadt
+Jahresabrechnung Strom
+Vertragskonto 2001234567
+Abrechnungszeitraum 01.01.2024 - 31.12.2024
+Zählerstand alt 12.345 kWh neu 15.678 kWh
+Verbrauch 3.333 kWh
+Musterstadt, den 15.01.2025
+Gesamtbetrag 1.102,45 €
+abzüglich Abschläge 1.080,00 €
+Nachzahlung 22,45 €""",
+        date(2025, 1, 15),
+    ),
+    (
+        "de_versicherung",
+        "de",
+        """Beispiel Versicherung AG
+Beitragsrechnung
+Versicherungsschein 12-345678-9
+Versicherungsbeginn 01.04.2015
+Fälligkeit 01.04.2025
+Betriebshaftpflicht 2025/2026 845,30 €
+Versicherungsteuer 19 % 160,61 €
+Zu zahlen 1.005,91 €
+Köln, 05.03.2025""",
+        date(2025, 3, 5),
+    ),
+    (
+        "de_dezimalkomma",
+        "de",
+        """Kiosk am Park
+Betrag 12,50 EUR am 3,5,2024
+Danke und bis bald""",
+        date(2024, 5, 3),
+    ),
+    (
+        "de_ohne_datum",
+        "de",
+        """Angebot
+Musterfirma GmbH
+Wir bieten Ihnen folgende Leistungen an:
+Wartungsvertrag Heizung jährlich 249,00 €
+Das Angebot ist 30 Tage gültig.""",
+        None,
+    ),
+    (
+        "en_saas",
+        "en",
+        """Example Cloud Inc.
+123 Sample Street, Springfield
+INVOICE
+Invoice Number INV-000123
+Invoice Date October 14, 2025
+Due Date November 13, 2025
+Bill To: Muster AG, Hauptstrasse 1, 54321 Beispielhausen, Germany
+Description Qty Unit Price Amount
+Team plan (10 seats) 1 $120.00 $120.00
+Subtotal $120.00
+Tax $0.00
+Total $120.00""",
+        date(2025, 10, 14),
+    ),
+    (
+        "en_short_month",
+        "en",
+        """SAMPLE TOOLS LTD
+INVOICE DATE: Oct. 25, 2025
+ORDER NO 55-1234
+Cordless drill 1 x 149.00
+Battery pack 2 x 59.00
+TOTAL GBP 267.00""",
+        date(2025, 10, 25),
+    ),
+    (
+        "en_receipt_iso",
+        "en",
+        """Example Coffee Roasters
+Receipt
+2025-11-05 11:16AM PST
+Order #8842
+Espresso beans 1 kg 24.00
+Shipping 6.50
+Total USD 30.50
+Thank you for your order!""",
+        date(2025, 11, 5),
+    ),
+    (
+        "en_us_format",
+        "en",
+        """Sample Consulting LLC
+Invoice #2024-07
+Date: 07/19/2024
+Terms: Net 30
+Consulting services June 2024 32 h x $150.00 $4,800.00
+Travel expenses $312.40
+Amount due $5,112.40""",
+        date(2024, 7, 19),
+    ),
+    (
+        "en_due_only",
+        "en",
+        """Example Hosting
+Statement
+Account 778899
+Payment due 5 sept. 24
+Domain renewal example.com 12.00
+SSL certificate 49.00
+Balance 61.00""",
+        date(2024, 9, 5),
+    ),
+    (
+        "en_day_month",
+        "en",
+        """Sample Training Ltd
+Invoice
+Issued 2 December 2024
+Course: Advanced Spreadsheets, 1 participant
+Course date 16 January 2025
+Fee GBP 450.00
+VAT 20% GBP 90.00
+Total GBP 540.00""",
+        date(2024, 12, 2),
+    ),
+    (
+        "en_customer_since",
+        "en",
+        """Example Telecom
+Customer since 1999-01-01
+Bill printed 2024-07-19
+Mobile plan Unlimited 35.00
+Roaming 4.20
+Total 39.20""",
+        date(2024, 7, 19),
+    ),
+    (
+        "en_no_date",
+        "en",
+        """Price list
+Widget A 10.00
+Widget B 12.50
+Prices include VAT.""",
+        None,
+    ),
+]
+
+# Belege, bei denen die Erkennung bekanntermaßen danebenliegt. Wird einer
+# davon richtig erkannt, gehört er hier heraus (siehe test_invoice_date.py).
+KNOWN_MISSES = {
+    # "Abrechnungszeitraum 01.01.2024" steht vor dem Ausstellungsdatum
+    "de_strom",
+    # kein Keyword, das erste Datum ist der Versicherungsbeginn
+    "de_versicherung",
+    # Monat vor Tag (07/19/2024) wird nicht erkannt
+    "en_us_format",
+    # "24-07-19" aus dem ISO-Datum passt auf das numerische Muster
+    "en_customer_since",
+}
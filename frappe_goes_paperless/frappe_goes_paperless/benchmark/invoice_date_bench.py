@@ -0,0 +1,162 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Speed and accuracy of the invoice date extraction.
+
+Runs `extract_invoice_date_from_text` over the labeled corpus (or a JSONL
+file with `text` and `date` per line, e.g. an anonymized export of real
+documents) and `parse_date_with_month_name` over month name snippets, and
+reports docs/sec, p50/p99 latency per document and the accuracy against
+the labels. No frappe needed:
+
+    python -m frappe_goes_paperless.frappe_goes_paperless.benchmark.invoice_date_bench \\
+        --repeat 200 --padding 2000
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+
+from frappe_goes_paperless.frappe_goes_paperless.benchmark.invoice_corpus import LABELED_CORPUS
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import (
+    extract_invoice_date_from_text,
+    parse_date_with_month_name,
+)
+
+# OCR-Text ohne Datum, mit dem die Belege auf realistische Länge gebracht werden
+_PADDING = (
+    "Pos Artikel Menge Einzelpreis Gesamt Artikelnummer 4711 Beschreibung Lieferung "
+    "Versand Kundennummer 123456 USt-IdNr DE123456789 IBAN DE89 3704 0044 0532 0130 00 "
+)
+
+MONTH_NAME_SNIPPETS = [
+    "October 14, 2025",
+    "30 Oktober 2025",
+    "Oct. 25, 2025 Order 55-1234",
+    "am 14. März 2025 erstellt",
+    "due 5 sept. 24",
+    "Issued 2 December 2024 Course date 16 January 2025",
+    "32 Oktober 2025",
+    "kein Monat in diesem Text",
+]
+
+
+def load_jsonl(path):
+    """Read `{"key", "text", "date"}` lines; `date` as YYYY-MM-DD or null."""
+    corpus = []
+    with open(path) as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            label = date.fromisoformat(entry["date"]) if entry.get("date") else None
+            corpus.append((entry.get("key") or str(i), entry.get("lang", ""), entry["text"], label))
+    return corpus
+
+
+def pad(corpus, padding):
+    """Append `padding` characters of dateless OCR text to every document."""
+    if not padding:
+        return corpus
+    filler = (_PADDING * (padding // len(_PADDING) + 1))[:padding]
+    return [(key, lang, f"{text}\n{filler}", label) for key, lang, text, label in corpus]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def time_function(function, inputs, repeat=1):
+    """Call `function` on every input `repeat` times.
+
+    Returns the results of the first round and the latencies in seconds.
+    """
+    results = []
+    latencies = []
+    clock = time.perf_counter
+    for round in range(repeat):
+        for value in inputs:
+            start = clock()
+            result = function(value)
+            latencies.append(clock() - start)
+            if not round:
+                results.append(result)
+    return results, latencies
+
+
+def measure(corpus, repeat=1):
+    """Benchmark the extraction over `corpus`; returns a JSON-serializable dict."""
+    texts = [text for _key, _lang, text, _label in corpus]
+    found, latencies = time_function(extract_invoice_date_from_text, texts, repeat)
+    month_found, month_latencies = time_function(parse_date_with_month_name, MONTH_NAME_SNIPPETS, repeat)
+
+    correct = [key for (key, _lang, _text, label), result in zip(corpus, found) if result == label]
+    by_lang = {}
+    for (key, lang, _text, label), result in zip(corpus, found):
+        entry = by_lang.setdefault(lang or "-", {"documents": 0, "correct": 0})
+        entry["documents"] += 1
+        entry["correct"] += result == label
+
+    return {
+        "documents": len(corpus),
+        "repeat": repeat,
+        "avg_chars": round(sum(map(len, texts)) / len(texts)) if texts else 0,
+        "extract": _stats(latencies),
+        "month_name": _stats(month_latencies),
+        "accuracy": round(len(correct) / len(corpus), 4) if corpus else 0,
+        "by_lang": by_lang,
+        "misses": {
+            key: {"expected": str(label), "found": str(result)}
+            for (key, _lang, _text, label), result in zip(corpus, found)
+            if result != label
+        },
+        "month_name_found": [str(d) if d else None for d in month_found],
+    }
+
+
+def _stats(latencies):
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    return {
+        "calls": len(latencies),
+        "per_sec": round(len(latencies) / total, 1) if total else 0,
+        "p50_us": round(_percentile(ordered, 0.5) * 1e6, 1),
+        "p99_us": round(_percentile(ordered, 0.99) * 1e6, 1),
+        "max_us": round(ordered[-1] * 1e6, 1) if ordered else 0,
+    }
+
+
+def format_report(report):
+    e, m = report["extract"], report["month_name"]
+    lines = [
+        f"{report['documents']} documents x {report['repeat']}, avg {report['avg_chars']} chars",
+        f"extract_invoice_date_from_text: {e['per_sec']:.0f} docs/s, "
+        f"p50 {e['p50_us']:.0f} us, p99 {e['p99_us']:.0f} us, max {e['max_us']:.0f} us",
+        f"parse_date_with_month_name:     {m['per_sec']:.0f} calls/s, "
+        f"p50 {m['p50_us']:.0f} us, p99 {m['p99_us']:.0f} us",
+        f"accuracy: {report['accuracy']:.1%} "
+        + ", ".join(f"{lang} {v['correct']}/{v['documents']}" for lang, v in sorted(report["by_lang"].items())),
+    ]
+    for key, miss in sorted(report["misses"].items()):
+        lines.append(f"    miss {key}: expected {miss['expected']}, found {miss['found']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="JSONL file instead of the built-in corpus")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--padding", type=int, default=0, help="characters of dateless text appended per document")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    corpus = load_jsonl(args.corpus) if args.corpus else LABELED_CORPUS
+    report = measure(pad(corpus, args.padding), repeat=max(1, args.repeat))
+    print(json.dumps(report, indent=1) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
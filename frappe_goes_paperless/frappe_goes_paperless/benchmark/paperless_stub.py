@@ -0,0 +1,263 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Local stand-in for the Paperless-ngx REST API.
+
+Serves a generated archive on /api/documents/ (list, detail and thumb/),
+/api/correspondents/ and /api/document_types/ with a configurable
+latency and counts every request. Only the parameters this app uses are
+implemented. Pure stdlib, so it also runs without a bench:
+
+    python -m frappe_goes_paperless.frappe_goes_paperless.benchmark.paperless_stub \\
+        --documents 10000 --latency 0.02 --port 8765
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_DETAIL = re.compile(r"^/api/(documents|correspondents|document_types)/(\d+)/(thumb/)?$")
+_LIST = re.compile(r"^/api/(documents|correspondents|document_types)/$")
+
+_LINES = [
+    "Rechnung Nr. {id}",
+    "Rechnungsdatum: {date}",
+    "Kundennummer 10{id:05d}",
+    "Pos. Menge Artikel Einzelpreis Gesamt",
+    "1 {qty} Artikel {id} {price},00 EUR",
+    "Zwischensumme {price},00 EUR zzgl. 19% USt.",
+    "Zahlbar innerhalb von 14 Tagen ohne Abzug.",
+    "Bankverbindung IBAN DE89 3704 0044 0532 0130 00",
+]
+
+
+class PaperlessArchive:
+    """Generated documents, correspondents and document types."""
+
+    def __init__(self, documents=1000, correspondents=50, document_types=5, content_lines=60,
+                 thumbnail_size=8 * 1024, seed=0):
+        rnd = random.Random(seed)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.lock = threading.Lock()
+        self.correspondents = {i: f"Correspondent {i}" for i in range(1, correspondents + 1)}
+        self.document_types = {i: f"Type {i}" for i in range(1, document_types + 1)}
+        self.thumbnail = b"RIFF" + bytes(max(0, thumbnail_size - 4))
+        self.documents = {}
+        for id in range(1, documents + 1):
+            date = start + timedelta(days=rnd.randrange(600))
+            lines = [
+                line.format(id=id, date=date.strftime("%d.%m.%Y"), qty=rnd.randrange(1, 9),
+                            price=rnd.randrange(10, 9999))
+                for line in _LINES
+            ]
+            content = "\n".join((lines * (content_lines // len(lines) + 1))[:content_lines])
+            self.documents[id] = {
+                "id": id,
+                "title": f"Rechnung {id}",
+                "content": content,
+                "correspondent": rnd.randrange(1, correspondents + 1) if correspondents else None,
+                "document_type": rnd.randrange(1, document_types + 1) if document_types else None,
+                "created": date.isoformat(),
+                "modified": (start + timedelta(seconds=id)).isoformat(),
+            }
+
+    def touch(self, ids):
+        """Mark documents as modified now, e.g. to benchmark an incremental sync."""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            for offset, id in enumerate(ids):
+                self.documents[id]["modified"] = (now + timedelta(microseconds=offset)).isoformat()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Antworten ---
+
+    def _send(self, status, body=None, content_type="application/json"):
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        body = body or b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count_bytes(len(body))
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _route(self, method):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.server.count(method, url.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.headers.get("Authorization") != f"Token {self.server.token}":
+            return self._send(401, {"detail": "Invalid token."})
+
+        archive = self.server.archive
+        match = _DETAIL.match(url.path)
+        if match:
+            place, id, thumb = match.group(1), int(match.group(2)), match.group(3)
+            table = getattr(archive, place)
+            if id not in table:
+                return self._send(404, {"detail": "Not found."})
+            if thumb:
+                return self._send(200, archive.thumbnail, "image/webp")
+            if method == "PATCH":
+                with archive.lock:
+                    table[id] = self._body().get("name", table[id])
+            entry = table[id]
+            return self._send(200, entry if place == "documents" else {"id": id, "name": entry})
+
+        match = _LIST.match(url.path)
+        if not match:
+            return self._send(404, {"detail": "Not found."})
+        place = match.group(1)
+
+        if method == "POST":
+            if place != "correspondents":
+                return self._send(405, {"detail": "Method not allowed."})
+            name = self._body().get("name")
+            with archive.lock:
+                if name in archive.correspondents.values():
+                    return self._send(400, {"name": ["correspondent with this name already exists."]})
+                id = max(archive.correspondents, default=0) + 1
+                archive.correspondents[id] = name
+            return self._send(201, {"id": id, "name": name})
+
+        if place == "documents":
+            rows = self._filter_documents(params)
+        else:
+            with archive.lock:
+                rows = [{"id": id, "name": name} for id, name in sorted(getattr(archive, place).items())]
+            if "name__iexact" in params:
+                rows = [r for r in rows if r["name"].lower() == params["name__iexact"].lower()]
+        return self._send(200, self._page(rows, params))
+
+    def _filter_documents(self, params):
+        with self.server.archive.lock:
+            rows = list(self.server.archive.documents.values())
+        if "id__in" in params:
+            ids = {int(id) for id in params["id__in"].split(",") if id}
+            rows = [r for r in rows if r["id"] in ids]
+        if "modified__gte" in params:
+            rows = [r for r in rows if r["modified"] >= params["modified__gte"]]
+        for key in reversed((params.get("ordering") or "id").split(",")):
+            rows.sort(key=lambda r: r[key.lstrip("-")], reverse=key.startswith("-"))
+        if "fields" in params:
+            fields = params["fields"].split(",")
+            rows = [{f: r[f] for f in fields if f in r} for r in rows]
+        return rows
+
+    def _page(self, rows, params):
+        page = int(params.get("page") or 1)
+        page_size = int(params.get("page_size") or 25)
+        results = rows[(page - 1) * page_size: page * page_size]
+        has_next = page * page_size < len(rows)
+        return {
+            "count": len(rows),
+            "next": f"?page={page + 1}" if has_next else None,
+            "previous": f"?page={page - 1}" if page > 1 else None,
+            "all": [r["id"] for r in rows if "id" in r],
+            "results": results,
+        }
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+
+class PaperlessStub(ThreadingHTTPServer):
+    """ThreadingHTTPServer with an archive, latency and request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, archive, latency=0.0, token="benchmark", host="127.0.0.1", port=0):
+        super().__init__((host, port), StubHandler)
+        self.archive = archive
+        self.latency = latency
+        self.token = token
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.bytes_sent = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method, path):
+        # IDs zusammenfassen: /api/documents/12/thumb/ -> /api/documents/{id}/thumb/
+        route = re.sub(r"/\d+/", "/{id}/", path)
+        with self._lock:
+            key = f"{method} {route}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def count_bytes(self, n):
+        with self._lock:
+            self.bytes_sent += n
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = {}
+            self.bytes_sent = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--correspondents", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--token", default="benchmark")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    stub = PaperlessStub(
+        PaperlessArchive(documents=args.documents, correspondents=args.correspondents),
+        latency=args.latency,
+        token=args.token,
+        port=args.port,
+    )
+    print(f"Paperless stub on {stub.url} (token {args.token})")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
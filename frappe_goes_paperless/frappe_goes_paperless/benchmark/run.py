@@ -0,0 +1,356 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Sync, backfill and correspondent benchmarks against the local Paperless stub.
+
+Runs on a test site only (`allow_tests` in site_config.json), because
+Paperless Documents are deleted and the settings are pointed to the stub
+while it runs. Settings and the correspondent links of customers and
+suppliers are restored afterwards:
+
+    bench --site test_site execute \\
+        frappe_goes_paperless.frappe_goes_paperless.benchmark.run.run \\
+        --kwargs "{'documents': 5000, 'latency': 0.02, 'output': '/tmp/bench.json'}"
+
+Pass `baseline` (the `output` of an earlier run) to flag scenarios whose
+throughput dropped by more than `tolerance`.
+"""
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint, flt
+from frappe.utils.password import get_decrypted_password, set_encrypted_password
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+from frappe_goes_paperless.frappe_goes_paperless.benchmark.paperless_stub import (
+    PaperlessArchive,
+    PaperlessStub,
+)
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE, clear_client
+from frappe_goes_paperless.frappe_goes_paperless.correspondents import (
+    CORRESPONDENT_ID,
+    SOURCES,
+    SYNC_FLAG,
+    sync_correspondent,
+    sync_correspondents,
+)
+from frappe_goes_paperless.frappe_goes_paperless.tools import (
+    backfill_paperless_invoice_date_batch,
+    sync_documents,
+)
+
+TOKEN = "benchmark"
+SCENARIOS = (
+    "sync_full",
+    "sync_incremental",
+    "sync_single",
+    "backfill",
+    "correspondents",
+    "correspondent_single",
+)
+# so viele Einzel-Importe bzw. -Syncs in den *_single-Szenarien
+SINGLE_RUNS = 20
+
+# Felder, die fuer den Lauf ueberschrieben und danach zurueckgesetzt werden
+_OVERRIDES = (
+    "paperless_ngx_server",
+    "sync_cursor",
+    "sync_page_size",
+    "import_workers",
+    "thumbnail_mode",
+    "correspondent_request_rate",
+    "sync_correspondents_on_save",
+)
+
+
+def run(
+    documents=1000,
+    latency=0.01,
+    page_size=100,
+    workers=4,
+    processes=None,
+    thumbnail_mode="On Demand",
+    correspondent_rate=1000,
+    changed=0.1,
+    scenarios=None,
+    output=None,
+    baseline=None,
+    tolerance=0.2,
+):
+    """Run the benchmark scenarios and print a report.
+
+    - documents: size of the generated archive
+    - latency: seconds the stub waits before answering each request
+    - changed: share of documents touched before `sync_incremental`
+    - scenarios: list of names from `SCENARIOS` (default: all)
+    - output: path to write the results as JSON
+    - baseline: path of an earlier `output` to compare against
+    """
+    if not frappe.conf.allow_tests:
+        frappe.throw("Benchmarks delete Paperless Documents and only run on sites with allow_tests")
+
+    scenarios = scenarios or list(SCENARIOS)
+    if isinstance(scenarios, str):
+        scenarios = [s.strip() for s in scenarios.split(",")]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        frappe.throw(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    archive = PaperlessArchive(documents=cint(documents))
+    results = {}
+    with PaperlessStub(archive, latency=flt(latency), token=TOKEN) as stub:
+        saved = _point_settings_to(
+            stub,
+            sync_page_size=cint(page_size),
+            import_workers=cint(workers),
+            thumbnail_mode=thumbnail_mode,
+            correspondent_request_rate=flt(correspondent_rate),
+        )
+        saved_links = _save_correspondent_links()
+        try:
+            for name in SCENARIOS:
+                if name in scenarios:
+                    results[name] = _run_scenario(name, stub, archive, processes=processes, changed=changed)
+        finally:
+            # Reste eines abgebrochenen Szenarios verwerfen
+            frappe.db.rollback()
+            _restore_correspondent_links(saved_links)
+            _restore_settings(saved)
+
+    report = {
+        "config": {
+            "documents": cint(documents),
+            "latency": flt(latency),
+            "page_size": cint(page_size),
+            "workers": cint(workers),
+            "processes": processes,
+            "thumbnail_mode": thumbnail_mode,
+        },
+        "scenarios": results,
+    }
+    if baseline:
+        with open(baseline) as f:
+            report["regressions"] = compare(json.load(f), report, flt(tolerance))
+
+    print(format_report(report))
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=1)
+    return report
+
+
+def _point_settings_to(stub, **values):
+    saved = frappe.db.get_values_from_single(_OVERRIDES, None, SETTINGS_DOCTYPE, as_dict=True)[0]
+    saved["api_token"] = get_decrypted_password(
+        SETTINGS_DOCTYPE, SETTINGS_DOCTYPE, "api_token", raise_exception=False
+    )
+
+    values.update(paperless_ngx_server=stub.url, sync_cursor="", sync_correspondents_on_save=0)
+    for fieldname, value in values.items():
+        frappe.db.set_single_value(SETTINGS_DOCTYPE, fieldname, value)
+    set_encrypted_password(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE, TOKEN, "api_token")
+    _reload_settings()
+    return saved
+
+
+def _restore_settings(saved):
+    api_token = saved.pop("api_token")
+    for fieldname, value in saved.items():
+        frappe.db.set_single_value(SETTINGS_DOCTYPE, fieldname, value)
+    if api_token:
+        set_encrypted_password(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE, api_token, "api_token")
+    _reload_settings()
+
+
+def _save_correspondent_links():
+    return {
+        doctype: {
+            row.name: (row[CORRESPONDENT_ID], row[SYNC_FLAG])
+            for row in frappe.get_all(doctype, fields=["name", CORRESPONDENT_ID, SYNC_FLAG])
+        }
+        for doctype in _party_doctypes()
+    }
+
+
+def _restore_correspondent_links(saved):
+    # die Szenarien tragen IDs von Correspondents des Stubs ein
+    for doctype, links in saved.items():
+        for row in frappe.get_all(doctype, fields=["name", CORRESPONDENT_ID, SYNC_FLAG]):
+            link = links.get(row.name)
+            if link and link != (row[CORRESPONDENT_ID], row[SYNC_FLAG]):
+                frappe.db.set_value(
+                    doctype,
+                    row.name,
+                    {CORRESPONDENT_ID: link[0], SYNC_FLAG: link[1]},
+                    update_modified=False,
+                )
+    frappe.db.commit()
+
+
+def _reload_settings():
+    frappe.db.commit()
+    frappe.clear_document_cache(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE)
+    clear_client()
+
+
+def _run_scenario(name, stub, archive, processes=None, changed=0.1):
+    prepare, execute = {
+        "sync_full": (lambda: _prepare_sync_full(archive), lambda: sync_documents()),
+        "sync_incremental": (
+            lambda: _prepare_sync_incremental(archive, changed),
+            lambda: sync_documents(),
+        ),
+        "sync_single": (
+            lambda: min(SINGLE_RUNS, len(archive.documents)) or None,
+            lambda: _sync_single(archive),
+        ),
+        "backfill": (
+            _prepare_backfill,
+            lambda: backfill_paperless_invoice_date_batch(processes=processes),
+        ),
+        "correspondents": (_prepare_correspondents, lambda: sync_correspondents(list(_party_doctypes()))),
+        "correspondent_single": (_prepare_correspondent_single, _sync_correspondent_single),
+    }[name]
+
+    items = prepare()
+    if items is None:
+        return {"skipped": True}
+
+    stub.reset_counters()
+    with metrics.collect(flush=False) as collected:
+        start = time.perf_counter()
+        result = execute()
+        duration = time.perf_counter() - start
+
+    return {
+        "items": items,
+        "seconds": round(duration, 3),
+        "items_per_sec": round(items / duration, 1) if duration else 0,
+        "requests": dict(stub.requests),
+        "requests_total": sum(stub.requests.values()),
+        "bytes": stub.bytes_sent,
+        "result": result,
+        "metrics": collected.summary(),
+    }
+
+
+# --- Szenarien ---
+
+
+def _prepare_sync_full(archive):
+    frappe.db.delete("File", {"attached_to_doctype": "Paperless Document"})
+    frappe.db.delete("Paperless Document")
+    frappe.db.set_single_value(SETTINGS_DOCTYPE, "sync_cursor", "")
+    _reload_settings()
+    return len(archive.documents)
+
+
+def _prepare_sync_incremental(archive, changed):
+    ids = sorted(archive.documents)[: max(1, int(len(archive.documents) * flt(changed)))]
+    if not frappe.db.get_single_value(SETTINGS_DOCTYPE, "sync_cursor"):
+        # ohne Cursor wuerde ein voller Abgleich laufen
+        return None
+    archive.touch(ids)
+    return len(ids)
+
+
+def _sync_single(archive):
+    ids = sorted(archive.documents)[:SINGLE_RUNS]
+    archive.touch(ids)
+    for id in ids:
+        sync_documents(paperless_document=id)
+    return {"documents": len(ids)}
+
+
+def _prepare_backfill():
+    frappe.db.sql(
+        "update `tabPaperless Document` "
+        "set invoice_date = null, invoice_date_extracted = null, invoice_date_checked = 0, invoice_date_version = 0"
+    )
+    frappe.db.commit()
+    return frappe.db.count("Paperless Document") or None
+
+
+def _party_doctypes():
+    for doctype in SOURCES:
+        if frappe.db.exists("DocType", doctype) and frappe.db.has_column(doctype, CORRESPONDENT_ID):
+            yield doctype
+
+
+def _prepare_correspondents():
+    # Verknuepfungen loesen, damit jeder Datensatz einen Correspondent anlegt
+    count = 0
+    for doctype in _party_doctypes():
+        frappe.db.sql(f"update `tab{doctype}` set `{SYNC_FLAG}` = 0, `{CORRESPONDENT_ID}` = 0")
+        count += frappe.db.count(doctype)
+    frappe.db.commit()
+    return count or None
+
+
+def _single_parties():
+    parties = []
+    for doctype in _party_doctypes():
+        names = frappe.get_all(doctype, pluck="name", limit=SINGLE_RUNS - len(parties))
+        parties += [(doctype, name) for name in names]
+    return parties
+
+
+def _prepare_correspondent_single():
+    return len(_single_parties()) or None
+
+
+def _sync_correspondent_single():
+    results = [sync_correspondent(doctype, name) for doctype, name in _single_parties()]
+    return {"records": len(results)}
+
+
+# --- Auswertung ---
+
+
+def compare(baseline, report, tolerance=0.2):
+    """Scenarios whose throughput dropped or whose request count grew by more than `tolerance`."""
+    regressions = {}
+    for name, current in report["scenarios"].items():
+        before = (baseline.get("scenarios") or {}).get(name)
+        if not before or before.get("skipped") or current.get("skipped"):
+            continue
+        issues = []
+        if current["items_per_sec"] < before["items_per_sec"] * (1 - tolerance):
+            issues.append(f"items/s {before['items_per_sec']} -> {current['items_per_sec']}")
+        if current["requests_total"] > before["requests_total"] * (1 + tolerance):
+            issues.append(f"requests {before['requests_total']} -> {current['requests_total']}")
+        if issues:
+            regressions[name] = issues
+    return regressions
+
+
+def format_report(report):
+    config = report["config"]
+    lines = [
+        f"Paperless benchmark: {config['documents']} documents, {config['latency'] * 1000:g} ms latency, "
+        f"page size {config['page_size']}, {config['workers']} workers",
+        "",
+        f"{'scenario':<22}{'items':>8}{'seconds':>10}{'items/s':>10}{'requests':>10}{'MB':>8}",
+    ]
+    for name, r in report["scenarios"].items():
+        if r.get("skipped"):
+            lines.append(f"{name:<22}{'skipped':>8}")
+            continue
+        lines.append(
+            f"{name:<22}{r['items']:>8}{r['seconds']:>10.2f}{r['items_per_sec']:>10.1f}"
+            f"{r['requests_total']:>10}{r['bytes'] / 1e6:>8.1f}"
+        )
+        for route, n in sorted(r["requests"].items()):
+            lines.append(f"{'':<4}{route:<40}{n:>8}")
+        for stage, s in sorted(r["metrics"]["stages"].items()):
+            lines.append(f"{'':<4}{stage:<22} n={s['count']:<6} avg={s['avg'] * 1000:.1f}ms p95<={s['p95'] * 1000:g}ms")
+
+    regressions = report.get("regressions")
+    if regressions is not None:
+        lines.append("")
+        lines.append("Regressions:" if regressions else "No regressions against baseline")
+        for name, issues in regressions.items():
+            lines.append(f"    {name}: {'; '.join(issues)}")
+    return "\n".join(lines)
@@ -0,0 +1,43 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import frappe
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE
+
+# Apps, fuer die die Paperless-Formulare zusaetzliche Aktionen anbieten
+INTEGRATIONS = ("ai_workflows",)
+CACHE_KEY = "paperless_boot_config"
+
+
+def get_boot_config():
+    """Client config of the Paperless forms, cached until the settings change."""
+    return frappe.cache().get_value(CACHE_KEY, generator=_build_config)
+
+
+def _build_config():
+    installed = frappe.get_installed_apps()
+    integrations = [app for app in INTEGRATIONS if app in installed]
+    default_ai = None
+    if "ai_workflows" in integrations:
+        default_ai = frappe.db.get_single_value("AI Settings", "default_ai")
+    server_url = frappe.db.get_single_value(SETTINGS_DOCTYPE, "paperless_ngx_server") or ""
+    return {
+        "installed_apps": integrations,
+        "default_ai": default_ai,
+        "server_url": server_url.rstrip("/"),
+    }
+
+
+def boot_session(bootinfo):
+    if frappe.session.user != "Guest":
+        bootinfo.paperless = get_boot_config()
+
+
+def clear_boot_config(doc=None, method=None):
+    """Rebuild the config and push it to open desk sessions.
+
+    Called when the Paperless-ngx Settings or AI Settings are saved.
+    """
+    frappe.cache().delete_value(CACHE_KEY)
+    frappe.publish_realtime("paperless_config", get_boot_config(), after_commit=True)
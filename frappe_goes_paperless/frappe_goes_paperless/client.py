@@ -0,0 +1,212 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import threading
+
+import frappe
+import requests
+from frappe.utils import cint, flt
+from frappe.utils.password import get_decrypted_password
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+
+SETTINGS_DOCTYPE = "Paperless-ngx Settings"
+
+# Redis-Key mit der aktuellen "Version" der Einstellungen. Wird beim Speichern
+# der Settings neu gesetzt, damit alle Worker ihren Client neu aufbauen.
+CLIENT_VERSION_CACHE_KEY = "paperless_ngx_client_version"
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_SIZE = 10
+
+# ein Client pro Site und Worker-Prozess
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class PaperlessClient:
+    """HTTP client for the Paperless-ngx REST API.
+
+    Keeps one `requests.Session` with a keep-alive connection pool, sends the
+    API token with every request, applies timeouts and retries idempotent
+    requests with exponential backoff on 429/5xx responses (honouring
+    `Retry-After`).
+    """
+
+    def __init__(
+        self,
+        server_url,
+        api_token,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        pool_size=DEFAULT_POOL_SIZE,
+    ):
+        self.server_url = (server_url or "").rstrip("/")
+        self.api_token = api_token
+        self.timeout = (connect_timeout, read_timeout)
+        self.version = None
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Token {api_token}",
+                "Accept": "application/json",
+            }
+        )
+
+    def url(self, path):
+        """Return the absolute URL for an API path like `documents/1/`."""
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.server_url}/api/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except Exception:
+            metrics.record_http(method)
+            raise
+        metrics.record_http(method, response)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def get_json(self, path, params=None):
+        """GET a path and return the decoded JSON body, or None if the
+        request failed or the body is empty."""
+        response = self.get(path, params=params)
+        if response.status_code == 200 and response.content:
+            data = response.json()
+            if len(data) > 0:
+                return data
+        return None
+
+    def iter_pages(self, path, params=None, page_size=100):
+        """Walk a paginated list endpoint and yield the `results` of each page."""
+        params = dict(params or {})
+        params.setdefault("page_size", page_size)
+        page = 1
+        while True:
+            params["page"] = page
+            response = self.get(path, params=params)
+            response.raise_for_status()
+            data = response.json()
+            yield data.get("results") or []
+            if not data.get("next"):
+                break
+            page += 1
+
+    def iter_results(self, path, params=None, page_size=100):
+        """Like `iter_pages`, but yields the single list entries."""
+        for results in self.iter_pages(path, params=params, page_size=page_size):
+            yield from results
+
+    def close(self):
+        self.session.close()
+
+
+def _load_settings():
+    settings = frappe.get_cached_doc(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE)
+    api_token = get_decrypted_password(
+        doctype=SETTINGS_DOCTYPE,
+        name=SETTINGS_DOCTYPE,
+        fieldname="api_token",
+        raise_exception=False,
+    )
+    return settings, api_token
+
+
+def _setting(settings, fieldname, default, cast=flt):
+    value = settings.get(fieldname)
+    if value in (None, ""):
+        return default
+    return cast(value)
+
+
+def build_client(pool_size=None):
+    """Create a new PaperlessClient with timeouts and retries from the settings.
+
+    Use `get_client` for the shared client; bulk jobs with many parallel
+    requests build their own with a larger `pool_size`.
+    """
+    settings, api_token = _load_settings()
+    return PaperlessClient(
+        settings.paperless_ngx_server,
+        api_token,
+        connect_timeout=_setting(settings, "connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=_setting(settings, "read_timeout", DEFAULT_READ_TIMEOUT),
+        max_retries=_setting(settings, "max_retries", DEFAULT_MAX_RETRIES, cint),
+        backoff_factor=_setting(settings, "retry_backoff_factor", DEFAULT_BACKOFF_FACTOR),
+        # mindestens so viele Verbindungen wie parallele Import-Threads
+        pool_size=max(DEFAULT_POOL_SIZE, cint(settings.get("import_workers")), cint(pool_size)),
+    )
+
+
+def get_client():
+    """Return the shared PaperlessClient of this worker for the current site.
+
+    Settings and the decrypted token are only read again after the settings
+    doc has been saved (see `clear_client`).
+    """
+    site = getattr(frappe.local, "site", None)
+    version = frappe.cache().get_value(CLIENT_VERSION_CACHE_KEY)
+
+    client = _clients.get(site)
+    if client is not None and client.version == version:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(site)
+        if client is None or client.version != version:
+            if client is not None:
+                client.close()
+            client = build_client()
+            client.version = version
+            _clients[site] = client
+    return client
+
+
+def clear_client():
+    """Invalidate the cached client in all workers of the current site."""
+    frappe.cache().set_value(CLIENT_VERSION_CACHE_KEY, frappe.generate_hash(length=10))
+    with _clients_lock:
+        client = _clients.pop(getattr(frappe.local, "site", None), None)
+    if client is not None:
+        client.close()
+
+
+def get_paperless_settings():
+    client = get_client()
+    return client.server_url, client.api_token
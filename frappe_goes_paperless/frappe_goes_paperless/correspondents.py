@@ -0,0 +1,274 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import threading
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE, get_client
+from frappe_goes_paperless.frappe_goes_paperless.pipeline import ImportPipeline
+
+# Frappe-Doctype -> Feld mit dem Anzeigenamen
+SOURCES = {
+    "Customer": "customer_name",
+    "Supplier": "supplier_name",
+}
+SYNC_FLAG = "custom_synced_to_paperlessngx"
+CORRESPONDENT_ID = "custom_paperlessngx_correspondent_id"
+
+DEFAULT_REQUEST_RATE = 5
+DEFAULT_WORKERS = 4
+# so viele Fehlermeldungen landen im Error Log eines Laufs
+MAX_LOGGED_ERRORS = 50
+
+
+class RateLimiter:
+    """Spread calls of all threads to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            slot = max(time.monotonic(), self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def correspondent_name(title, name):
+    return f"{title} {name}"
+
+
+def new_correspondent(name):
+    return {
+        "name": name,
+        "match": "",
+        "matching_algorithm": 6,
+        "owner": 3,
+        "is_insensitive": False,
+    }
+
+
+def get_records(doctype, names=None):
+    filters = {"name": ["in", names]} if names else None
+    return frappe.get_all(
+        doctype,
+        filters=filters,
+        fields=["name", f"{SOURCES[doctype]} as title", SYNC_FLAG, CORRESPONDENT_ID],
+    )
+
+
+def get_correspondents(client):
+    """All Paperless correspondents as {id: name}, fetched page by page."""
+    return {c["id"]: c["name"] for c in client.iter_results("correspondents/", page_size=1000)}
+
+
+def plan_changes(records, correspondents):
+    """Diff Frappe records against the Paperless correspondents.
+
+    Returns a list of `(action, record, value)`:
+    - `("create", record, name)`: no correspondent yet
+    - `("rename", record, name)`: the linked correspondent has an outdated name
+    - `("link", record, id)`: a correspondent with the expected name exists,
+      only the Frappe side has to be updated
+    Records that are linked and up to date are left out.
+    """
+    ids_by_name = {name: id for id, name in correspondents.items()}
+    changes = []
+    for record in records:
+        expected = correspondent_name(record.title, record.name)
+        linked_id = cint(record.get(CORRESPONDENT_ID))
+
+        if linked_id in correspondents:
+            if correspondents[linked_id] != expected:
+                changes.append(("rename", record, expected))
+            elif not record.get(SYNC_FLAG):
+                changes.append(("link", record, linked_id))
+        elif expected in ids_by_name:
+            changes.append(("link", record, ids_by_name[expected]))
+        else:
+            changes.append(("create", record, expected))
+    return changes
+
+
+class CorrespondentSync:
+    """Apply planned changes for one doctype.
+
+    Requests are sent concurrently by an ImportPipeline and throttled by a
+    RateLimiter; the Frappe records are updated from the calling thread.
+    """
+
+    def __init__(self, doctype, client=None):
+        settings = frappe.get_cached_doc(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE)
+        self.doctype = doctype
+        self.client = client or get_client()
+        self.limiter = RateLimiter(
+            flt(settings.get("correspondent_request_rate")) or DEFAULT_REQUEST_RATE
+        )
+        self.workers = cint(settings.get("import_workers")) or DEFAULT_WORKERS
+        self.result = {"created": 0, "renamed": 0, "linked": 0, "unchanged": 0, "failed": 0}
+        self.errors = []
+
+    def run(self, records, correspondents):
+        self.correspondents = correspondents
+        changes = plan_changes(records, correspondents)
+        self.result["unchanged"] += len(records) - len(changes)
+
+        with ImportPipeline(self._send, self._write, workers=self.workers) as pipeline:
+            for change in changes:
+                if change[0] == "link":
+                    self._mark(change[1], change[2])
+                    self.result["linked"] += 1
+                else:
+                    pipeline.submit(change)
+
+        frappe.db.commit()
+        return self.result
+
+    def _send(self, change):
+        action, record, name = change
+        self.limiter.wait()
+        if action == "create":
+            response = self.client.post("correspondents/", json=new_correspondent(name))
+        else:
+            response = self.client.patch(
+                f"correspondents/{cint(record.get(CORRESPONDENT_ID))}/", json={"name": name}
+            )
+        response.raise_for_status()
+        return response.json()
+
+    def _write(self, change, correspondent, error):
+        action, record, name = change
+        if error:
+            self.result["failed"] += 1
+            response = getattr(error, "response", None)
+            detail = response.text if response is not None else str(error)
+            self.errors.append(f"{self.doctype} {record.name} ({action} '{name}'): {detail}")
+            return
+
+        self._mark(record, correspondent["id"])
+        # spaetere Doctypes im selben Lauf sehen den neuen Namen
+        self.correspondents[correspondent["id"]] = correspondent["name"]
+        self.result["created" if action == "create" else "renamed"] += 1
+
+    def _mark(self, record, correspondent_id):
+        frappe.db.set_value(
+            self.doctype,
+            record.name,
+            {SYNC_FLAG: 1, CORRESPONDENT_ID: correspondent_id},
+            update_modified=False,
+        )
+
+
+def sync_correspondents(doctypes=None, user=None):
+    """Background job: sync Customers and/or Suppliers to Paperless correspondents.
+
+    The correspondents are fetched once and diffed against all records, so
+    only missing or renamed ones cause a request. A summary is sent to
+    `user` and failures are collected in one Error Log.
+    """
+    doctypes = doctypes or list(SOURCES)
+    client = get_client()
+    correspondents = get_correspondents(client)
+
+    summary = {}
+    errors = []
+    for doctype in doctypes:
+        sync = CorrespondentSync(doctype, client)
+        summary[doctype] = sync.run(get_records(doctype), correspondents)
+        errors += sync.errors
+
+    if errors:
+        frappe.log_error(
+            "Paperless correspondent sync failed",
+            "\n".join(errors[:MAX_LOGGED_ERRORS])
+            + (f"\n... {len(errors) - MAX_LOGGED_ERRORS} more" if len(errors) > MAX_LOGGED_ERRORS else ""),
+        )
+    if user:
+        frappe.publish_realtime("msgprint", _summary_message(summary), user=user)
+    return summary
+
+
+def _summary_message(summary):
+    lines = [
+        f"<b>{frappe._(doctype)}</b>: "
+        + ", ".join(f"{count} {key}" for key, count in result.items())
+        for doctype, result in summary.items()
+    ]
+    return "Paperless correspondent sync finished<br>" + "<br>".join(lines)
+
+
+def sync_correspondent(doctype, docname):
+    """Background job: sync a single Customer or Supplier.
+
+    Instead of loading all correspondents only the linked one and a
+    correspondent with the expected name are looked up.
+    """
+    records = get_records(doctype, [docname])
+    if not records:
+        return None
+    record = records[0]
+    client = get_client()
+
+    correspondents = {}
+    linked_id = cint(record.get(CORRESPONDENT_ID))
+    if linked_id:
+        entry = client.get_json(f"correspondents/{linked_id}/")
+        if entry:
+            correspondents[entry["id"]] = entry["name"]
+    expected = correspondent_name(record.title, record.name)
+    if expected not in correspondents.values():
+        found = client.get_json("correspondents/", params={"name__iexact": expected})
+        for entry in (found or {}).get("results") or []:
+            correspondents.setdefault(entry["id"], entry["name"])
+
+    sync = CorrespondentSync(doctype, client)
+    result = sync.run(records, correspondents)
+    if sync.errors:
+        frappe.log_error("Paperless correspondent sync failed", "\n".join(sync.errors))
+    return result
+
+
+def enqueue_correspondent_sync(doctypes=None):
+    """Queue a full correspondent sync, at most one per doctype selection."""
+    doctypes = doctypes or list(SOURCES)
+    return frappe.enqueue(
+        sync_correspondents,
+        queue="long",
+        timeout=3600,
+        job_id=f"paperless_correspondent_sync::{','.join(doctypes)}",
+        deduplicate=True,
+        doctypes=doctypes,
+        user=frappe.session.user,
+    )
+
+
+def on_party_update(doc, method=None, *args):
+    """doc_event for Customer and Supplier (on_update, after_rename)."""
+    if not cint(frappe.db.get_single_value(SETTINGS_DOCTYPE, "sync_correspondents_on_save")):
+        return
+    if (
+        method != "after_rename"
+        and doc.get(SYNC_FLAG)
+        and doc.get(CORRESPONDENT_ID)
+        and not doc.has_value_changed(SOURCES[doc.doctype])
+    ):
+        return
+
+    frappe.enqueue(
+        sync_correspondent,
+        queue="short",
+        job_id=f"paperless_correspondent::{doc.doctype}::{doc.name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        doctype=doc.doctype,
+        docname=doc.name,
+    )
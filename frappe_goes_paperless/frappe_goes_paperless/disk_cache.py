@@ -0,0 +1,94 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import os
+import re
+import tempfile
+
+import frappe
+
+# nicht bei jedem Schreiben das ganze Verzeichnis scannen
+PRUNE_EVERY = 50
+
+
+class DiskLRUCache:
+    """Size-bounded file cache in the private files of the current site.
+
+    Every entry is one file; reading an entry refreshes its mtime, and when
+    the cache grows beyond `max_bytes` the least recently used files are
+    deleted. Several workers can share the directory: files are written to a
+    temporary name and renamed into place. Use `get_disk_cache` to get the
+    instance of a namespace, so the cache is not pruned on every first write.
+    """
+
+    def __init__(self, namespace, max_bytes):
+        self.path = frappe.get_site_path("private", "paperless_cache", namespace)
+        self.max_bytes = max_bytes
+        self._writes = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, re.sub(r"[^\w.-]", "_", str(key)))
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return content
+
+    def set(self, key, content):
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, self._file(key))
+
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 1:
+            self.prune()
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Delete least recently used entries until the cache fits `max_bytes`."""
+        entries = []
+        total = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith(".tmp-"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# eine Instanz pro Verzeichnis und Prozess, damit der Schreibzaehler erhalten bleibt
+_caches = {}
+
+
+def get_disk_cache(namespace, max_bytes):
+    """The `DiskLRUCache` of `namespace` in the current site, shared per process."""
+    path = frappe.get_site_path("private", "paperless_cache", namespace)
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = DiskLRUCache(namespace, max_bytes)
+    # die Groesse kann in den Einstellungen geaendert worden sein
+    cache.max_bytes = max_bytes
+    return cache
@@ -2,7 +2,30 @@
 # For license information, please see license.txt
 
 from frappe.model.document import Document
+from frappe.utils import cint
+
+from frappe_goes_paperless.frappe_goes_paperless.fulltext import (
+    excerpt_length,
+    get_document_fulltext,
+)
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import SOURCE_MANUAL
+
 
 class PaperlessDocument(Document):
-    pass
+    def onload(self):
+        # nur ein Auszug gespeichert -> vollstaendigen Text fuer das Formular laden
+        if not cint(self.fulltext_complete):
+            self.document_fulltext = get_document_fulltext(self)
+
+    def validate(self):
+        # den im Formular geladenen Volltext nicht zurueckschreiben
+        if not cint(self.fulltext_complete) and self.document_fulltext:
+            self.document_fulltext = self.document_fulltext[: excerpt_length()]
 
+        # im Formular geaendertes Rechnungsdatum fuer die Nachvollziehbarkeit markieren
+        if (
+            not self.is_new()
+            and not self.flags.invoice_date_resolved
+            and self.has_value_changed("invoice_date")
+        ):
+            self.invoice_date_source = SOURCE_MANUAL if self.invoice_date else None
@@ -1,4 +1,33 @@
 frappe.listview_settings['Paperless Document'] = {
+    onload: function (listview) {
+        listview.page.add_inner_button(__('Search Fulltext'), function () {
+            show_fulltext_search();
+        });
+        if (frappe.user.has_role('System Manager')) {
+            listview.page.add_inner_button(__('Sync from Paperless'), function () {
+                frappe.call({
+                    method: 'frappe_goes_paperless.frappe_goes_paperless.doctype.paperless_sync_run.paperless_sync_run.start_sync_run',
+                    callback: function (r) {
+                        if (r.message) {
+                            frappe.show_alert(__('Sync {0} started', [r.message]));
+                            poll_sync_run(r.message, listview);
+                        }
+                    }
+                });
+            });
+            listview.page.add_inner_button(__('Backfill Invoice Dates'), function () {
+                frappe.call({
+                    method: 'frappe_goes_paperless.frappe_goes_paperless.tools.enqueue_backfill',
+                    callback: function (r) {
+                        if (r.message) {
+                            frappe.show_alert(__('Invoice date backfill started'));
+                            watch_backfill(r.message, listview);
+                        }
+                    }
+                });
+            });
+        }
+    },
     get_indicator: function(doc) {
         if (doc.status === "new") {
             return [__("new"), "red", "status,=,new"];
@@ -11,3 +40,109 @@ frappe.listview_settings['Paperless Document'] = {
         }
     }
 };
+
+function poll_sync_run(sync_run, listview) {
+    frappe_goes_paperless.watch_job(sync_run, function (job) {
+        const done = frappe_goes_paperless.is_job_done(job);
+        frappe.show_progress(__('Paperless Sync'), job.done_shards, job.total_shards || 1,
+            __('{0} added, {1} updated, {2} failed', [job.added, job.updated, job.failed_documents]), done);
+        if (done) {
+            listview.refresh();
+        }
+    });
+}
+
+function watch_backfill(job_id, listview) {
+    frappe_goes_paperless.watch_job(job_id, function (job) {
+        const done = frappe_goes_paperless.is_job_done(job);
+        // Gesamtzahl unbekannt, Fortschritt in Batches
+        const batches = job.batches || 0;
+        frappe.show_progress(__('Backfill Invoice Dates'), batches, done ? batches : batches + 1,
+            __('{0} checked, {1} dates set', [job.total_seen || 0, job.total_updated || 0]), done);
+        if (done) {
+            listview.refresh();
+        }
+    });
+}
+
+function show_fulltext_search() {
+    const dialog = new frappe.ui.Dialog({
+        title: __('Search Fulltext'),
+        size: 'large',
+        fields: [
+            {
+                fieldname: 'query',
+                fieldtype: 'Data',
+                label: __('Search'),
+                description: __('All words must occur, use "quotes" for phrases')
+            },
+            {
+                fieldname: 'source',
+                fieldtype: 'Select',
+                label: __('Search in'),
+                options: [
+                    { value: 'frappe', label: __('Imported documents') },
+                    { value: 'paperless', label: __('Paperless-ngx') }
+                ],
+                default: 'frappe'
+            },
+            { fieldname: 'results', fieldtype: 'HTML' }
+        ],
+        primary_action_label: __('Search'),
+        primary_action: function (values) {
+            search(values.query, 0);
+        }
+    });
+
+    const methods = {
+        frappe: 'frappe_goes_paperless.frappe_goes_paperless.search.search_documents',
+        paperless: 'frappe_goes_paperless.frappe_goes_paperless.search.search_paperless'
+    };
+
+    function search(query, start) {
+        frappe.call({
+            method: methods[dialog.get_value('source')],
+            args: { query: query, start: start },
+            callback: function (r) {
+                render(query, r.message, start > 0);
+            }
+        });
+    }
+
+    function render(query, data, append) {
+        const $results = dialog.fields_dict.results.$wrapper;
+        if (!append) {
+            $results.empty();
+        }
+        $results.find('.paperless-search-more').remove();
+
+        if (!data.results.length && !append) {
+            $results.html(`<p class="text-muted">${__('No documents found')}</p>`);
+            return;
+        }
+        data.results.forEach(function (hit) {
+            const title = [hit.name, hit.title, hit.paperless_correspondent,
+                hit.invoice_date && frappe.datetime.str_to_user(hit.invoice_date)]
+                .filter(Boolean).map(frappe.utils.escape_html).join(' · ');
+            // noch nicht importierte Treffer der Paperless-Suche direkt in Paperless oeffnen
+            const link = hit.name
+                ? `href="/app/paperless-document/${encodeURIComponent(hit.name)}"`
+                : `href="${encodeURI(hit.paperless_url)}" target="_blank" rel="noopener"`;
+            // snippet ist serverseitig escaped, nur <mark> ist HTML
+            $results.append(`
+                <div class="paperless-search-hit" style="margin-bottom: var(--margin-md)">
+                    <a ${link}>${title}</a>
+                    <div class="text-muted small">${hit.snippet}</div>
+                </div>`);
+        });
+        if (data.has_more) {
+            $(`<button class="btn btn-default btn-xs paperless-search-more">${__('More')}</button>`)
+                .appendTo($results)
+                .on('click', function () {
+                    search(query, data.start + data.results.length);
+                });
+        }
+    }
+
+    dialog.show();
+}
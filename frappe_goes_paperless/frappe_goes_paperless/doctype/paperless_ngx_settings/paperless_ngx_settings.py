@@ -3,11 +3,22 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils.password import get_decrypted_password
-import requests
+
+from frappe_goes_paperless.frappe_goes_paperless.boot import clear_boot_config
+from frappe_goes_paperless.frappe_goes_paperless.client import (
+    clear_client,
+    get_paperless_settings,  # noqa: F401
+)
+from frappe_goes_paperless.frappe_goes_paperless.correspondents import enqueue_correspondent_sync
 
 
 class PaperlessngxSettings(Document):
+    def on_update(self):
+        # Server, Token oder Timeouts koennen sich geaendert haben
+        clear_client()
+        # Server-URL im Client (frappe.boot.paperless)
+        clear_boot_config()
+
     @frappe.whitelist()
     def sync_suppliers(self):
         sync_suppliers()
@@ -17,74 +28,15 @@ class PaperlessngxSettings(Document):
         sync_customers()
 
 
-def get_paperless_settings():
-    settings = frappe.get_doc('Paperless-ngx Settings', 'Paperless-ngx Settings')
-    api_token = get_decrypted_password(
-        doctype='Paperless-ngx Settings',
-        name='Paperless-ngx Settings',
-        fieldname='api_token',
-        raise_exception=False
-    )
-    return settings.paperless_ngx_server, api_token
-
 @frappe.whitelist()
 def sync_customers():
-    server_url, api_token = get_paperless_settings()
-    customers = frappe.get_all('Customer', fields=['name', 'customer_name'])
-
-    for customer in customers:
-        correspondent_name = f"{customer.customer_name} {customer.name}"
-        data = {
-            "name": correspondent_name,
-            "match": "",
-            "matching_algorithm": 6,
-            "owner": 3,
-            "is_insensitive": False,
-        }
+    frappe.only_for("System Manager")
+    enqueue_correspondent_sync(["Customer"])
+    frappe.msgprint("Customer sync has been queued, you will get a summary when it is finished.")
 
-        response = requests.post(
-            f"{server_url}/api/correspondents/",
-            json=data,
-            headers={
-                "Authorization": f"Token {api_token}",
-                "Content-Type": "application/json"
-            }
-        )
 
-        if response.status_code == 201:
-            # Mark sync field
-            frappe.db.set_value('Customer', customer.name, 'custom_synced_to_paperlessngx', 1)
-            frappe.msgprint(f"Synced: {correspondent_name}")
-        else:
-            frappe.msgprint(f"Error on sync customer {customer.name}: {response.text}")
-            
 @frappe.whitelist()
 def sync_suppliers():
-    server_url, api_token = get_paperless_settings()
-    suppliers = frappe.get_all('Supplier', fields=['name', 'supplier_name'])
-
-    for supplier in suppliers:
-        correspondent_name = f"{supplier.supplier_name} {supplier.name}"
-        data = {
-            "name": correspondent_name,
-            "match": "",
-            "matching_algorithm": 6,
-            "owner": 3,
-            "is_insensitive": False,
-        }
-
-        response = requests.post(
-            f"{server_url}/api/correspondents/",
-            json=data,
-            headers={
-                "Authorization": f"Token {api_token}",
-                "Content-Type": "application/json"
-            }
-        )
-
-        if response.status_code == 201:
-            # Mark sync field
-            frappe.db.set_value('Supplier', supplier.name, 'custom_synced_to_paperlessngx', 1)
-            frappe.msgprint(f"Synced: {correspondent_name}")
-        else:
-            frappe.msgprint(f"Error on sync supplier {supplier.name}: {response.text}")
+    frappe.only_for("System Manager")
+    enqueue_correspondent_sync(["Supplier"])
+    frappe.msgprint("Supplier sync has been queued, you will get a summary when it is finished.")
@@ -0,0 +1,8 @@
+// Copyright (c) 2024, itsdave GmbH and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Paperless Sync Run", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,299 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE
+from frappe_goes_paperless.frappe_goes_paperless.metrics import merge_summaries
+from frappe_goes_paperless.frappe_goes_paperless.progress import publish_progress
+from frappe_goes_paperless.frappe_goes_paperless.tools import (
+    count_documents,
+    get_missing_document_ids,
+    get_paperless_high_water_mark,
+    get_paperless_ids,
+    get_sync_cursor,
+    set_sync_cursor,
+    sync_document_ids,
+    sync_documents,
+)
+
+# Laeufe, die so lange "Running" sind, gelten als abgebrochen (Worker-Neustart o.ae.)
+STALE_AFTER_HOURS = 12
+# Redis-Lock um Pruefung und Anlage eines Laufs (Sekunden)
+START_LOCK_KEY = "paperless_sync_run_start"
+START_LOCK_TIMEOUT = 60
+
+STATUS_MAP = {
+    "Queued": "queued",
+    "Running": "started",
+    "Completed": "finished",
+    "Partially Failed": "finished",
+    "Failed": "failed",
+}
+
+
+class PaperlessSyncRun(Document):
+    pass
+
+
+def get_active_sync_run():
+    """Return the name of a queued or running sync run, if any."""
+    stale_before = add_to_date(now_datetime(), hours=-STALE_AFTER_HOURS)
+    return frappe.db.get_value(
+        "Paperless Sync Run",
+        {
+            "status": ["in", ["Queued", "Running"]],
+            "creation": [">", stale_before],
+        },
+        "name",
+    )
+
+
+@frappe.whitelist()
+def start_sync_run(full=False):
+    """Start a document sync (System Manager only), see `create_sync_run`."""
+    frappe.only_for("System Manager")
+    return create_sync_run(full)
+
+
+def create_sync_run(full=False):
+    """Create a Paperless Sync Run and enqueue its planning on the `long` queue.
+
+    At most one run is queued or running: the check and the insert happen
+    under a Redis lock, so parallel clicks or the scheduler cannot start a
+    second run. Returns the name of the new or the already active run.
+    """
+    cache = frappe.cache()
+    with cache.lock(
+        cache.make_key(START_LOCK_KEY), timeout=START_LOCK_TIMEOUT, blocking_timeout=START_LOCK_TIMEOUT
+    ):
+        active = get_active_sync_run()
+        if active:
+            return active
+
+        run = frappe.new_doc("Paperless Sync Run")
+        run.status = "Queued"
+        run.started_at = now_datetime()
+        run.sync_type = "Full" if cint(full) or not get_sync_cursor() else "Incremental"
+        run.insert(ignore_permissions=True)
+        # vor dem Freigeben sichtbar machen, sonst sieht der naechste Aufruf den Lauf nicht
+        frappe.db.commit()
+
+    frappe.enqueue(plan_sync_run, queue="long", timeout=3600, sync_run=run.name)
+    return run.name
+
+
+def plan_sync_run(sync_run):
+    """Background job: split a sync run into shards and enqueue them.
+
+    A full sync splits the missing Paperless IDs into shards of
+    `sync_shard_size` documents, an incremental sync runs as a single shard.
+    """
+    run = frappe.get_doc("Paperless Sync Run", sync_run)
+    try:
+        if run.sync_type == "Full":
+            # Stand merken, bevor die vollstaendige Liste geholt wird
+            run.high_water_mark = get_paperless_high_water_mark()
+            ids = sorted(get_missing_document_ids(get_paperless_ids() or []))
+            shard_size = cint(frappe.db.get_single_value(SETTINGS_DOCTYPE, "sync_shard_size")) or 1000
+            shards = [ids[i: i + shard_size] for i in range(0, len(ids), shard_size)]
+            run.total_documents = len(ids)
+        else:
+            # None = alle seit dem Cursor geaenderten Dokumente
+            shards = [None]
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(f"Paperless sync run {sync_run} could not be planned")
+        frappe.db.set_value(
+            "Paperless Sync Run", sync_run, {"status": "Failed", "finished_at": now_datetime()}
+        )
+        _publish_progress(sync_run)
+        frappe.db.commit()
+        raise
+
+    for shard_no, ids in enumerate(shards, 1):
+        run.append(
+            "shards",
+            {"shard_no": shard_no, "status": "Queued", "document_count": len(ids or [])},
+        )
+    run.total_shards = len(shards)
+    run.save(ignore_permissions=True)
+
+    if not shards:
+        _finish_run(run.name)
+        _publish_progress(run.name)
+    frappe.db.commit()
+
+    for row, ids in zip(run.shards, shards):
+        job = frappe.enqueue(
+            run_sync_shard,
+            queue="long",
+            timeout=3600,
+            sync_run=run.name,
+            shard=row.name,
+            ids=ids,
+        )
+        frappe.db.set_value("Paperless Sync Run Shard", row.name, "job_id", job.id if job else None)
+    frappe.db.commit()
+
+
+def run_sync_shard(sync_run, shard, ids=None):
+    """Background job: import one shard and update the run summary."""
+    frappe.db.set_value("Paperless Sync Run Shard", shard, "status", "Running")
+    frappe.db.set_value(
+        "Paperless Sync Run", {"name": sync_run, "status": "Queued"}, "status", "Running"
+    )
+    _publish_progress(sync_run)
+    frappe.db.commit()
+
+    result, error = None, None
+    with metrics.collect() as shard_metrics:
+        try:
+            if ids is None:
+                result = sync_documents() or None
+            else:
+                result = sync_document_ids(ids)
+                count_documents(result)
+        except Exception:
+            frappe.db.rollback()
+            error = frappe.get_traceback()
+            frappe.log_error(f"Paperless sync shard {shard} of {sync_run} failed", error)
+        summary = shard_metrics.summary()
+
+    _finish_shard(sync_run, shard, result or {}, error, summary)
+
+
+def _finish_shard(sync_run, shard, result, error=None, summary=None):
+    shard_failed = bool(error)
+    frappe.db.set_value(
+        "Paperless Sync Run Shard",
+        shard,
+        {
+            "status": "Failed" if shard_failed else "Completed",
+            "added": result.get("added", 0),
+            "updated": result.get("updated", 0),
+            "failed": result.get("failed", 0),
+            "error": error,
+            "metrics": frappe.as_json(summary) if summary else None,
+        },
+    )
+    # Zaehler atomar hochzaehlen, die Shards laufen parallel
+    frappe.db.sql(
+        """
+        update `tabPaperless Sync Run`
+        set completed_shards = completed_shards + %(completed)s,
+            failed_shards = failed_shards + %(failed_shard)s,
+            added = added + %(added)s,
+            updated = updated + %(updated)s,
+            failed_documents = failed_documents + %(failed)s
+        where name = %(name)s
+        """,
+        {
+            "name": sync_run,
+            "completed": 0 if shard_failed else 1,
+            "failed_shard": 1 if shard_failed else 0,
+            "added": result.get("added", 0),
+            "updated": result.get("updated", 0),
+            "failed": result.get("failed", 0),
+        },
+    )
+    run = frappe.db.get_value(
+        "Paperless Sync Run",
+        sync_run,
+        ["total_shards", "completed_shards", "failed_shards"],
+        as_dict=True,
+        for_update=True,
+    )
+    if run.completed_shards + run.failed_shards >= run.total_shards:
+        _finish_run(sync_run)
+    _publish_progress(sync_run)
+    frappe.db.commit()
+
+
+def _publish_progress(sync_run):
+    # nur an den Benutzer, der den Lauf gestartet hat, nicht an alle Sessions
+    owner = frappe.db.get_value("Paperless Sync Run", sync_run, "owner")
+    publish_progress(sync_run, get_sync_run_status(sync_run), user=owner)
+
+
+def _finish_run(sync_run):
+    run = frappe.db.get_value(
+        "Paperless Sync Run",
+        sync_run,
+        ["sync_type", "high_water_mark", "total_shards", "failed_shards", "failed_documents"],
+        as_dict=True,
+    )
+    if run.total_shards and run.failed_shards >= run.total_shards:
+        status = "Failed"
+    elif run.failed_shards or run.failed_documents:
+        status = "Partially Failed"
+    else:
+        status = "Completed"
+        # der inkrementelle Lauf setzt den Cursor selbst
+        if run.sync_type == "Full" and run.high_water_mark:
+            set_sync_cursor(run.high_water_mark)
+
+    shard_metrics = frappe.get_all(
+        "Paperless Sync Run Shard",
+        filters={"parent": sync_run, "metrics": ["is", "set"]},
+        pluck="metrics",
+    )
+    frappe.db.set_value(
+        "Paperless Sync Run",
+        sync_run,
+        {
+            "status": status,
+            "finished_at": now_datetime(),
+            "metrics": frappe.as_json(merge_summaries(json.loads(m) for m in shard_metrics)),
+        },
+    )
+
+
+def get_sync_run_status(sync_run):
+    """Aggregate progress of a sync run in the format of `tools.job_status`."""
+    run = frappe.db.get_value(
+        "Paperless Sync Run",
+        sync_run,
+        [
+            "status",
+            "total_shards",
+            "completed_shards",
+            "failed_shards",
+            "total_documents",
+            "added",
+            "updated",
+            "failed_documents",
+        ],
+        as_dict=True,
+    )
+    if not run:
+        return None
+    run.run_status = run.status
+    run.status = STATUS_MAP.get(run.run_status)
+    run.done_shards = run.completed_shards + run.failed_shards
+    return run
+
+
+def scheduled_sync():
+    """Scheduler entry point: start a sync run when `sync_interval` has passed."""
+    settings = frappe.get_cached_doc(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE)
+    if not cint(settings.get("auto_sync")) or not settings.paperless_ngx_server:
+        return
+    if get_active_sync_run():
+        return
+
+    last_run = frappe.get_all(
+        "Paperless Sync Run", fields=["started_at"], order_by="creation desc", limit=1
+    )
+    interval = cint(settings.get("sync_interval")) or 60
+    if last_run and get_datetime(last_run[0].started_at) > add_to_date(
+        now_datetime(), minutes=-interval
+    ):
+        return
+
+    create_sync_run()
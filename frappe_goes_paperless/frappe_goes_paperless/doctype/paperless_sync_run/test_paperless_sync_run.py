@@ -0,0 +1,97 @@
+# Copyright (c) 2024, itsdave GmbH and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from frappe_goes_paperless.frappe_goes_paperless.doctype.paperless_sync_run import paperless_sync_run
+from frappe_goes_paperless.frappe_goes_paperless.doctype.paperless_sync_run.paperless_sync_run import (
+	get_sync_run_status,
+	start_sync_run,
+)
+from frappe_goes_paperless.frappe_goes_paperless.metrics import BUCKETS, merge_summaries
+
+
+def stage(count, total, max, bucket):
+	buckets = [0] * (len(BUCKETS) + 1)
+	buckets[bucket] = count
+	return {"count": count, "sum": total, "max": max, "buckets": buckets}
+
+
+class TestPaperlessSyncRun(FrappeTestCase):
+	def test_merge_summaries(self):
+		merged = merge_summaries(
+			[
+				{
+					"duration": 3.0,
+					"http_bytes": 100,
+					"http": {"GET 200": 2},
+					"items": {"documents_added": 5},
+					"stages": {"fetch": stage(2, 0.2, 0.15, 4)},
+				},
+				{
+					"duration": 5.0,
+					"http_bytes": 50,
+					"http": {"GET 200": 1, "GET 500": 1},
+					"errors": {"save": 1},
+					"stages": {"fetch": stage(2, 0.6, 0.4, 6), "save": stage(1, 0.01, 0.01, 1)},
+				},
+			]
+		)
+		# Shards laufen parallel: Dauer ist die des laengsten
+		self.assertEqual(merged["duration"], 5.0)
+		self.assertEqual(merged["http_bytes"], 150)
+		self.assertEqual(merged["http"], {"GET 200": 3, "GET 500": 1})
+		self.assertEqual(merged["items"], {"documents_added": 5})
+		self.assertEqual(merged["errors"], {"save": 1})
+		fetch = merged["stages"]["fetch"]
+		self.assertEqual((fetch["count"], fetch["sum"], fetch["max"], fetch["avg"]), (4, 0.8, 0.4, 0.2))
+		self.assertEqual(sum(fetch["buckets"]), 4)
+		self.assertEqual(fetch["p95"], BUCKETS[6])
+		self.assertEqual(merged["stages"]["save"]["count"], 1)
+
+	def test_get_sync_run_status(self):
+		run = frappe.get_doc(
+			{
+				"doctype": "Paperless Sync Run",
+				"sync_type": "Full",
+				"status": "Running",
+				"total_shards": 3,
+				"completed_shards": 1,
+				"failed_shards": 1,
+				"added": 10,
+			}
+		).insert(ignore_permissions=True)
+		self.addCleanup(frappe.delete_doc, "Paperless Sync Run", run.name, force=True)
+
+		status = get_sync_run_status(run.name)
+		self.assertEqual(status.status, "started")
+		self.assertEqual(status.run_status, "Running")
+		self.assertEqual(status.done_shards, 2)
+		self.assertEqual(status.added, 10)
+
+		frappe.db.set_value("Paperless Sync Run", run.name, "status", "Partially Failed")
+		self.assertEqual(get_sync_run_status(run.name).status, "finished")
+		self.assertIsNone(get_sync_run_status("does-not-exist"))
+
+	def test_start_sync_run(self):
+		frappe.db.delete("Paperless Sync Run", {"status": ["in", ["Queued", "Running"]]})
+		with patch("frappe.enqueue") as enqueue, patch.object(
+			paperless_sync_run, "get_sync_cursor", return_value="2024-01-01T00:00:00Z"
+		):
+			name = start_sync_run()
+			# zweiter Klick startet keinen weiteren Lauf
+			self.assertEqual(start_sync_run(), name)
+		self.addCleanup(frappe.delete_doc, "Paperless Sync Run", name, force=True)
+
+		self.assertEqual(enqueue.call_count, 1)
+		self.assertEqual(enqueue.call_args.kwargs["sync_run"], name)
+		run = frappe.get_doc("Paperless Sync Run", name)
+		self.assertEqual((run.status, run.sync_type), ("Queued", "Incremental"))
+
+	def test_start_sync_run_needs_system_manager(self):
+		frappe.set_user("Guest")
+		self.addCleanup(frappe.set_user, "Administrator")
+		self.assertRaises(frappe.PermissionError, start_sync_run)
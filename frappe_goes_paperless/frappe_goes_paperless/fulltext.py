@@ -0,0 +1,97 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import hashlib
+import zlib
+
+import frappe
+import requests
+from frappe.utils import cint
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE, get_client
+from frappe_goes_paperless.frappe_goes_paperless.disk_cache import get_disk_cache
+
+DEFAULT_EXCERPT_LENGTH = 2000
+DEFAULT_CACHE_SIZE_MB = 100
+
+
+def stores_excerpt():
+    """True if only an excerpt of the OCR text is stored at import."""
+    return frappe.get_cached_doc(SETTINGS_DOCTYPE).get("fulltext_storage") == "Excerpt"
+
+
+def excerpt_length():
+    return (
+        cint(frappe.get_cached_doc(SETTINGS_DOCTYPE).get("fulltext_excerpt_length"))
+        or DEFAULT_EXCERPT_LENGTH
+    )
+
+
+def content_hash(content):
+    return hashlib.sha256((content or "").encode()).hexdigest()
+
+
+def set_fulltext(doc, content, excerpt=None):
+    """Store `content` (or an excerpt of it) on a Paperless Document.
+
+    Hash and length always describe the complete text, so changes can be
+    detected without storing it.
+    """
+    if excerpt is None:
+        excerpt = stores_excerpt()
+    content = content or ""
+    length = excerpt_length()
+
+    doc.fulltext_hash = content_hash(content)
+    doc.fulltext_length = len(content)
+    doc.fulltext_complete = 0 if excerpt and len(content) > length else 1
+    doc.document_fulltext = content if doc.fulltext_complete else content[:length]
+
+
+def get_fulltext_cache():
+    size_mb = (
+        cint(frappe.db.get_single_value(SETTINGS_DOCTYPE, "fulltext_cache_size")) or DEFAULT_CACHE_SIZE_MB
+    )
+    return get_disk_cache("fulltext", size_mb * 1024 * 1024)
+
+
+def get_document_fulltext(doc):
+    """Return the complete OCR text of a Paperless Document.
+
+    Stored texts are returned directly; for excerpts the text is read from a
+    compressed local cache, or fetched from Paperless-ngx and cached. If
+    Paperless-ngx cannot be reached, the stored excerpt is returned.
+    """
+    if cint(doc.get("fulltext_complete")) or not doc.get("fulltext_hash"):
+        return doc.get("document_fulltext")
+
+    cache = get_fulltext_cache()
+    # der Hash im Schluessel macht veraltete Eintraege unerreichbar
+    key = f"{cint(doc.paperless_document_id)}-{doc.fulltext_hash[:16]}.z"
+    cached = cache.get(key)
+    if cached is not None:
+        return zlib.decompress(cached).decode()
+
+    try:
+        response = get_client().get_json(f"documents/{cint(doc.paperless_document_id)}/")
+    except requests.RequestException as e:
+        frappe.logger("paperless").warning(
+            f"Fulltext of Paperless document {doc.paperless_document_id} not available: {e}"
+        )
+        response = None
+    if not response:
+        # Paperless nicht erreichbar: lieber den Auszug als gar nichts
+        return doc.get("document_fulltext")
+
+    content = response["content"] or ""
+    if content_hash(content) == doc.fulltext_hash:
+        cache.set(key, zlib.compress(content.encode()))
+    return content
+
+
+@frappe.whitelist()
+def get_fulltext(name):
+    """Complete OCR text of a Paperless Document, e.g. for AI workflows."""
+    doc = frappe.get_doc("Paperless Document", name)
+    doc.check_permission("read")
+    return get_document_fulltext(doc)
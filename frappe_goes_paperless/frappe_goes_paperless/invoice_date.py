@@ -0,0 +1,375 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Rechnungsdatum aus OCR-Volltexten ziehen.
+
+Reines Python ohne frappe-Import, damit die Erkennung auch in
+Worker-Prozessen (Backfill) und ohne Site getestet werden kann.
+"""
+
+import re
+from bisect import bisect_left
+from datetime import date
+
+# hochzaehlen, wenn sich das Ergebnis der Erkennung aendert (Regeln, Keywords, ...):
+# der Backfill liest dann alle Dokumente erneut, die mit einer aelteren Version geprueft wurden
+EXTRACTOR_VERSION = 1
+
+MONTH_NAME_MAP = {
+    # Deutsch
+    "januar": "01", "jan": "01", "jan.": "01",
+    "februar": "02", "feb": "02", "feb.": "02",
+    "märz": "03", "maerz": "03", "mrz": "03", "mrz.": "03",
+    "april": "04", "apr": "04", "apr.": "04",
+    "mai": "05",
+    "juni": "06", "jun": "06", "jun.": "06",
+    "juli": "07", "jul": "07", "jul.": "07",
+    "august": "08", "aug": "08", "aug.": "08",
+    "september": "09", "sep": "09", "sep.": "09", "sept": "09", "sept.": "09",
+    "oktober": "10", "okt": "10", "okt.": "10",
+    "november": "11", "nov": "11", "nov.": "11",
+    "dezember": "12", "dez": "12", "dez.": "12",
+
+    # Englisch
+    "january": "01",
+    "february": "02",
+    "march": "03",
+    "april": "04",
+    "may": "05",
+    "june": "06",
+    "july": "07",
+    "august": "08",
+    "september": "09",
+    "october": "10", "oct": "10", "oct.": "10",
+    "november": "11",
+    "december": "12", "dec": "12", "dec.": "12",
+}
+
+# Keywords, nach denen wir bevorzugt in der Nähe suchen (Reihenfolge = Priorität)
+KEYWORDS = (
+    "rechnungsdatum",
+    "quittungsdatum",
+    "invoice date",
+    "belegdatum",
+    "rechnung vom",
+    "due",
+    "datum",
+)
+
+# so viele Zeichen hinter einem Keyword werden nach einem Datum durchsucht
+SNIPPET_LENGTH = 200
+
+MIN_PLAUSIBLE_DATE = date(2010, 1, 1)
+
+# Muster
+_NUMERIC = r"\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4}\.?"  # 20.10.25.
+_ISO = r"\d{4}-\d{2}-\d{2}"                        # 2025-11-05
+
+NUMERIC_PATTERN = re.compile(_NUMERIC)
+ISO_PATTERN = re.compile(_ISO)
+_NUMERIC_SEPARATOR = re.compile(r"[.\-/]")
+_DECIMAL_COMMA = re.compile(r"(?<=\d),(?=\d)")
+
+# Regex-Baustein für alle bekannten Monatsnamen
+_MONTH_ALTERNATIVES = "|".join(re.escape(m) for m in MONTH_NAME_MAP)
+# Variante 1: 14 oktober 2025
+DAY_MONTH_YEAR_PATTERN = re.compile(
+    rf"(\d{{1,2}})\s+({_MONTH_ALTERNATIVES})\s+(\d{{2,4}})"
+)
+# Variante 2: october 14 2025  / october 14, 2025
+MONTH_DAY_YEAR_PATTERN = re.compile(
+    rf"({_MONTH_ALTERNATIVES})\s+(\d{{1,2}})\s+(\d{{2,4}})"
+)
+# Satzzeichen / Trenner in Spaces umwandeln
+_MONTH_PUNCTUATION = str.maketrans({ch: " " for ch in ",;()|-/."})
+# Der Text ist schon kleingeschrieben; re.IGNORECASE würde darüber hinaus
+# nur noch diese beiden Zeichen den Monatsnamen gleichsetzen. Statt des
+# (sehr langsamen) IGNORECASE-Musters wird auf einer Kopie mit ersetzten
+# Zeichen gesucht, der Monatsname aber aus dem Original gelesen.
+_CASE_FOLD = str.maketrans({"ı": "i", "ſ": "s"})
+
+# Ein Durchlauf über den (kleingeschriebenen) Text findet alle Keywords und
+# alle Abschnitte aus Ziffern und Trennern, in denen ein Datum stehen kann.
+# Datumsmuster werden danach nur noch auf diese kurzen Abschnitte angewendet.
+# längste zuerst, damit kein Keyword ein längeres mit gleichem Anfang verdeckt
+_KEYWORD_ALTERNATIVES = "|".join(re.escape(kw) for kw in sorted(KEYWORDS, key=len, reverse=True))
+_CANDIDATE = r"\d[\d.\-/]{4,}"
+_SCAN = re.compile(rf"(?P<kw>{_KEYWORD_ALTERNATIVES})|(?P<run>{_CANDIDATE})")
+_KEYWORD_SCAN = re.compile(_KEYWORD_ALTERNATIVES)
+_CANDIDATE_SCAN = re.compile(_CANDIDATE)
+
+# Keywords, die ein anderes Keyword enthalten ("rechnungsdatum" -> "datum"):
+# der Scan verbraucht das längere, die Position des enthaltenen wird abgeleitet
+_EMBEDDED_KEYWORDS = {
+    kw: [(other, kw.index(other)) for other in KEYWORDS if other != kw and other in kw]
+    for kw in KEYWORDS
+}
+# ein Keyword, das in einem anderen beginnt und darüber hinausragt, fände der
+# Scan nicht - das darf es in KEYWORDS nicht geben
+assert not any(
+    a[-i:] == b[:i]
+    for a in KEYWORDS for b in KEYWORDS for i in range(1, min(len(a), len(b)))
+), "overlapping KEYWORDS"
+
+
+def _to_date(year, month, day):
+    # wie frappe.utils.getdate: ungültige Daten -> None, 0001-01-01 gilt als leer
+    try:
+        parsed = date(year, month, day)
+    except ValueError:
+        return None
+    return None if parsed == date.min else parsed
+
+
+def _is_plausible(d):
+    return d is not None and d >= MIN_PLAUSIBLE_DATE
+
+
+def parse_date_with_month_name(text: str):
+    """Parst Datumsangaben mit ausgeschriebenem Monat (de/en).
+
+    Beispiele:
+    - '30 Oktober 2025'
+    - 'October 14, 2025'
+    - 'Invoice Date Oct 25, 2025'
+    """
+
+    if not text:
+        return None
+
+    # aus mehreren Whitespaces eins machen
+    s = " ".join(text.lower().translate(_MONTH_PUNCTUATION).split())
+    folded = s.translate(_CASE_FOLD)
+
+    m = DAY_MONTH_YEAR_PATTERN.search(folded)
+    if m:
+        day, year = m.group(1, 3)
+        month_name = s[m.start(2): m.end(2)]
+    else:
+        m = MONTH_DAY_YEAR_PATTERN.search(folded)
+        if not m:
+            return None
+        day, year = m.group(2, 3)
+        month_name = s[m.start(1): m.end(1)]
+
+    month = MONTH_NAME_MAP.get(month_name)
+    if not month:
+        return None
+
+    day = int(day)
+    if not (1 <= day <= 31):
+        return None
+
+    # zwei-stellige Jahre -> 20xx
+    if len(year) == 2:
+        year = "20" + year
+
+    return _to_date(int(year), int(month), day)
+
+
+def _parse_numeric(raw: str):
+    # Punkt am Ende abschneiden, z. B. 20.10.25.
+    d, m, y = _NUMERIC_SEPARATOR.split(raw.strip().rstrip("."))
+    y = 2000 + int(y) if len(y) == 2 else int(y)
+    return _to_date(y, int(m), int(d))
+
+
+def _parse_iso(raw: str):
+    y, m, d = raw.split("-")
+    return _to_date(int(y), int(m), int(d))
+
+
+class _Scan:
+    """Keyword-Positionen und Datumsabschnitte eines normalisierten Textes."""
+
+    def __init__(self, normalized, lower):
+        self.text = normalized
+        self.keywords = {}
+        # (start, end) der Abschnitte aus Ziffern und Trennern
+        self.runs = []
+        self._numeric = {}
+
+        if len(lower) == len(normalized):
+            # lower() hat keine Zeichen verlängert -> Positionen sind identisch
+            for m in _SCAN.finditer(lower):
+                if m.lastgroup == "run":
+                    self.runs.append(m.span())
+                else:
+                    self._add_keyword(m)
+        else:
+            for m in _KEYWORD_SCAN.finditer(lower):
+                self._add_keyword(m)
+            self.runs = [m.span() for m in _CANDIDATE_SCAN.finditer(normalized)]
+
+    def _add_keyword(self, m):
+        kw = m.group()
+        self.keywords.setdefault(kw, m.start())
+        for other, offset in _EMBEDDED_KEYWORDS[kw]:
+            self.keywords.setdefault(other, m.start() + offset)
+
+    def _runs_in(self, start, end):
+        i = bisect_left(self.runs, (start,))
+        # ein Abschnitt kann vor `start` beginnen und hineinragen
+        if i and self.runs[i - 1][1] > start:
+            i -= 1
+        for run in self.runs[i:]:
+            if run[0] >= end:
+                break
+            yield run
+
+    def numeric_dates(self, start, end):
+        """Numerische Datumsangaben in text[start:end], wie findall() auf dem Ausschnitt."""
+        for run in self._runs_in(start, end):
+            rs, re_ = run
+            if start <= rs and re_ <= end:
+                # ganzer Abschnitt im Ausschnitt -> Ergebnis wiederverwenden
+                found = self._numeric.get(run)
+                if found is None:
+                    found = self._numeric[run] = NUMERIC_PATTERN.findall(self.text, rs, re_)
+                yield from found
+            else:
+                # angeschnittener Abschnitt: so suchen, als wäre der Text dort zu Ende
+                yield from NUMERIC_PATTERN.findall(self.text, max(rs, start), min(re_, end))
+
+    def first_iso_date(self, start, end):
+        """Erstes ISO-Datum in text[start:end]."""
+        for rs, re_ in self._runs_in(start, end):
+            m = ISO_PATTERN.search(self.text, max(rs, start), min(re_, end))
+            if m:
+                return m.group()
+        return None
+
+
+def _first_plausible(scan, start, end):
+    # numerische Formate (20.10.25., 20-10-2025)
+    for raw in scan.numeric_dates(start, end):
+        parsed = _parse_numeric(raw)
+        if _is_plausible(parsed):
+            return parsed
+
+    # ISO (2025-11-05), nur der erste Treffer zählt
+    raw = scan.first_iso_date(start, end)
+    if raw:
+        parsed = _parse_iso(raw)
+        if _is_plausible(parsed):
+            return parsed
+
+    return None
+
+
+def extract_invoice_date_from_text(text: str):
+    """Einfache, robuste Datumserkennung für Rechnungen/Quittungen.
+
+    Strategie:
+    1. Suche nach 'Rechnungsdatum', 'Quittungsdatum', 'Invoice Date',
+       'due', 'Belegdatum', 'Datum', usw. und nimm das erste Datum danach.
+    2. Falls dort nichts gefunden wird: nimm das erste plausible Datum im Text.
+
+    Keywords und Datumsabschnitte werden in einem Durchlauf über den Text
+    gesammelt; danach wird nur noch in diesen Abschnitten gesucht.
+    """
+
+    if not text:
+        return None
+
+    # Normalisieren
+    normalized = _DECIMAL_COMMA.sub(".", " ".join(text.split()))
+    scan = _Scan(normalized, normalized.lower())
+
+    # 1) Erst in der Nähe der Keywords suchen
+    for kw in KEYWORDS:
+        idx = scan.keywords.get(kw)
+        if idx is None:
+            continue
+        end = idx + SNIPPET_LENGTH
+
+        parsed = _first_plausible(scan, idx, end)
+        if parsed:
+            return parsed
+
+        # ausgeschriebener Monat in der Nähe (October 14, 2025 / 30 Oktober 2025)
+        parsed = parse_date_with_month_name(normalized[idx:end])
+        if _is_plausible(parsed):
+            return parsed
+
+    # 2) + 3) Fallback: irgendwo im Text numerisch, dann ISO
+    parsed = _first_plausible(scan, 0, len(normalized))
+    if parsed:
+        return parsed
+
+    # 4) Fallback: ausgeschriebene Monate irgendwo im Text
+    parsed = parse_date_with_month_name(normalized)
+    if _is_plausible(parsed):
+        return parsed
+
+    return None
+
+
+# Herkunft des Rechnungsdatums (Paperless Document.invoice_date_source)
+SOURCE_CUSTOM_FIELD = "Custom Field"
+SOURCE_CREATED = "Created"
+SOURCE_FULLTEXT = "Fulltext"
+SOURCE_MANUAL = "Manual"
+METADATA_SOURCES = (SOURCE_CUSTOM_FIELD, SOURCE_CREATED)
+
+# Wie sicher `created` aus Paperless das Rechnungsdatum ist
+CREATED_UNSURE = 0      # gleich dem Eingangsdatum: Paperless hat keins erkannt und das Datei-/Eingangsdatum genommen
+CREATED_DIFFERS = 1     # vom Eingangsdatum verschieden, also von Paperless im Dokument erkannt
+CREATED_IN_TEXT = 2     # steht so auch im Volltext
+
+
+def _payload_date(value):
+    # "2024-03-12" oder "2024-03-12T00:00:00+01:00" (lokales Datum vorne)
+    if not value:
+        return None
+    raw = str(value).strip()[:10]
+    try:
+        if ISO_PATTERN.fullmatch(raw):
+            return _parse_iso(raw)
+        if NUMERIC_PATTERN.fullmatch(raw):
+            return _parse_numeric(raw)
+    except ValueError:
+        return None
+    return None
+
+
+def created_date_confidence(created, added=None, text=""):
+    """Rate how likely the Paperless `created` date is the invoice date.
+
+    Returns one of `CREATED_UNSURE`, `CREATED_DIFFERS`, `CREATED_IN_TEXT`.
+    The text is only searched for the literal date, not parsed.
+    """
+    if not _is_plausible(created):
+        return CREATED_UNSURE
+    if text:
+        for fmt in ("%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%y"):
+            if created.strftime(fmt) in text:
+                return CREATED_IN_TEXT
+    if added is None or created != added:
+        return CREATED_DIFFERS
+    return CREATED_UNSURE
+
+
+def invoice_date_from_metadata(payload, custom_field=None, min_created_confidence=None):
+    """Invoice date from the structured metadata of a Paperless document payload.
+
+    Tries the custom field with the ID `custom_field`, then `created` if its
+    `created_date_confidence` reaches `min_created_confidence` (None: never).
+    Returns `(date, source)` or None, in which case the text has to be parsed.
+    """
+    if custom_field is not None:
+        for entry in payload.get("custom_fields") or ():
+            if entry.get("field") == custom_field:
+                parsed = _payload_date(entry.get("value"))
+                if _is_plausible(parsed):
+                    return parsed, SOURCE_CUSTOM_FIELD
+
+    if min_created_confidence is not None:
+        created = _payload_date(payload.get("created"))
+        confidence = created_date_confidence(
+            created, _payload_date(payload.get("added")), payload.get("content") or ""
+        )
+        # fehlendes/unplausibles created -> Volltext, auch bei "Always"
+        if _is_plausible(created) and confidence >= min_created_confidence:
+            return created, SOURCE_CREATED
+    return None
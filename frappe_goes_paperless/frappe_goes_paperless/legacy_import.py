@@ -0,0 +1,419 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Import of the legacy Inoxision archive into Paperless-ngx.
+
+The archive is a directory of `<name>.json` metadata files, each next to
+`<name>.pdf`. Files are read one at a time while walking the directory,
+uploaded to `documents/post_document/` by a bounded thread pool, and the
+returned consumption tasks are polled in batches. Once a task has produced
+a document, the mapped metadata is written to its custom fields.
+
+Every step is appended to a checkpoint file, so an interrupted import
+continues where it stopped. Run it with
+`bench --site <site> paperless-import-legacy <directory>`.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import frappe
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+from frappe_goes_paperless.frappe_goes_paperless.client import build_client
+from frappe_goes_paperless.frappe_goes_paperless.pipeline import ImportPipeline
+
+# Paperless Custom Field -> Feld im Inoxision-JSON
+FIELD_MAPPING = {
+    "Belegdatum": "BelegDatum",
+    "Belegnummer": "BelegNr",
+    "Ausgeblendet": "isHidden",
+    "Richtung": "Richtung",
+    "Belegart": "Belegart",
+    "Konto": "Erlöskonto",
+    "Zahlstatus": "ZahlStatus",
+    "Zahlungsart": "Zahlungsart",
+    "Zahltage": "Zahltage",
+    "Steuer-Betrag": "Ust",
+    "Netto-Betrag": "NettoBeleg",
+    "Adress-Ort": "AdressOrt",
+    "Adress-PLZ": "AdressPLZ",
+    "Adress-Name": "AdressName",
+    "Inoxision UID": "UID",
+    "Inoxision Erstelldatum": "CreationDate",
+    "Inoxision Archivar": "Username",
+}
+
+# (Richtung, Belegart) -> Paperless-Dokumenttyp
+DOCUMENT_TYPES = {
+    ("eingehend", "Rechnung"): "Eingangsrechnung",
+    ("ausgehend", "Rechnung"): "Ausgangsrechnung",
+}
+
+DEFAULT_WORKERS = 8
+# so viele offene Tasks werden gesammelt, bevor Paperless gefragt wird
+DEFAULT_POLL_BATCH = 200
+DEFAULT_POLL_INTERVAL = 10
+# Paperless speichert String-Felder mit max. 128 Zeichen
+MAX_FIELD_LENGTH = 128
+# Uploads dauern laenger als normale API-Aufrufe
+UPLOAD_READ_TIMEOUT = 300
+
+_DATE_FORMATS = ("%d.%m.%Y", "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S")
+
+
+def document_type(data):
+    return DOCUMENT_TYPES.get((data.get("Richtung"), data.get("Belegart")))
+
+
+def map_metadata(data):
+    """Paperless custom field values for one Inoxision JSON record."""
+    return {
+        field: data[json_field]
+        for field, json_field in FIELD_MAPPING.items()
+        if data.get(json_field) not in (None, "")
+    }
+
+
+def parse_legacy_date(value):
+    """Inoxision date (`28.02.2019`, `2019-02-28`, optionally with time) as ISO date."""
+    value = str(value or "").strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def iter_legacy_documents(directory):
+    """Yield `(key, json_path, pdf_path)` for every metadata file below `directory`.
+
+    Directories are read entry by entry with `os.scandir`, so a flat archive
+    with hundreds of thousands of files is never listed in memory. `pdf_path`
+    is None if there is no PDF next to the JSON file.
+    """
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                    continue
+                stem, ext = os.path.splitext(entry.path)
+                if ext.lower() != ".json":
+                    continue
+                pdf_path = next((p for p in (f"{stem}.pdf", f"{stem}.PDF") if os.path.exists(p)), None)
+                yield os.path.relpath(stem, directory), entry.path, pdf_path
+
+
+class Checkpoint:
+    """Append-only JSONL file with the import state of every legacy document.
+
+    Each line updates one key: `{"key", "status", ...}` with the status
+    `uploaded` (with `task` and the mapped `fields`), `done` (with
+    `document`) or `failed` (with `error`). Reading the file back gives the
+    latest state per key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # abgebrochene letzte Zeile
+                        continue
+                    self.state[entry["key"]] = entry
+        self.file = open(path, "a", encoding="utf-8")
+
+    def close(self):
+        self.file.close()
+
+    def status(self, key):
+        entry = self.state.get(key)
+        return entry["status"] if entry else None
+
+    def pending_tasks(self):
+        """{task_id: entry} of uploads whose document is not finished yet."""
+        return {e["task"]: e for e in self.state.values() if e["status"] == "uploaded"}
+
+    def record(self, key, status, **values):
+        entry = {"key": key, "status": status, **values}
+        self.state[key] = entry
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        return entry
+
+    def counts(self):
+        counts = {}
+        for entry in self.state.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+
+class LegacyImporter:
+    """Upload a legacy archive with bounded concurrency and resume support.
+
+    Uploads and custom field updates run in an ImportPipeline; the
+    checkpoint is written from the calling thread. Consumption tasks are
+    polled with one request per `poll_batch` uploads (or `poll_interval`
+    seconds) instead of one request per document.
+    """
+
+    def __init__(
+        self,
+        checkpoint,
+        client=None,
+        workers=DEFAULT_WORKERS,
+        poll_batch=DEFAULT_POLL_BATCH,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        retry_failed=True,
+        progress=None,
+    ):
+        self.checkpoint = checkpoint
+        # eigener Client: so viele Verbindungen wie Upload-Threads
+        self.client = client or build_client(pool_size=workers)
+        self.workers = workers
+        self.poll_batch = poll_batch
+        self.poll_interval = poll_interval
+        self.retry_failed = retry_failed
+        self.progress = progress or frappe.logger("paperless").info
+        self.pending = checkpoint.pending_tasks()
+        # IDs fertiger Tasks, erst nach dem Checkpoint quittieren
+        self.finished_tasks = []
+        self.last_poll = 0.0
+        self.custom_fields = {}
+        self.document_types = {}
+        self.result = {"uploaded": 0, "done": 0, "failed": 0, "skipped": 0}
+        self.started = time.monotonic()
+
+    # --- Stammdaten ---
+
+    def load_lookups(self):
+        """Load custom fields and document types, creating missing ones."""
+        with metrics.stage("lookups"):
+            self.custom_fields = {
+                f["name"]: f["id"] for f in self.client.iter_results("custom_fields/", page_size=1000)
+            }
+            self.document_types = {
+                t["name"]: t["id"] for t in self.client.iter_results("document_types/", page_size=1000)
+            }
+            for name in FIELD_MAPPING:
+                if name not in self.custom_fields:
+                    self.custom_fields[name] = self._create("custom_fields/", name, data_type="string")
+            for name in set(DOCUMENT_TYPES.values()):
+                if name not in self.document_types:
+                    self.document_types[name] = self._create("document_types/", name)
+
+    def _create(self, path, name, **values):
+        response = self.client.post(path, json={"name": name, **values})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    # --- Ablauf ---
+
+    def run(self, directory, limit=None):
+        self.load_lookups()
+        with ImportPipeline(self._send, self._write, workers=self.workers) as pipeline:
+            self.pipeline = pipeline
+            submitted = 0
+            for key, json_path, pdf_path in iter_legacy_documents(directory):
+                if limit and submitted >= limit:
+                    break
+                status = self.checkpoint.status(key)
+                if status in ("uploaded", "done") or (status == "failed" and not self.retry_failed):
+                    self.result["skipped"] += 1
+                    continue
+                pipeline.submit(("upload", key, json_path, pdf_path))
+                submitted += 1
+                self._poll_if_due()
+
+            # restliche Tasks abwarten
+            pipeline.drain()
+            while self.pending:
+                time.sleep(self.poll_interval)
+                if not self._poll():
+                    break
+                pipeline.drain()
+        self._acknowledge()
+        return self.result
+
+    def _poll_if_due(self):
+        if not self.pending:
+            return
+        if len(self.pending) >= self.poll_batch or time.monotonic() - self.last_poll >= self.poll_interval:
+            self._poll()
+
+    def _poll(self):
+        """Fetch the unacknowledged tasks in one request and act on the finished ones.
+
+        Returns False if none of the pending tasks is listed (anymore), so
+        waiting for them is pointless; they stay `uploaded` in the checkpoint
+        and are polled again by the next run.
+        """
+        self.last_poll = time.monotonic()
+        with metrics.stage("legacy_poll"):
+            response = self.client.get("tasks/", params={"acknowledged": "false"})
+            response.raise_for_status()
+            data = response.json()
+        tasks = data.get("results", []) if isinstance(data, dict) else data
+
+        known = False
+        for task in tasks:
+            entry = self.pending.get(task.get("task_id"))
+            if not entry:
+                continue
+            known = True
+            if task.get("status") == "SUCCESS" and task.get("related_document"):
+                del self.pending[task["task_id"]]
+                self.pipeline.submit(("update", entry["key"], int(task["related_document"]), entry, task["id"]))
+            elif task.get("status") == "FAILURE":
+                del self.pending[task["task_id"]]
+                self._fail(entry["key"], task.get("result") or "consumption failed")
+                self.finished_tasks.append(task["id"])
+        self._acknowledge()
+        self._progress()
+        return known
+
+    def _acknowledge(self):
+        """Acknowledge the tasks whose final state is in the checkpoint.
+
+        Until then a task stays unacknowledged, so an interrupted run finds it
+        again with the next poll and writes the custom fields.
+        """
+        if not self.finished_tasks:
+            return
+        task_ids, self.finished_tasks = self.finished_tasks, []
+        # ab Paperless-ngx 2.x tasks/acknowledge/, davor acknowledge_tasks/
+        for path in ("tasks/acknowledge/", "acknowledge_tasks/"):
+            response = self.client.post(path, json={"tasks": task_ids})
+            if response.status_code != 404:
+                return
+
+    # --- Pipeline ---
+
+    def _send(self, item):
+        if item[0] == "update":
+            _action, _key, document_id, entry, _task = item
+            with metrics.stage("legacy_update"):
+                return self._update_document(document_id, entry)
+        _action, key, json_path, pdf_path = item
+        with metrics.stage("legacy_upload"):
+            return self._upload(key, json_path, pdf_path)
+
+    def _upload(self, key, json_path, pdf_path):
+        if not pdf_path:
+            raise FileNotFoundError(f"no PDF next to {json_path}")
+        with open(json_path, encoding="utf-8-sig") as f:
+            data = json.load(f)
+
+        form = {"title": str(data.get("BelegNr") or os.path.basename(key))}
+        created = parse_legacy_date(data.get("BelegDatum"))
+        if created:
+            form["created"] = created
+        type_name = document_type(data)
+        if type_name:
+            form["document_type"] = self.document_types[type_name]
+
+        with open(pdf_path, "rb") as pdf:
+            response = self.client.post(
+                "documents/post_document/",
+                data=form,
+                files={"document": (os.path.basename(pdf_path), pdf, "application/pdf")},
+                timeout=(self.client.timeout[0], UPLOAD_READ_TIMEOUT),
+            )
+        response.raise_for_status()
+        # Antwort ist die Task-ID als JSON-String
+        return {"task": response.json(), "fields": map_metadata(data)}
+
+    def _update_document(self, document_id, entry):
+        custom_fields = [
+            {"field": self.custom_fields[name], "value": str(value)[:MAX_FIELD_LENGTH]}
+            for name, value in (entry.get("fields") or {}).items()
+            if name in self.custom_fields
+        ]
+        if custom_fields:
+            response = self.client.patch(f"documents/{document_id}/", json={"custom_fields": custom_fields})
+            response.raise_for_status()
+        return document_id
+
+    def _write(self, item, fetched, error):
+        key = item[1]
+        if error:
+            response = getattr(error, "response", None)
+            message = response.text if response is not None else str(error)
+            if item[0] == "update":
+                # hochgeladen ist es: bleibt "uploaded", der Task unquittiert,
+                # der naechste Lauf versucht die Custom Fields erneut
+                entry = item[3]
+                self.checkpoint.record(
+                    key, "uploaded", task=entry["task"], fields=entry.get("fields"), error=message[:1000]
+                )
+                self.result["failed"] += 1
+                metrics.error("legacy_import")
+            else:
+                self._fail(key, message)
+            return
+        if item[0] == "update":
+            self.checkpoint.record(key, "done", document=fetched)
+            self.finished_tasks.append(item[4])
+            self.result["done"] += 1
+            metrics.count("legacy_done")
+        else:
+            entry = self.checkpoint.record(key, "uploaded", **fetched)
+            self.pending[fetched["task"]] = entry
+            self.result["uploaded"] += 1
+            metrics.count("legacy_uploaded")
+
+    def _fail(self, key, error):
+        self.checkpoint.record(key, "failed", error=str(error)[:1000])
+        self.result["failed"] += 1
+        metrics.error("legacy_import")
+
+    def _progress(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.result["uploaded"] / elapsed if elapsed else 0
+        self.progress(
+            f"Legacy import -> {self.result['uploaded']} uploaded, {self.result['done']} done, "
+            f"{self.result['failed']} failed, {len(self.pending)} waiting ({rate:.1f} docs/s)"
+        )
+
+
+def import_legacy_archive(
+    directory,
+    checkpoint=None,
+    workers=DEFAULT_WORKERS,
+    limit=None,
+    poll_batch=DEFAULT_POLL_BATCH,
+    poll_interval=DEFAULT_POLL_INTERVAL,
+    retry_failed=True,
+    progress=None,
+):
+    """Import (or resume importing) a legacy archive directory.
+
+    `progress` is called with a status line after every task poll; by
+    default the lines go to the paperless log.
+    """
+    checkpoint = Checkpoint(checkpoint or os.path.join(directory, ".paperless-import.jsonl"))
+    try:
+        with metrics.collect():
+            importer = LegacyImporter(
+                checkpoint,
+                workers=workers,
+                poll_batch=poll_batch,
+                poll_interval=poll_interval,
+                retry_failed=retry_failed,
+                progress=progress,
+            )
+            result = importer.run(directory, limit=limit)
+            metrics.count("legacy_skipped", result["skipped"])
+    finally:
+        checkpoint.close()
+    frappe.logger("paperless").info(f"Legacy import of {directory}: {result}")
+    return result
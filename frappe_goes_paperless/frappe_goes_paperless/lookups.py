@@ -0,0 +1,146 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import frappe
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE, get_client
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import (
+    CREATED_DIFFERS,
+    CREATED_IN_TEXT,
+    CREATED_UNSURE,
+    invoice_date_from_metadata,
+)
+
+# Einstellung "Use Created Date" -> Mindest-Sicherheit fuer `created`
+CREATED_CONFIDENCE = {
+    "Never": None,
+    "If Found in Fulltext": CREATED_IN_TEXT,
+    "If Not the Date Added": CREATED_DIFFERS,
+    "Always": CREATED_UNSURE,
+}
+
+
+class SyncLookups:
+    """Lookup tables for one sync run.
+
+    Correspondents and document types are bulk loaded from Paperless-ngx
+    (paginated), the Paperless Document Type Mapping table from the database.
+    Lookups are answered from memory; single correspondents or document types
+    are only fetched again if an ID is not known yet (e.g. created in
+    Paperless while the sync is running). With `preload=False` nothing is
+    bulk loaded from Paperless and entries are fetched on first use, which is
+    cheaper when only a single document is imported.
+
+    The invoice date settings (mapped custom field, use of `created`) are
+    read once per run as well, see `invoice_date_metadata`.
+    """
+
+    TABLES = ("correspondents", "document_types", "type_mappings")
+
+    def __init__(self, client=None, preload=True):
+        self.client = client or get_client()
+        self.preload = preload
+        self.correspondents = {}
+        self.document_types = {}
+        self.type_mappings = {}
+        self.invoice_date_field = None
+        self.min_created_confidence = None
+        self.hits = dict.fromkeys(self.TABLES, 0)
+        self.misses = dict.fromkeys(self.TABLES, 0)
+        self.loaded = False
+
+    def load(self):
+        with metrics.stage("lookups"):
+            if self.preload:
+                for place in ("correspondents", "document_types"):
+                    table = getattr(self, place)
+                    for entry in self.client.iter_results(f"{place}/"):
+                        table[entry["id"]] = entry["name"]
+
+            for mapping in frappe.get_all(
+                "Paperless Document Type Mapping",
+                fields=["paperless_document_type", "frappe_doctype"],
+                order_by="creation asc",
+            ):
+                # wie bisher gewinnt die erste Zuordnung
+                self.type_mappings.setdefault(
+                    mapping.paperless_document_type, mapping.frappe_doctype
+                )
+
+            self.load_invoice_date_settings()
+
+        self.loaded = True
+        return self
+
+    def load_invoice_date_settings(self):
+        settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+        self.min_created_confidence = CREATED_CONFIDENCE.get(
+            settings.get("invoice_date_from_created") or "Never"
+        )
+        field_name = (settings.get("invoice_date_custom_field") or "").strip()
+        if field_name:
+            # Name -> ID, die Dokumente liefern nur die ID
+            for entry in self.client.iter_results(
+                "custom_fields/", params={"name__iexact": field_name}
+            ):
+                if entry["name"].lower() == field_name.lower():
+                    self.invoice_date_field = entry["id"]
+                    break
+
+    def _lookup(self, place, id):
+        if id is None:
+            return None
+        if not self.loaded:
+            self.load()
+
+        table = getattr(self, place)
+        if id in table:
+            self.hits[place] += 1
+            return table[id]
+
+        self.misses[place] += 1
+        with metrics.stage("lookups"):
+            entry = self.client.get_json(f"{place}/{id}/")
+        # auch "nicht gefunden" merken, damit nicht jedes Dokument erneut fragt
+        table[id] = entry["name"] if entry else None
+        return table[id]
+
+    def correspondent_name(self, id):
+        return self._lookup("correspondents", id)
+
+    def document_type_name(self, id):
+        return self._lookup("document_types", id)
+
+    def frappe_doctype(self, paperless_document_type):
+        if not paperless_document_type:
+            return None
+        if not self.loaded:
+            self.load()
+
+        if paperless_document_type in self.type_mappings:
+            self.hits["type_mappings"] += 1
+            return self.type_mappings[paperless_document_type]
+
+        self.misses["type_mappings"] += 1
+        return None
+
+    def invoice_date_metadata(self, payload):
+        """`(date, source)` from custom field or `created` of a payload, or None."""
+        if not self.loaded:
+            self.load()
+        return invoice_date_from_metadata(
+            payload, self.invoice_date_field, self.min_created_confidence
+        )
+
+    def record_metrics(self):
+        """Add the cache hits and misses to the metrics of the current run."""
+        for table in self.TABLES:
+            metrics.count(f"lookup_{table}_hits", self.hits[table])
+            metrics.count(f"lookup_{table}_misses", self.misses[table])
+
+    def stats(self):
+        return {
+            table: {"hits": self.hits[table], "misses": self.misses[table]}
+            for table in self.TABLES
+        }
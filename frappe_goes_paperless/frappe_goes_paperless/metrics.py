@@ -0,0 +1,322 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import frappe
+from werkzeug.wrappers import Response
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Redis-Hash mit den kumulierten Werten aller Worker
+REDIS_KEY = "paperless_metrics"
+
+# der gerade laufende Sync dieses Requests/Jobs; die ImportPipeline gibt den
+# Kontext an ihre Download-Threads weiter, damit sie hineinschreiben
+_current = ContextVar("paperless_metrics", default=None)
+
+
+class SyncMetrics:
+    """Timings and counters of one sync or backfill run.
+
+    Stages (`settings`, `ids`, `fetch`, `lookups`, `save`, `thumbnail`,
+    `commit`, ...) are recorded as latency histograms; HTTP calls to
+    Paperless-ngx, response bytes, processed items and errors as counters.
+    Thread safe.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.http = {}
+        self.http_bytes = 0
+        self.items = {}
+        self.errors = {}
+        self.started = time.monotonic()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {
+                    "count": 0,
+                    "sum": 0.0,
+                    "max": 0.0,
+                    "buckets": [0] * (len(BUCKETS) + 1),
+                }
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["buckets"][bisect_left(BUCKETS, seconds)] += 1
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(name)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed_iter(self, name, iterable):
+        """Yield from `iterable`, timing how long each item takes to produce."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def record_http(self, method, status, nbytes):
+        key = f"{method} {status // 100}xx" if status else f"{method} error"
+        with self.lock:
+            self.http[key] = self.http.get(key, 0) + 1
+            self.http_bytes += nbytes
+
+    def count(self, item, amount=1):
+        with self.lock:
+            self.items[item] = self.items.get(item, 0) + amount
+
+    def error(self, stage):
+        with self.lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def summary(self):
+        """JSON-serializable summary, e.g. for a Paperless Sync Run."""
+        with self.lock:
+            return {
+                "duration": round(time.monotonic() - self.started, 3),
+                "stages": {
+                    name: {
+                        "count": s["count"],
+                        "sum": round(s["sum"], 4),
+                        "avg": round(s["sum"] / s["count"], 4) if s["count"] else 0,
+                        "max": round(s["max"], 4),
+                        "p95": _quantile(s["buckets"], s["count"], 0.95),
+                        "buckets": list(s["buckets"]),
+                    }
+                    for name, s in self.stages.items()
+                },
+                "http": dict(self.http),
+                "http_bytes": self.http_bytes,
+                "items": dict(self.items),
+                "errors": dict(self.errors),
+            }
+
+    def flush(self):
+        """Add this run to the cumulative counters in Redis."""
+        summary = self.summary()
+        cache = frappe.cache()
+        key = cache.make_key(REDIS_KEY)
+        pipe = cache.pipeline()
+        for name, s in summary["stages"].items():
+            pipe.hincrby(key, f"stage|{name}|count", s["count"])
+            pipe.hincrbyfloat(key, f"stage|{name}|sum", s["sum"])
+            for i, n in enumerate(s["buckets"]):
+                if n:
+                    pipe.hincrby(key, f"stage|{name}|bucket|{i}", n)
+        for name, n in summary["http"].items():
+            pipe.hincrby(key, f"http|{name}", n)
+        pipe.hincrby(key, "http_bytes", summary["http_bytes"])
+        for name, n in summary["items"].items():
+            pipe.hincrby(key, f"items|{name}", n)
+        for name, n in summary["errors"].items():
+            pipe.hincrby(key, f"errors|{name}", n)
+        pipe.execute()
+
+
+def _quantile(buckets, count, q):
+    # Obergrenze des Buckets, in dem das Quantil liegt
+    if not count:
+        return 0
+    rank = q * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= rank:
+            return BUCKETS[i] if i < len(BUCKETS) else float(BUCKETS[-1])
+    return float(BUCKETS[-1])
+
+
+def merge_summaries(summaries):
+    """Combine the summaries of several shards into one."""
+    merged = {"duration": 0, "stages": {}, "http": {}, "http_bytes": 0, "items": {}, "errors": {}}
+    for summary in summaries:
+        merged["duration"] = max(merged["duration"], summary.get("duration", 0))
+        merged["http_bytes"] += summary.get("http_bytes", 0)
+        for field in ("http", "items", "errors"):
+            for name, n in (summary.get(field) or {}).items():
+                merged[field][name] = merged[field].get(name, 0) + n
+        for name, s in (summary.get("stages") or {}).items():
+            m = merged["stages"].setdefault(
+                name, {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKETS) + 1)}
+            )
+            m["count"] += s["count"]
+            m["sum"] = round(m["sum"] + s["sum"], 4)
+            m["max"] = max(m["max"], s["max"])
+            m["buckets"] = [a + b for a, b in zip(m["buckets"], s["buckets"])]
+    for m in merged["stages"].values():
+        m["avg"] = round(m["sum"] / m["count"], 4) if m["count"] else 0
+        m["p95"] = _quantile(m["buckets"], m["count"], 0.95)
+    return merged
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def collect(flush=True):
+    """Collect metrics for the code inside the block and flush them to Redis.
+
+    Nested calls (e.g. a sync run calling `sync_documents`) reuse the outer
+    collector. `flush=False` keeps the run out of the cumulative counters
+    (used by the benchmarks).
+    """
+    outer = _current.get()
+    if outer is not None:
+        yield outer
+        return
+
+    metrics = SyncMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+        try:
+            if flush:
+                metrics.flush()
+        except Exception:
+            frappe.log_error("Failed to store Paperless sync metrics")
+
+
+def stage(name):
+    """Time a stage of the current run; does nothing outside of `collect()`."""
+    metrics = _current.get()
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+def timed_iter(name, iterable):
+    metrics = _current.get()
+    return metrics.timed_iter(name, iterable) if metrics is not None else iterable
+
+
+def count(item, amount=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(item, amount)
+
+
+def error(stage):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.error(stage)
+
+
+def record_http(method, response=None):
+    """Called by PaperlessClient for every request (response None = failed)."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if response is None:
+        metrics.record_http(method, 0, 0)
+        return
+    nbytes = len(response.content) if response.content is not None else 0
+    metrics.record_http(method, response.status_code, nbytes)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(values):
+    """Render the Redis counters in the Prometheus text format."""
+    stages = {}
+    http = {}
+    items = {}
+    errors = {}
+    http_bytes = 0
+    for field, value in values.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        value = float(value)
+        parts = field.split("|")
+        if parts[0] == "stage":
+            entry = stages.setdefault(parts[1], {"count": 0, "sum": 0.0, "buckets": {}})
+            if parts[2] == "bucket":
+                entry["buckets"][int(parts[3])] = value
+            else:
+                entry[parts[2]] = value
+        elif parts[0] == "http":
+            http[parts[1]] = value
+        elif parts[0] == "items":
+            items[parts[1]] = value
+        elif parts[0] == "errors":
+            errors[parts[1]] = value
+        elif parts[0] == "http_bytes":
+            http_bytes = value
+
+    lines = [
+        "# HELP paperless_stage_seconds Duration of sync and backfill stages",
+        "# TYPE paperless_stage_seconds histogram",
+    ]
+    for name, s in sorted(stages.items()):
+        cumulative = 0
+        for i, le in enumerate(BUCKETS):
+            cumulative += s["buckets"].get(i, 0)
+            lines.append(f'paperless_stage_seconds_bucket{{stage="{_label(name)}",le="{le}"}} {cumulative:g}')
+        lines.append(f'paperless_stage_seconds_bucket{{stage="{_label(name)}",le="+Inf"}} {s["count"]:g}')
+        lines.append(f'paperless_stage_seconds_sum{{stage="{_label(name)}"}} {s["sum"]:g}')
+        lines.append(f'paperless_stage_seconds_count{{stage="{_label(name)}"}} {s["count"]:g}')
+
+    lines += [
+        "# HELP paperless_http_requests_total Requests sent to Paperless-ngx",
+        "# TYPE paperless_http_requests_total counter",
+    ]
+    for name, n in sorted(http.items()):
+        method, status = name.split(" ", 1)
+        lines.append(
+            f'paperless_http_requests_total{{method="{_label(method)}",status="{_label(status)}"}} {n:g}'
+        )
+    lines += [
+        "# HELP paperless_http_response_bytes_total Bytes received from Paperless-ngx",
+        "# TYPE paperless_http_response_bytes_total counter",
+        f"paperless_http_response_bytes_total {http_bytes:g}",
+        "# HELP paperless_items_total Processed items (documents added, updated, ...)",
+        "# TYPE paperless_items_total counter",
+    ]
+    lines += [f'paperless_items_total{{item="{_label(k)}"}} {v:g}' for k, v in sorted(items.items())]
+    lines += [
+        "# HELP paperless_errors_total Errors per stage",
+        "# TYPE paperless_errors_total counter",
+    ]
+    lines += [f'paperless_errors_total{{stage="{_label(k)}"}} {v:g}' for k, v in sorted(errors.items())]
+    return "\n".join(lines) + "\n"
+
+
+@frappe.whitelist(methods=["GET"])
+def prometheus():
+    """Prometheus endpoint with the cumulative sync metrics of this site.
+
+    Scrape it with an API key of a System Manager
+    (`Authorization: token <key>:<secret>`).
+    """
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    # Rohwerte lesen, RedisWrapper.hgetall wuerde sie unpickeln
+    pipe = cache.pipeline()
+    pipe.hgetall(cache.make_key(REDIS_KEY))
+    values = pipe.execute()[0] or {}
+    return Response(
+        render_prometheus(values), mimetype="text/plain", headers={"Cache-Control": "no-store"}
+    )
@@ -0,0 +1,70 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+
+class ImportPipeline:
+    """Fetch items concurrently and write them from the calling thread.
+
+    `fetch(item)` runs in a thread pool and must not use `frappe` (database
+    connections and `frappe.local` are per thread). `write(item, fetched,
+    error)` runs in the thread that calls `submit`/`drain`, in submission
+    order, so all database writes stay on the request/job connection.
+
+    At most `max_pending` items are fetched ahead of the writer; `submit`
+    writes finished items before it accepts a new one once that bound is
+    reached, which keeps memory flat however many items are fed in.
+
+    `flush()`, if given, is called by `drain` after all pending items have
+    been written, e.g. to finish a batch.
+    """
+
+    def __init__(self, fetch, write, workers=4, max_pending=None, flush=None):
+        self.fetch = fetch
+        self.write = write
+        self.flush = flush
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 2
+        self.pending = deque()
+        self.executor = None
+
+    def __enter__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="paperless-fetch"
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.drain()
+        else:
+            for _item, future in self.pending:
+                future.cancel()
+            self.pending.clear()
+        self.executor.shutdown(wait=True)
+        self.executor = None
+
+    def submit(self, item):
+        while len(self.pending) >= self.max_pending:
+            self._write_next()
+        # mit dem Kontext des Aufrufers, z. B. dem laufenden metrics.collect()
+        context = copy_context()
+        self.pending.append((item, self.executor.submit(context.run, self.fetch, item)))
+
+    def drain(self):
+        """Write all pending items."""
+        while self.pending:
+            self._write_next()
+        if self.flush:
+            self.flush()
+
+    def _write_next(self):
+        item, future = self.pending.popleft()
+        try:
+            fetched, error = future.result(), None
+        except Exception as e:
+            fetched, error = None, e
+        self.write(item, fetched, error)
@@ -0,0 +1,35 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import frappe
+
+# Realtime-Event, auf das public/js/paperless_jobs.js hoert
+EVENT = "paperless_job_progress"
+
+
+def publish_progress(job_id, data, user=None):
+    """Push the state of a background job to the desk.
+
+    `data` has the format of `tools.job_status` (at least `status`:
+    queued, started, finished or failed). Sent after the next commit, so
+    clients that reload on "finished" see the written data. Without `user`
+    every session of the site gets the event.
+    """
+    frappe.publish_realtime(EVENT, {**data, "job_id": job_id}, user=user, after_commit=True)
+
+
+def get_rq_job_status(job_id):
+    """Status of an RQ job, fetched directly by its ID instead of listing the queues."""
+    from frappe.utils.background_jobs import get_job, get_redis_conn
+    from rq.exceptions import NoSuchJobError
+    from rq.job import Job
+
+    # job_id von frappe.enqueue(job_id=...), sonst die RQ-Job-ID selbst
+    job = get_job(job_id)
+    if job is None:
+        try:
+            job = Job.fetch(job_id, connection=get_redis_conn())
+        except NoSuchJobError:
+            return None
+    status = job.get_status()
+    return getattr(status, "value", status)
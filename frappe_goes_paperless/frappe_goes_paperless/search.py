@@ -0,0 +1,253 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import hashlib
+import html
+import re
+
+import frappe
+from frappe.desk.reportview import get_match_cond
+from frappe.utils import cint, escape_html, getdate
+
+from frappe_goes_paperless.frappe_goes_paperless.client import get_client
+
+INDEX_NAME = "document_fulltext_ft"
+SNIPPET_LENGTH = 240
+MAX_PAGE_LENGTH = 100
+
+# Antworten der Paperless-Suche werden so lange in Redis gehalten
+PAPERLESS_SEARCH_TTL = 300
+_HIGHLIGHT = re.compile(r'<span class="match">(.*?)</span>', re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+
+_PHRASE_OR_WORD = re.compile(r'"([^"]+)"|(\w+)')
+_WORD = re.compile(r"\w+")
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+
+def has_fulltext_index():
+    if frappe.db.db_type != "mariadb":
+        return False
+    return bool(
+        frappe.db.sql(
+            "show index from `tabPaperless Document` where Key_name = %s", INDEX_NAME
+        )
+    )
+
+
+def ensure_fulltext_index():
+    """Add the FULLTEXT index on document_fulltext (after_migrate).
+
+    InnoDB keeps the index up to date on every insert and update, so
+    documents imported or changed by the sync are searchable right away.
+    """
+    if frappe.db.db_type != "mariadb" or has_fulltext_index():
+        return
+    frappe.db.sql_ddl(
+        f"alter table `tabPaperless Document` add fulltext index `{INDEX_NAME}` (document_fulltext)"
+    )
+
+
+def parse_query(query):
+    """Split a query into words and "quoted phrases"."""
+    terms = []
+    for phrase, word in _PHRASE_OR_WORD.findall(query or ""):
+        # Operatoren der Boolean-Suche aus Phrasen entfernen
+        term = " ".join(_WORD.findall(phrase)) if phrase else word
+        if term:
+            terms.append((term, bool(phrase)))
+    return terms
+
+
+def boolean_query(terms):
+    # alle Begriffe muessen vorkommen, Woerter auch als Praefix
+    return " ".join(f'+"{term}"' if phrase else f"+{term}*" for term, phrase in terms)
+
+
+def like_pattern(term):
+    """LIKE pattern matching `term` anywhere, with wildcards in it escaped."""
+    return "%{}%".format(_LIKE_SPECIAL.sub(r"\\\1", term))
+
+
+def make_snippet(text, terms, length=SNIPPET_LENGTH):
+    """Cut an excerpt around the first hit and wrap all hits in <mark>."""
+    text = " ".join((text or "").split())
+    if not terms:
+        return escape_html(text[:length])
+
+    pattern = re.compile(
+        "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+        re.IGNORECASE,
+    )
+    first = pattern.search(text)
+    start = max(0, first.start() - length // 3) if first else 0
+    excerpt = text[start: start + length]
+
+    parts = []
+    pos = 0
+    for hit in pattern.finditer(excerpt):
+        parts.append(escape_html(excerpt[pos: hit.start()]))
+        parts.append(f"<mark>{escape_html(hit.group())}</mark>")
+        pos = hit.end()
+    parts.append(escape_html(excerpt[pos:]))
+
+    return ("… " if start else "") + "".join(parts) + (" …" if start + length < len(text) else "")
+
+
+@frappe.whitelist()
+def search_documents(query, start=0, page_length=20):
+    """Search the OCR text of Paperless Documents.
+
+    Uses the FULLTEXT index and ranks by relevance on MariaDB; other
+    databases fall back to a LIKE search ordered by modification date.
+    Only documents the user may read are searched (user permissions and
+    permission query conditions apply as in list views). Returns one page
+    of hits with a highlighted snippet each.
+    """
+    frappe.has_permission("Paperless Document", "read", throw=True)
+
+    terms = parse_query(query)
+    start = cint(start)
+    page_length = min(cint(page_length) or 20, MAX_PAGE_LENGTH)
+    if not terms:
+        return {"results": [], "start": start, "has_more": False}
+
+    values = {"start": start, "limit": page_length + 1}
+    if has_fulltext_index():
+        values["query"] = boolean_query(terms)
+        condition = "match(document_fulltext) against (%(query)s in boolean mode)"
+        score = condition
+        order_by = "score desc, modified desc"
+    else:
+        conditions = []
+        for i, (term, _phrase) in enumerate(terms):
+            values[f"term_{i}"] = like_pattern(term)
+            conditions.append(f"document_fulltext like %(term_{i})s")
+        condition = " and ".join(conditions)
+        score = "0"
+        order_by = "modified desc"
+
+    rows = frappe.db.sql(
+        f"""
+        select name, paperless_document_id, paperless_correspondent, invoice_date,
+            document_fulltext, {score} as score
+        from `tabPaperless Document`
+        where {condition} {get_match_cond("Paperless Document")}
+        order by {order_by}
+        limit %(limit)s offset %(start)s
+        """,
+        values,
+        as_dict=True,
+    )
+
+    words = [term for term, _phrase in terms]
+    results = []
+    for row in rows[:page_length]:
+        row.snippet = make_snippet(row.pop("document_fulltext"), words)
+        results.append(row)
+
+    return {"results": results, "start": start, "has_more": len(rows) > page_length}
+
+
+def _paperless_snippet(highlights):
+    """Turn Whoosh highlights into escaped HTML with <mark> around matches."""
+    parts = _HIGHLIGHT.split(highlights or "")
+    # ungerade Indizes sind die Treffer
+    return "".join(
+        (f"<mark>{escape_html(text)}</mark>" if i % 2 else escape_html(text))
+        for i, text in enumerate(html.unescape(_TAG.sub("", part)) for part in parts)
+    )
+
+
+def _query_paperless(client, query, page, page_length):
+    key = "paperless_search::" + hashlib.sha1(
+        f"{client.server_url}|{query}|{page}|{page_length}".encode()
+    ).hexdigest()
+    cache = frappe.cache()
+    data = cache.get_value(key)
+    if data is None:
+        response = client.get(
+            "documents/",
+            params={
+                "query": query,
+                "page": page,
+                "page_size": page_length,
+                "truncate_content": "true",
+            },
+        )
+        # unbekannte Seite -> leeres Ergebnis
+        if response.status_code == 404:
+            return {"count": 0, "next": None, "results": []}
+        response.raise_for_status()
+        body = response.json()
+        data = {
+            "count": body.get("count") or 0,
+            "next": body.get("next"),
+            "results": [
+                {
+                    "id": hit["id"],
+                    "title": hit.get("title"),
+                    "created": hit.get("created"),
+                    "search_hit": hit.get("__search_hit__") or {},
+                }
+                for hit in body.get("results") or []
+            ],
+        }
+        cache.set_value(key, data, expires_in_sec=PAPERLESS_SEARCH_TTL)
+    return data
+
+
+@frappe.whitelist()
+def search_paperless(query, start=0, page_length=25):
+    """Search with the full-text index of Paperless-ngx itself.
+
+    The query goes to /api/documents/?query=... through the shared client;
+    the answer is cached per query and page for a few minutes. Hits are
+    mapped to Paperless Documents via the unique ID column, hits that are
+    not imported yet link to Paperless directly.
+    """
+    frappe.has_permission("Paperless Document", "read", throw=True)
+
+    query = " ".join((query or "").split())
+    start = cint(start)
+    page_length = min(cint(page_length) or 25, MAX_PAGE_LENGTH)
+    if not query:
+        return {"results": [], "start": start, "has_more": False, "count": 0}
+
+    client = get_client()
+    data = _query_paperless(client, query, start // page_length + 1, page_length)
+
+    ids = [hit["id"] for hit in data["results"]]
+    names = {
+        d.paperless_document_id: d
+        for d in frappe.get_list(
+            "Paperless Document",
+            filters={"paperless_document_id": ["in", ids]},
+            fields=["name", "paperless_document_id", "paperless_correspondent", "invoice_date"],
+        )
+    } if ids else {}
+
+    results = []
+    for hit in data["results"]:
+        doc = names.get(hit["id"])
+        search_hit = hit["search_hit"]
+        results.append(
+            frappe._dict(
+                name=doc.name if doc else None,
+                paperless_document_id=hit["id"],
+                paperless_correspondent=doc.paperless_correspondent if doc else None,
+                invoice_date=doc.invoice_date if doc else None,
+                title=hit["title"],
+                created=getdate(hit["created"]) if hit.get("created") else None,
+                score=search_hit.get("score"),
+                snippet=_paperless_snippet(search_hit.get("highlights")),
+                paperless_url=f"{client.server_url}/documents/{hit['id']}/details",
+            )
+        )
+
+    return {
+        "results": results,
+        "start": start,
+        "count": data["count"],
+        "has_more": bool(data["next"]),
+    }
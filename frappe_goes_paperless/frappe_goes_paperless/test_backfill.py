@@ -0,0 +1,152 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+from datetime import date
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from frappe_goes_paperless.frappe_goes_paperless.backfill import (
+    invoice_date_outdated,
+    iter_backfill_batches,
+    write_invoice_dates,
+)
+from frappe_goes_paperless.frappe_goes_paperless.fulltext import content_hash
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import (
+    EXTRACTOR_VERSION,
+    extract_invoice_date_from_text,
+)
+from frappe_goes_paperless.frappe_goes_paperless.tools import backfill_paperless_invoice_date
+
+CURRENT = {"fulltext_hash": "h1", "invoice_date_hash": "h1", "invoice_date_version": EXTRACTOR_VERSION}
+
+
+class TestInvoiceDateOutdated(unittest.TestCase):
+    def doc(self, **values):
+        return frappe._dict(CURRENT, **values)
+
+    def test_fulltext(self):
+        self.assertFalse(invoice_date_outdated(self.doc(invoice_date_source="Fulltext")))
+        self.assertTrue(invoice_date_outdated(self.doc(fulltext_hash="h2")))
+        self.assertTrue(invoice_date_outdated(self.doc(invoice_date_version=EXTRACTOR_VERSION - 1)))
+        self.assertTrue(invoice_date_outdated(frappe._dict(fulltext_hash="h1")))
+
+    def test_metadata(self):
+        resolved = (date(2024, 3, 1), "Custom Field")
+        doc = self.doc(invoice_date_extracted=date(2024, 3, 1), invoice_date_source="Custom Field")
+        self.assertFalse(invoice_date_outdated(doc, resolved))
+        self.assertTrue(invoice_date_outdated(doc, (date(2024, 3, 2), "Custom Field")))
+        self.assertTrue(invoice_date_outdated(doc, (date(2024, 3, 1), "Created")))
+        # Custom Field entfernt -> wieder aus dem Text, auch bei unveraendertem Text
+        self.assertTrue(invoice_date_outdated(doc))
+        # von Hand gesetzt: nur ein anderes Ergebnis zaehlt
+        manual = self.doc(invoice_date_extracted=date(2024, 3, 1), invoice_date_source="Manual")
+        self.assertFalse(invoice_date_outdated(manual, resolved))
+
+
+class TestIterBackfillBatches(FrappeTestCase):
+    CASES = {
+        "current": dict(CURRENT, invoice_date_source="Fulltext"),
+        "old_version": dict(CURRENT, invoice_date_version=EXTRACTOR_VERSION - 1),
+        "text_changed": dict(CURRENT, fulltext_hash="h2"),
+        "never_checked": {"fulltext_hash": "h1", "invoice_date_version": 0},
+        "manual": dict(CURRENT, invoice_date_version=0, invoice_date_source="Manual"),
+        "custom_field": dict(CURRENT, fulltext_hash="h2", invoice_date_source="Custom Field"),
+    }
+
+    def setUp(self):
+        self.names = {}
+        for i, (case, values) in enumerate(self.CASES.items(), 990001):
+            doc = frappe.get_doc(
+                {"doctype": "Paperless Document", "paperless_document_id": i, "status": "new"}
+            ).insert(ignore_permissions=True)
+            frappe.db.set_value("Paperless Document", doc.name, values, update_modified=False)
+            self.names[doc.name] = case
+
+    def tearDown(self):
+        for name in self.names:
+            frappe.delete_doc("Paperless Document", name, force=True, ignore_permissions=True)
+
+    def read(self, **kwargs):
+        return [
+            self.names[row.name]
+            for rows in iter_backfill_batches(**kwargs)
+            for row in rows
+            if row.name in self.names
+        ]
+
+    def test_only_outdated_documents(self):
+        self.assertEqual(sorted(self.read()), ["never_checked", "old_version", "text_changed"])
+
+    def test_cursor_reads_each_row_once(self):
+        self.assertEqual(sorted(self.read(batch_size=1)), ["never_checked", "old_version", "text_changed"])
+
+    def test_limit(self):
+        rows = [row for rows in iter_backfill_batches(batch_size=2, limit=3) for row in rows]
+        self.assertLessEqual(len(rows), 3)
+
+
+class TestSingleDocumentBackfill(FrappeTestCase):
+    """The single-document backfill (docname) writes what the batch backfill writes."""
+
+    CASES = {
+        # kein Datum im Text: das zuletzt gefundene Datum wird entfernt
+        "no_date": ("Lieferschein ohne Datum", "2024-01-01", "2024-01-01"),
+        # von Hand geaendert: bleibt, auch mit force
+        "manual": ("Rechnungsdatum: 01.03.2024", "2023-12-24", "2024-02-01"),
+    }
+    FIELDS = ("invoice_date", "invoice_date_source", "invoice_date_extracted", "invoice_date_checked")
+
+    def make(self, i, text, invoice_date, extracted):
+        doc = frappe.get_doc(
+            {
+                "doctype": "Paperless Document",
+                "paperless_document_id": i,
+                "status": "new",
+                "document_fulltext": text,
+                "fulltext_complete": 1,
+                "fulltext_hash": content_hash(text),
+            }
+        ).insert(ignore_permissions=True)
+        self.addCleanup(frappe.delete_doc, "Paperless Document", doc.name, force=True, ignore_permissions=True)
+        frappe.db.set_value(
+            "Paperless Document",
+            doc.name,
+            {
+                "invoice_date": invoice_date,
+                "invoice_date_extracted": extracted,
+                "invoice_date_source": "Fulltext",
+            },
+            update_modified=False,
+        )
+        return doc.name
+
+    def test_same_result_as_batch(self):
+        for i, (case, (text, invoice_date, extracted)) in enumerate(self.CASES.items()):
+            with self.subTest(case):
+                single = self.make(990101 + 2 * i, text, invoice_date, extracted)
+                batch = self.make(990102 + 2 * i, text, invoice_date, extracted)
+
+                backfill_paperless_invoice_date(docname=single, force=1)
+                write_invoice_dates([(batch, content_hash(text), extract_invoice_date_from_text(text))])
+
+                self.assertEqual(
+                    frappe.db.get_value("Paperless Document", single, self.FIELDS, as_dict=True),
+                    frappe.db.get_value("Paperless Document", batch, self.FIELDS, as_dict=True),
+                )
+
+    def test_no_date_found(self):
+        name = self.make(990110, *self.CASES["no_date"])
+        backfill_paperless_invoice_date(docname=name, force=1)
+        doc = frappe.db.get_value("Paperless Document", name, self.FIELDS, as_dict=True)
+        self.assertIsNone(doc.invoice_date)
+        self.assertIsNone(doc.invoice_date_source)
+
+    def test_manual_date_kept(self):
+        text, invoice_date, extracted = self.CASES["manual"]
+        name = self.make(990111, text, invoice_date, extracted)
+        backfill_paperless_invoice_date(docname=name, force=1)
+        doc = frappe.db.get_value("Paperless Document", name, self.FIELDS, as_dict=True)
+        self.assertEqual(str(doc.invoice_date), "2023-12-24")
+        self.assertEqual(str(doc.invoice_date_extracted), "2024-03-01")
@@ -0,0 +1,47 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+
+import frappe
+
+from frappe_goes_paperless.frappe_goes_paperless.correspondents import (
+    CORRESPONDENT_ID,
+    SYNC_FLAG,
+    plan_changes,
+)
+
+
+def record(name, title, correspondent_id=None, synced=0):
+    return frappe._dict(
+        {"name": name, "title": title, CORRESPONDENT_ID: correspondent_id, SYNC_FLAG: synced}
+    )
+
+
+class TestPlanChanges(unittest.TestCase):
+    def test_plan_changes(self):
+        correspondents = {1: "Acme CUST-1", 2: "Old Name CUST-2", 3: "Beta CUST-4", 4: "Gamma CUST-5"}
+        records = [
+            record("CUST-1", "Acme", 1, synced=1),
+            record("CUST-2", "New Name", 2, synced=1),
+            record("CUST-3", "Delta"),
+            record("CUST-4", "Beta"),
+            record("CUST-5", "Gamma", 4),
+            # verknuepfte ID existiert nicht mehr in Paperless
+            record("CUST-6", "Epsilon", 99, synced=1),
+        ]
+        changes = [(action, r.name, value) for action, r, value in plan_changes(records, correspondents)]
+        self.assertEqual(
+            changes,
+            [
+                ("rename", "CUST-2", "New Name CUST-2"),
+                ("create", "CUST-3", "Delta CUST-3"),
+                ("link", "CUST-4", 3),
+                ("link", "CUST-5", 4),
+                ("create", "CUST-6", "Epsilon CUST-6"),
+            ],
+        )
+
+    def test_nothing_to_do(self):
+        self.assertEqual(plan_changes([record("SUP-1", "Acme", 1, synced=1)], {1: "Acme SUP-1"}), [])
+        self.assertEqual(plan_changes([], {1: "Acme SUP-1"}), [])
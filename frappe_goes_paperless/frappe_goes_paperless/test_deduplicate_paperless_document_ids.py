@@ -0,0 +1,39 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+
+import frappe
+
+from frappe_goes_paperless.patches.deduplicate_paperless_document_ids import plan_deduplication
+
+
+def rows(*values):
+    return [
+        frappe._dict(name=name, paperless_document_id=id, frappe_document=link)
+        for name, id, link in values
+    ]
+
+
+class TestDeduplicatePaperlessDocumentIds(unittest.TestCase):
+    def test_linked_duplicates_are_conflicts(self):
+        normalize, quarantine, conflicts = plan_deduplication(
+            rows(("PD-1", "5", "SINV-1"), ("PD-2", " 5", "SINV-2"), ("PD-3", "5", None))
+        )
+        self.assertEqual(conflicts, {5: ["PD-1", "PD-2"]})
+        self.assertEqual(normalize, {})
+        self.assertIn(("PD-3", "5"), quarantine)
+
+    def test_linked_with_invalid_id_is_kept(self):
+        normalize, quarantine, conflicts = plan_deduplication(
+            rows(("PD-1", "abc", "SINV-1"), ("PD-2", "", None), ("PD-3", "7 ", None))
+        )
+        self.assertEqual(conflicts, {})
+        self.assertEqual(quarantine, [("PD-1", "abc"), ("PD-2", "")])
+        self.assertEqual(normalize, {"PD-3": 7})
+
+    def test_linked_duplicate_wins_over_older(self):
+        normalize, quarantine, conflicts = plan_deduplication(
+            rows(("PD-1", "9", None), ("PD-2", "9", "SINV-1"))
+        )
+        self.assertEqual((normalize, quarantine, conflicts), ({}, [("PD-1", "9")], {}))
@@ -0,0 +1,62 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+import zlib
+from unittest.mock import patch
+
+import frappe
+import requests
+
+from frappe_goes_paperless.frappe_goes_paperless import fulltext
+
+
+class FakeCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, content):
+        self.entries[key] = content
+
+
+class FakeClient:
+    def __init__(self, content=None, error=None):
+        self.content = content
+        self.error = error
+
+    def get_json(self, path, params=None):
+        if self.error:
+            raise self.error
+        return {"id": 7, "content": self.content}
+
+
+class TestGetDocumentFulltext(unittest.TestCase):
+    CONTENT = "Rechnung vom 01.03.2024 " * 10
+
+    def setUp(self):
+        self.cache = FakeCache()
+        patcher = patch.object(fulltext, "get_fulltext_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.doc = frappe._dict(
+            paperless_document_id=7,
+            document_fulltext=self.CONTENT[:20],
+            fulltext_complete=0,
+            fulltext_hash=fulltext.content_hash(self.CONTENT),
+        )
+
+    def test_fetches_and_caches_complete_text(self):
+        with patch.object(fulltext, "get_client", return_value=FakeClient(self.CONTENT)):
+            self.assertEqual(fulltext.get_document_fulltext(self.doc), self.CONTENT)
+        [cached] = self.cache.entries.values()
+        self.assertEqual(zlib.decompress(cached).decode(), self.CONTENT)
+
+    def test_excerpt_when_paperless_unreachable(self):
+        for error in (requests.ConnectionError("refused"), requests.Timeout("read timeout")):
+            client = FakeClient(error=error)
+            with patch.object(fulltext, "get_client", return_value=client):
+                self.assertEqual(fulltext.get_document_fulltext(self.doc), self.CONTENT[:20])
+        self.assertEqual(self.cache.entries, {})
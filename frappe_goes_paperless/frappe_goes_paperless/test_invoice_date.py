@@ -0,0 +1,121 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+from datetime import date
+
+from frappe_goes_paperless.frappe_goes_paperless.benchmark.invoice_corpus import (
+    KNOWN_MISSES,
+    LABELED_CORPUS,
+)
+from frappe_goes_paperless.frappe_goes_paperless.benchmark.invoice_date_bench import measure
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import (
+    CREATED_DIFFERS,
+    CREATED_IN_TEXT,
+    CREATED_UNSURE,
+    SOURCE_CREATED,
+    SOURCE_CUSTOM_FIELD,
+    extract_invoice_date_from_text,
+    invoice_date_from_metadata,
+    parse_date_with_month_name,
+)
+
+# Ergebnisse der bisherigen Implementierung, inklusive ihrer Eigenheiten
+REGRESSION_CORPUS = [
+    ("Rechnung Nr. 4711\nRechnungsdatum: 14.10.2025\nLieferdatum 01.10.2025", date(2025, 10, 14)),
+    ("Lieferdatum 01.10.2025 Rechnungsdatum 14.10.25.", date(2025, 10, 14)),
+    ("Quittungsdatum 3/2/2024 Summe 12,50 EUR", date(2024, 2, 3)),
+    ("Invoice Date October 14, 2025 Due Date November 13, 2025", date(2025, 10, 14)),
+    ("INVOICE DATE: Oct. 25, 2025", date(2025, 10, 25)),
+    ("Rechnung vom 30 Oktober 2025", date(2025, 10, 30)),
+    ("Belegdatum 2025-11-05 11:16AM PST", date(2025, 11, 5)),
+    ("Datum: 01.01.2009 Rechnungsdatum fehlt, Zahlung am 15.03.2024", date(2024, 3, 15)),
+    ("Betrag 12,50 EUR am 3,5,2024", date(2024, 5, 3)),
+    ("Rechnungsdatum 31.02.2025 Datum 28.02.2025", date(2025, 2, 28)),
+    # "24-07-19" passt vor dem ISO-Datum auf das numerische Muster
+    ("Kunde seit 1999-01-01, gedruckt 2024-07-19", date(2019, 7, 24)),
+    ("Bestellt im Mai, geliefert 14 mai 2024", date(2024, 5, 14)),
+    ("Datum: 14. März 2025", date(2025, 3, 14)),
+    ("due 5 sept. 24", date(2024, 9, 5)),
+    ("Artikel 4711-0815-2025 Rechnungsdatum: 2025-03-01", date(2025, 3, 1)),
+    ("Datum 00.00.0000 Rechnungsdatum 01.13.2025 Belegdatum 12.01.2025", date(2025, 1, 12)),
+    ("Rechnungsdatum\n\n   12.\n06.\n2025", None),
+    ("Text ohne Datum", None),
+    ("", None),
+]
+
+
+class TestInvoiceDate(unittest.TestCase):
+    def test_regression_corpus(self):
+        for text, expected in REGRESSION_CORPUS:
+            with self.subTest(text=text):
+                self.assertEqual(extract_invoice_date_from_text(text), expected)
+
+    def test_keyword_priority_over_position(self):
+        text = "Datum 01.02.2024 " + "x" * 50 + " Rechnungsdatum 03.04.2024"
+        self.assertEqual(extract_invoice_date_from_text(text), date(2024, 4, 3))
+
+    def test_date_beyond_snippet_falls_back_to_first_date(self):
+        text = "Rechnungsdatum " + "x " * 150 + "05.06.2024 07.08.2024"
+        self.assertEqual(extract_invoice_date_from_text(text), date(2024, 6, 5))
+
+    def test_month_name(self):
+        self.assertEqual(parse_date_with_month_name("October 14, 2025"), date(2025, 10, 14))
+        self.assertEqual(parse_date_with_month_name("30 Oktober 25"), date(2025, 10, 30))
+        self.assertIsNone(parse_date_with_month_name("32 Oktober 2025"))
+        self.assertIsNone(parse_date_with_month_name(""))
+
+
+class TestLabeledCorpus(unittest.TestCase):
+    def test_labeled_corpus(self):
+        for key, _lang, text, expected in LABELED_CORPUS:
+            with self.subTest(key=key):
+                found = extract_invoice_date_from_text(text)
+                if key in KNOWN_MISSES:
+                    self.assertNotEqual(found, expected, f"{key} is recognized now, remove it from KNOWN_MISSES")
+                else:
+                    self.assertEqual(found, expected)
+
+    def test_benchmark_report(self):
+        report = measure(LABELED_CORPUS, repeat=2)
+        self.assertEqual(report["extract"]["calls"], 2 * len(LABELED_CORPUS))
+        self.assertEqual(set(report["misses"]), KNOWN_MISSES)
+        self.assertAlmostEqual(report["accuracy"], 1 - len(KNOWN_MISSES) / len(LABELED_CORPUS), places=3)
+
+
+class TestInvoiceDateFromMetadata(unittest.TestCase):
+    PAYLOAD = {
+        "created": "2024-03-12T00:00:00+01:00",
+        "added": "2024-03-14T09:30:12.123456+01:00",
+        "content": "Rechnung vom 12.03.2024",
+        "custom_fields": [{"field": 7, "value": "2024-03-01"}, {"field": 3, "value": None}],
+    }
+
+    def test_custom_field_first(self):
+        self.assertEqual(
+            invoice_date_from_metadata(self.PAYLOAD, 7, CREATED_IN_TEXT),
+            (date(2024, 3, 1), SOURCE_CUSTOM_FIELD),
+        )
+
+    def test_created_by_confidence(self):
+        self.assertEqual(
+            invoice_date_from_metadata(self.PAYLOAD, 3, CREATED_IN_TEXT),
+            (date(2024, 3, 12), SOURCE_CREATED),
+        )
+        not_in_text = dict(self.PAYLOAD, content="Rechnung")
+        self.assertIsNone(invoice_date_from_metadata(not_in_text, None, CREATED_IN_TEXT))
+        self.assertEqual(invoice_date_from_metadata(not_in_text, None, CREATED_DIFFERS)[1], SOURCE_CREATED)
+        # created = Eingangsdatum -> hat Paperless nicht im Dokument gefunden
+        date_added = dict(not_in_text, added="2024-03-12T10:00:00+01:00")
+        self.assertIsNone(invoice_date_from_metadata(date_added, None, CREATED_DIFFERS))
+        self.assertIsNone(invoice_date_from_metadata(self.PAYLOAD, None, None))
+
+    def test_always_needs_plausible_created(self):
+        self.assertEqual(
+            invoice_date_from_metadata(self.PAYLOAD, None, CREATED_UNSURE),
+            (date(2024, 3, 12), SOURCE_CREATED),
+        )
+        for created in (None, "", "2009-12-31", "kein Datum", "2024-02-30"):
+            with self.subTest(created=created):
+                payload = dict(self.PAYLOAD, created=created)
+                self.assertIsNone(invoice_date_from_metadata(payload, None, CREATED_UNSURE))
@@ -0,0 +1,134 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import json
+import os
+import tempfile
+import unittest
+
+from frappe_goes_paperless.frappe_goes_paperless.legacy_import import (
+    DOCUMENT_TYPES,
+    FIELD_MAPPING,
+    Checkpoint,
+    LegacyImporter,
+    document_type,
+    iter_legacy_documents,
+    map_metadata,
+    parse_legacy_date,
+)
+
+
+class TestLegacyImport(unittest.TestCase):
+    def test_metadata(self):
+        data = {"Richtung": "eingehend", "Belegart": "Rechnung", "BelegNr": "R-1", "Ust": "", "UID": "x1"}
+        self.assertEqual(document_type(data), "Eingangsrechnung")
+        self.assertEqual(
+            map_metadata(data),
+            {"Richtung": "eingehend", "Belegart": "Rechnung", "Belegnummer": "R-1", "Inoxision UID": "x1"},
+        )
+        self.assertEqual(parse_legacy_date("28.02.2019"), "2019-02-28")
+        self.assertEqual(parse_legacy_date("2019-02-28T10:00:00"), "2019-02-28")
+        self.assertIsNone(parse_legacy_date("unbekannt"))
+
+    def test_iter_legacy_documents(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "2019"))
+            for stem, pdf in (("a", True), (os.path.join("2019", "b"), True), ("c", False)):
+                with open(os.path.join(directory, f"{stem}.json"), "w") as f:
+                    json.dump({}, f)
+                if pdf:
+                    open(os.path.join(directory, f"{stem}.pdf"), "wb").close()
+
+            found = {key: pdf is not None for key, _json, pdf in iter_legacy_documents(directory)}
+        self.assertEqual(found, {"a": True, os.path.join("2019", "b"): True, "c": False})
+
+    def test_checkpoint_resumes_latest_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.jsonl")
+            checkpoint = Checkpoint(path)
+            checkpoint.record("a", "uploaded", task="t1", fields={})
+            checkpoint.record("b", "uploaded", task="t2", fields={})
+            checkpoint.record("a", "done", document=7)
+            checkpoint.close()
+            # abgebrochene Zeile am Ende
+            with open(path, "a") as f:
+                f.write('{"key": "c", "sta')
+
+            resumed = Checkpoint(path)
+            resumed.close()
+        self.assertEqual(resumed.status("a"), "done")
+        self.assertEqual(list(resumed.pending_tasks()), ["t2"])
+        self.assertIsNone(resumed.status("c"))
+
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakePaperless:
+    """Answers the requests of LegacyImporter for one finished consumption task."""
+
+    timeout = (1, 1)
+
+    def __init__(self, patch_fails=False):
+        self.patch_fails = patch_fails
+        self.acknowledged = []
+        self.patched = []
+
+    def iter_results(self, path, params=None, page_size=None):
+        names = FIELD_MAPPING if path == "custom_fields/" else set(DOCUMENT_TYPES.values())
+        return [{"id": i, "name": name} for i, name in enumerate(names, 1)]
+
+    def get(self, path, params=None):
+        tasks = [{"id": 11, "task_id": "t1", "status": "SUCCESS", "related_document": "42"}]
+        return FakeResponse([] if self.acknowledged else tasks)
+
+    def patch(self, path, json=None):
+        if self.patch_fails:
+            raise RuntimeError("interrupted")
+        self.patched.append(path)
+        return FakeResponse({})
+
+    def post(self, path, json=None, **kwargs):
+        self.acknowledged += json["tasks"]
+        return FakeResponse({})
+
+
+class TestLegacyImporterResume(unittest.TestCase):
+    def test_task_acknowledged_only_after_done(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, ".checkpoint.jsonl")
+            checkpoint = Checkpoint(path)
+            checkpoint.record("a", "uploaded", task="t1", fields={"Belegnummer": "R-1"})
+
+            # Lauf bricht beim PATCH ab: Task bleibt offen, Eintrag "uploaded"
+            client = FakePaperless(patch_fails=True)
+            LegacyImporter(checkpoint, client=client, workers=1, poll_interval=0).run(directory)
+            checkpoint.close()
+            self.assertEqual(client.acknowledged, [])
+
+            resumed = Checkpoint(path)
+            self.assertEqual(list(resumed.pending_tasks()), ["t1"])
+            client = FakePaperless()
+            messages = []
+            importer = LegacyImporter(
+                resumed, client=client, workers=1, poll_interval=0, progress=messages.append
+            )
+            result = importer.run(directory)
+            resumed.close()
+
+        self.assertEqual(client.patched, ["documents/42/"])
+        self.assertEqual(client.acknowledged, [11])
+        self.assertEqual(result["done"], 1)
+        self.assertEqual(resumed.status("a"), "done")
+        self.assertTrue(messages and messages[0].startswith("Legacy import -> "))
@@ -0,0 +1,19 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+
+from frappe_goes_paperless.frappe_goes_paperless.search import like_pattern, parse_query
+
+
+class TestSearchQuery(unittest.TestCase):
+    def test_parse_query(self):
+        self.assertEqual(
+            parse_query('Rechnung "Muster GmbH" +2024'),
+            [("Rechnung", False), ("Muster GmbH", True), ("2024", False)],
+        )
+
+    def test_like_pattern_escapes_wildcards(self):
+        self.assertEqual(like_pattern("R_1"), "%R\\_1%")
+        self.assertEqual(like_pattern("100%"), "%100\\%%")
+        self.assertEqual(like_pattern("a\\b"), "%a\\\\b%")
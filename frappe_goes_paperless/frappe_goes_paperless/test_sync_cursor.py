@@ -0,0 +1,79 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+from unittest.mock import patch
+
+from frappe_goes_paperless.frappe_goes_paperless import tools
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeDocuments:
+    """documents/ with `ordering=modified,id`, `modified__gte` and page numbers."""
+
+    def __init__(self, modified):
+        # {id: modified}
+        self.modified = dict(modified)
+        self.requests = []
+        self.on_request = None
+
+    def get(self, path, params=None):
+        self.requests.append(dict(params))
+        if self.on_request:
+            self.on_request(len(self.requests))
+        docs = sorted(
+            ({"id": id, "modified": m} for id, m in self.modified.items()
+             if not params.get("modified__gte") or m >= params["modified__gte"]),
+            key=lambda d: (d["modified"], d["id"]),
+        )
+        size, page = params["page_size"], params["page"]
+        results = docs[(page - 1) * size: page * size]
+        return FakeResponse({"results": results, "next": "more" if page * size < len(docs) else None})
+
+
+def changed_ids(client, since=None, page_size=2):
+    with patch.object(tools, "get_client", return_value=client):
+        return [d["id"] for page in tools.iter_changed_documents(since, page_size=page_size) for d in page]
+
+
+class TestIterChangedDocuments(unittest.TestCase):
+    def test_keyset_paging_returns_each_document_once(self):
+        client = FakeDocuments({1: "a", 2: "a", 3: "b", 4: "b", 5: "b", 6: "c", 7: "d"})
+        self.assertEqual(changed_ids(client), [1, 2, 3, 4, 5, 6, 7])
+        # die Seite endet mit "a" -> naechste Untergrenze, wieder ab Seite 1
+        self.assertEqual(client.requests[1]["modified__gte"], "a")
+        self.assertEqual(client.requests[1]["page"], 1)
+
+    def test_page_with_one_timestamp_turns_the_page(self):
+        client = FakeDocuments({id: "a" for id in range(1, 6)})
+        self.assertEqual(changed_ids(client), [1, 2, 3, 4, 5])
+        # erst ohne Untergrenze, dann ab "a" weiterblaettern
+        self.assertEqual(
+            [(r.get("modified__gte"), r["page"]) for r in client.requests],
+            [(None, 1), ("a", 1), ("a", 2), ("a", 3)],
+        )
+
+    def test_since_is_lower_bound(self):
+        client = FakeDocuments({1: "a", 2: "b", 3: "c"})
+        self.assertEqual(changed_ids(client, since="b"), [2, 3])
+        self.assertEqual(client.requests[0]["modified__gte"], "b")
+
+    def test_document_changed_during_sync_comes_again(self):
+        client = FakeDocuments({1: "a", 2: "b", 3: "c", 4: "d"})
+
+        def touch(request_no):
+            if request_no == 2:
+                client.modified[1] = "e"
+
+        client.on_request = touch
+        self.assertEqual(changed_ids(client), [1, 2, 3, 4, 1])
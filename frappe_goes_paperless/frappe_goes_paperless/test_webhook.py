@@ -0,0 +1,92 @@
+# Copyright (c) 2024, itsdave GmbH and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from frappe_goes_paperless.frappe_goes_paperless import webhook
+
+TOKEN = "test-webhook-token"
+DOCUMENT_IDS = range(7, 12)
+
+
+class TestWebhook(FrappeTestCase):
+    def setUp(self):
+        frappe.local.form_dict = frappe._dict()
+        self.token = patch.object(webhook, "get_webhook_token", return_value=TOKEN)
+        self.token.start()
+        self.enqueue = patch.object(frappe, "enqueue")
+        self.enqueued = self.enqueue.start()
+        self.clear_states()
+
+    def tearDown(self):
+        self.token.stop()
+        self.enqueue.stop()
+        self.clear_states()
+
+    def clear_states(self):
+        for document_id in DOCUMENT_IDS:
+            frappe.cache().delete(webhook._state_key(document_id))
+
+    def test_parse_document_id(self):
+        self.assertEqual(webhook.parse_document_id({"document_id": "12"}), 12)
+        self.assertEqual(webhook.parse_document_id({"doc_url": "https://paperless/documents/34/details"}), 34)
+        self.assertIsNone(webhook.parse_document_id({"doc_url": "https://paperless/"}))
+
+    def test_rejects_wrong_token(self):
+        frappe.local.form_dict = frappe._dict(token="wrong", document_id=1)
+        with self.assertRaises(frappe.AuthenticationError):
+            webhook.document_event()
+        self.enqueued.assert_not_called()
+
+    def state(self, document_id):
+        value = frappe.cache().get(webhook._state_key(document_id))
+        return value.decode() if value else None
+
+    def test_queues_one_import_per_document(self):
+        frappe.local.form_dict = frappe._dict(token=TOKEN, document_id=7)
+        self.assertEqual(webhook.document_event(), {"queued": 7})
+        webhook.document_event()
+        self.enqueued.assert_called_once()
+        self.assertEqual(self.enqueued.call_args.kwargs["document_id"], 7)
+        self.assertEqual(self.state(7), webhook.PENDING)
+
+    def test_job_imports_until_no_event_is_pending(self):
+        webhook.enqueue_document_import(8)
+        with patch.object(webhook, "sync_documents") as sync:
+            webhook.import_document(8)
+        sync.assert_called_once_with(paperless_document=8)
+        self.assertIsNone(self.state(8))
+
+    def test_event_during_import_imports_again(self):
+        webhook.enqueue_document_import(9)
+        self.enqueued.reset_mock()
+        events = [lambda: webhook.enqueue_document_import(9)]
+
+        def sync_documents(paperless_document):
+            if events:
+                events.pop()()
+
+        with patch.object(webhook, "sync_documents", side_effect=sync_documents) as sync:
+            webhook.import_document(9)
+        self.assertEqual(sync.call_count, 2)
+        self.enqueued.assert_not_called()
+        self.assertIsNone(self.state(9))
+
+    def test_event_after_release_queues_new_job(self):
+        # das Event kommt, nachdem der Job freigegeben hat, RQ ihn aber noch als "started" fuehrt
+        webhook.enqueue_document_import(10)
+        with patch.object(webhook, "sync_documents"):
+            webhook.import_document(10)
+        self.enqueued.reset_mock()
+        webhook.enqueue_document_import(10)
+        self.enqueued.assert_called_once()
+
+    def test_failed_import_releases_document(self):
+        webhook.enqueue_document_import(11)
+        with patch.object(webhook, "sync_documents", side_effect=RuntimeError("down")):
+            with self.assertRaises(RuntimeError):
+                webhook.import_document(11)
+        self.assertIsNone(self.state(11))
@@ -0,0 +1,79 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# See license.txt
+
+import unittest
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from frappe_goes_paperless.frappe_goes_paperless import writeback
+
+TAG_IDS = {"new": 10, "Workflow Successful": 11}
+LINK_FIELD_ID = 5
+
+
+class TestPlanBulkEdits(unittest.TestCase):
+    def test_groups_by_status_and_doctype(self):
+        states = {
+            3: {"status": "new", "doctype": None},
+            1: {"status": "Workflow Successful", "doctype": "Purchase Invoice"},
+            2: {"status": "Workflow Successful", "doctype": "Purchase Invoice"},
+            # Status ohne Tag: nur das Custom Field
+            4: {"status": "Unknown", "doctype": "Sales Invoice"},
+        }
+        edits = {
+            (p["method"], str(p["parameters"])): ids
+            for ids, p in writeback.plan_bulk_edits(states, TAG_IDS, LINK_FIELD_ID)
+        }
+        self.assertEqual(
+            edits,
+            {
+                ("modify_tags", str({"add_tags": [10], "remove_tags": [11]})): [3],
+                ("modify_tags", str({"add_tags": [11], "remove_tags": [10]})): [1, 2],
+                ("modify_custom_fields", str({"add_custom_fields": {}, "remove_custom_fields": [5]})): [3],
+                (
+                    "modify_custom_fields",
+                    str({"add_custom_fields": {"5": "Purchase Invoice"}, "remove_custom_fields": []}),
+                ): [1, 2],
+                (
+                    "modify_custom_fields",
+                    str({"add_custom_fields": {"5": "Sales Invoice"}, "remove_custom_fields": []}),
+                ): [4],
+            },
+        )
+
+    def test_chunks_large_batches(self):
+        states = {id: {"status": "new", "doctype": None} for id in range(1, writeback.BULK_SIZE + 2)}
+        edits = writeback.plan_bulk_edits(states, TAG_IDS, LINK_FIELD_ID)
+        tag_edits = [ids for ids, p in edits if p["method"] == "modify_tags"]
+        self.assertEqual([len(ids) for ids in tag_edits], [writeback.BULK_SIZE, 1])
+        for ids, payload in edits:
+            self.assertEqual(payload["documents"], ids)
+
+
+class TestWritebackQueue(FrappeTestCase):
+    def setUp(self):
+        frappe.cache().delete(frappe.cache().make_key(writeback.QUEUE_KEY))
+
+    def tearDown(self):
+        frappe.cache().delete(frappe.cache().make_key(writeback.QUEUE_KEY))
+
+    def test_later_change_replaces_earlier(self):
+        with patch.object(frappe, "enqueue"):
+            writeback.queue_writeback(7, "new")
+            writeback.queue_writeback(7, "Workflow Successful", "Purchase Invoice")
+        self.assertEqual(
+            writeback._take_queue(), {7: {"status": "Workflow Successful", "doctype": "Purchase Invoice"}}
+        )
+        self.assertEqual(writeback._take_queue(), {})
+
+    def test_requeue_keeps_newer_changes(self):
+        with patch.object(frappe, "enqueue"):
+            writeback.queue_writeback(8, "Workflow Successful")
+        failed = {7: {"status": "new", "doctype": None}, 8: {"status": "new", "doctype": None}}
+        writeback._requeue(failed)
+        self.assertEqual(
+            writeback._take_queue(),
+            {7: {"status": "new", "doctype": None}, 8: {"status": "Workflow Successful", "doctype": None}},
+        )
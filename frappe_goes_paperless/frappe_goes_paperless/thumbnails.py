@@ -0,0 +1,77 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.utils import cint
+from werkzeug.wrappers import Response
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE, get_client
+from frappe_goes_paperless.frappe_goes_paperless.disk_cache import get_disk_cache
+
+THUMBNAIL_METHOD = "frappe_goes_paperless.frappe_goes_paperless.thumbnails.get_thumbnail"
+DEFAULT_CACHE_SIZE_MB = 200
+# der Proxy ist nur fuer angemeldete Benutzer, daher "private"
+CACHE_CONTROL = "private, max-age=86400"
+
+
+def thumbnails_on_demand():
+    """True if thumbnails are proxied on first view instead of stored as File."""
+    mode = frappe.db.get_single_value(SETTINGS_DOCTYPE, "thumbnail_mode")
+    return (mode or "On Demand") == "On Demand"
+
+
+def thumbnail_url(document_id):
+    return f"/api/method/{THUMBNAIL_METHOD}?document_id={cint(document_id)}"
+
+
+def get_thumbnail_cache():
+    size_mb = (
+        cint(frappe.db.get_single_value(SETTINGS_DOCTYPE, "thumbnail_cache_size")) or DEFAULT_CACHE_SIZE_MB
+    )
+    return get_disk_cache("thumbnails", size_mb * 1024 * 1024)
+
+
+def invalidate_thumbnail(document_id):
+    get_thumbnail_cache().delete(f"{cint(document_id)}.webp")
+
+
+@frappe.whitelist(methods=["GET"])
+def get_thumbnail(document_id):
+    """Serve the thumbnail of a Paperless document.
+
+    It is downloaded from Paperless-ngx on the first request and then served
+    from a size-bounded disk cache, with ETag and Cache-Control headers so
+    browsers revalidate instead of downloading it again. Only documents that
+    were imported as Paperless Document and that the user may read are served.
+    """
+    document_id = cint(document_id)
+    # nur Thumbnails importierter Dokumente, mit den Rechten auf das Dokument
+    name = None
+    if document_id > 0:
+        name = frappe.db.get_value("Paperless Document", {"paperless_document_id": document_id})
+    if not name:
+        raise frappe.DoesNotExistError(f"Paperless Document {document_id} not found")
+    frappe.has_permission("Paperless Document", "read", doc=name, throw=True)
+
+    cache = get_thumbnail_cache()
+    key = f"{document_id}.webp"
+
+    content = cache.get(key)
+    if content is None:
+        response = get_client().get(f"documents/{document_id}/thumb/")
+        if response.status_code != 200 or not response.content:
+            return Response(status=404)
+        content = response.content
+        cache.set(key, content)
+
+    etag = f'"{hashlib.sha1(content).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if etag in (frappe.get_request_header("If-None-Match") or ""):
+        return Response(status=304, headers=headers)
+
+    # aeltere Paperless-Versionen liefern PNG statt WebP
+    mimetype = "image/png" if content.startswith(b"\x89PNG") else "image/webp"
+    return Response(content, mimetype=mimetype, headers=headers)
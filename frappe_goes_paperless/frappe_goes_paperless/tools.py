@@ -2,492 +2,559 @@
 # For license information, please see license.txt
 
 import frappe
-from frappe.utils.password import get_decrypted_password
-import requests
-import re
-from datetime import date
+from frappe.utils import cint
+
+from frappe_goes_paperless.frappe_goes_paperless import metrics
+from frappe_goes_paperless.frappe_goes_paperless.backfill import (
+    DEFAULT_BATCH_SIZE,
+    INVOICE_DATE_FIELDS,
+    invoice_date_outdated,
+    run_backfill,
+    set_invoice_date,
+)
+from frappe_goes_paperless.frappe_goes_paperless.boot import get_boot_config
+from frappe_goes_paperless.frappe_goes_paperless.client import (
+    SETTINGS_DOCTYPE,
+    get_client,
+    get_paperless_settings,
+)
+from frappe_goes_paperless.frappe_goes_paperless.fulltext import (
+    content_hash,
+    get_document_fulltext,
+    set_fulltext,
+)
+from frappe_goes_paperless.frappe_goes_paperless.invoice_date import (
+    METADATA_SOURCES,
+    SOURCE_MANUAL,
+    extract_invoice_date_from_text,
+)
+from frappe_goes_paperless.frappe_goes_paperless.lookups import SyncLookups
+from frappe_goes_paperless.frappe_goes_paperless.pipeline import ImportPipeline
+from frappe_goes_paperless.frappe_goes_paperless.progress import get_rq_job_status, publish_progress
+from frappe_goes_paperless.frappe_goes_paperless.thumbnails import (
+    invalidate_thumbnail,
+    thumbnail_url,
+    thumbnails_on_demand,
+)
+
+# hoechstens ein Backfill-Job gleichzeitig
+BACKFILL_JOB_ID = "paperless_invoice_date_backfill"
 
 @frappe.whitelist()
 def installed_apps():
-    return ['ai_workflows']
-
-def get_paperless_settings():
-    settings = frappe.get_doc("Paperless-ngx Settings", "Paperless-ngx Settings")
-    api_token = get_decrypted_password(
-        doctype="Paperless-ngx Settings",
-        name="Paperless-ngx Settings",
-        fieldname="api_token",
-        raise_exception=False,
-    )
-    return settings.paperless_ngx_server, api_token
+    # fuer Clients ohne frappe.boot.paperless
+    return get_boot_config()["installed_apps"]
 
 
 def get_paperless_ids():
-    server_url, api_token = get_paperless_settings()
-    response = requests.get(
-        f"{server_url.rstrip('/')}/api/documents/",
-        headers={
-            "Authorization": f"Token {api_token}",
-            "Content-Type": "application/json",
-        },
-    )
-    if response.status_code == 200:
-        if len(response.json()) > 0:
-            return response.json()["all"]
+    response = get_client().get_json("documents/")
+    if response:
+        return response["all"]
     return None
 
 
 def get_paperless_fulltext(document_id):
-    server_url, api_token = get_paperless_settings()
-    response = requests.get(
-        f"{server_url.rstrip('/')}/api/documents/{document_id}/",
-        headers={
-            "Authorization": f"Token {api_token}",
-            "Content-Type": "application/json",
-        },
-    )
-    if response.status_code == 200:
-        if len(response.json()) > 0:
-            return response.json()["content"]
+    response = get_client().get_json(f"documents/{document_id}/")
+    if response:
+        return response["content"]
     return None
 
 
 # Get data from paperless-ngx
 def paperless_api(place, id):
-    server_url, api_token = get_paperless_settings()
-    response = requests.get(
-        f"{server_url.rstrip('/')}/api/{place}/{id}/",
-        headers={
-            "Authorization": f"Token {api_token}",
-            "Content-Type": "application/json",
-        },
-    )
-    if response.status_code == 200:
-        if len(response.json()) > 0:
-            return response.json()
-    return None
+    return get_client().get_json(f"{place}/{id}/")
 
 
 # Get document thumbprint image
+def fetch_paperless_docthumb(id, client=None):
+    """Download the thumbnail of a Paperless document (thread safe, no DB access)."""
+    response = (client or get_client()).get(f"documents/{id}/thumb/")
+    if response.status_code == 200 and response.content:
+        return response.content
+    return None
+
+
+def attach_paperless_docthumb(id, docname, content):
+    file_doc = frappe.new_doc("File")
+    file_doc.file_name = f"docthumb-{id}.webp"
+    file_doc.attached_to_doctype = "Paperless Document"
+    file_doc.attached_to_name = docname
+    file_doc.content = content
+    file_doc.decode = False
+    file_doc.is_private = False
+    file_doc.insert(ignore_permissions=True)
+    return file_doc.file_url
+
+
 def get_paperless_docthumb(id, docname):
-    server_url, api_token = get_paperless_settings()
-    response = requests.get(
-        f"{server_url.rstrip('/')}/api/documents/{id}/thumb/",
-        headers={"Authorization": f"Token {api_token}"},
-    )
-    if response.status_code == 200:
-        if response.content:
-            file_doc = frappe.new_doc("File")
-            file_doc.file_name = f"docthumb-{id}.webp"
-            file_doc.attached_to_doctype = "Paperless Document"
-            file_doc.attached_to_name = docname
-            file_doc.content = response.content
-            file_doc.decode = False
-            file_doc.is_private = False
-            file_doc.insert(ignore_permissions=True)
-            frappe.db.commit()
-            return file_doc.file_url
+    content = fetch_paperless_docthumb(id)
+    if content:
+        file_url = attach_paperless_docthumb(id, docname, content)
+        frappe.db.commit()
+        return file_url
     return None
 
 
-@frappe.whitelist()
-def sync_documents(paperless_document=None):
-    # Get all ids from paperless
-    if paperless_document:
-        ids = [paperless_document]
-    else:
-        ids = get_paperless_ids()
-    if not ids:
-        return False
-    # get all ids from frappe
-    docs = frappe.get_all("Paperless Document", fields=["paperless_document_id"])
-    # Get a array with missing ids (compare the two lists of ids)
-    mis = list(
-        set(ids)
-        - set(
-            [
-                int(id["paperless_document_id"])
-                for id in docs
-                if id.get("paperless_document_id") is not None
-            ]
-        )
-    )
-    for id in mis:
+def attach_paperless_docthumbs(thumbnails):
+    """Attach downloaded thumbnails to already inserted Paperless Documents.
+
+    `thumbnails` is a list of (paperless id, docname, content). `thumbprint`
+    is set with a plain column update instead of saving the document again.
+    """
+    for id, docname, content in thumbnails:
+        frappe.db.savepoint("paperless_thumb")
         try:
-            get_document = paperless_api("documents", id)
-            if not get_document:
-                continue
-            # Get frappe doctype by Paperless doctype
-            response = paperless_api("document_types", get_document["document_type"])
-            if response is not None:
-                paperless_doctype = response["name"]
-            else:
-                paperless_doctype = None
-            frappe_doctype = frappe.get_all(
-                "Paperless Document Type Mapping",
-                fields=["frappe_doctype"],
-                filters={"paperless_document_type": paperless_doctype},
-            )
-            frappe_doctype = (
-                frappe_doctype[0]["frappe_doctype"] if len(frappe_doctype) > 0 else None
+            file_url = attach_paperless_docthumb(id, docname, content)
+            frappe.db.set_value(
+                "Paperless Document", docname, "thumbprint", file_url, update_modified=False
             )
+        except Exception as e:
+            # Dokument bleibt ohne Vorschaubild bestehen
+            frappe.db.rollback(save_point="paperless_thumb")
+            frappe.log_error(f"Failed to attach thumbnail of Paperless document {id}: {e}")
 
-            # add document
-            new_doc = frappe.new_doc("Paperless Document")
-            new_doc.paperless_document_id = id
-            correspondent = paperless_api(
-                "correspondents", get_document["correspondent"]
-            )
-            new_doc.paperless_correspondent = (
-                correspondent["name"] if correspondent else None
-            )
-            new_doc.paperless_documenttype = paperless_doctype
-            new_doc.status = "new"
-            new_doc.frappe_doctype = frappe_doctype
-            new_doc.document_fulltext = get_document["content"]
-            # -> Rechnungsdatum aus dem Volltext ziehen
-            invoice_date = extract_invoice_date_from_text(new_doc.document_fulltext)
-            if invoice_date:
-                new_doc.invoice_date = invoice_date
-            new_doc.save()
-            thumbimage = get_paperless_docthumb(id, new_doc.name)
-            if thumbimage:
-                new_doc.thumbprint = thumbimage
-            new_doc.save()
-            frappe.db.commit()
-            print(f"Document added -> {get_document['title']}")
+
+def iter_paperless_documents(ids, page_size=100, result=None):
+    """Yield pages (lists) of Paperless document payloads for the given IDs.
+
+    Walks `/api/documents/?id__in=...` with `page_size` IDs per request, so
+    only one page is held in memory at a time. IDs of chunks that could not
+    be fetched are counted as failed in `result`.
+    """
+    client = get_client()
+    ids = sorted(ids)
+    for i in range(0, len(ids), page_size):
+        chunk = ids[i: i + page_size]
+        params = {
+            "id__in": ",".join(str(id) for id in chunk),
+            "ordering": "id",
+        }
+        try:
+            yield from client.iter_pages("documents/", params=params, page_size=page_size)
         except Exception as e:
-            # Handle HTTP errors
-            msg = f"Failed to fetch documents from Paperless-ngx: {e}"
-            print(msg)
+            if result is not None:
+                result["failed"] += len(chunk)
+            msg = f"Failed to fetch documents {chunk[0]}-{chunk[-1]} from Paperless-ngx: {e}"
             frappe.log_error(msg)
 
 
-@frappe.whitelist()
-def job_status(jobid):
-    getStatus = None
-    getJob = [
-        (j.job_id, j.status)
-        for j in frappe.get_all("RQ Job", filters={"job_id": jobid})
-        if j.job_id == jobid
-    ]
-    if len(getJob) > 0:
-        for job_id, status in getJob:
-            if job_id == jobid:
-                getStatus = status
-                break
-    return getStatus
-
-#Parsen des Rechnungsdatums
-
-MONTH_NAME_MAP = {
-    # Deutsch
-    "januar": "01", "jan": "01", "jan.": "01",
-    "februar": "02", "feb": "02", "feb.": "02",
-    "märz": "03", "maerz": "03", "mrz": "03", "mrz.": "03",
-    "april": "04", "apr": "04", "apr.": "04",
-    "mai": "05",
-    "juni": "06", "jun": "06", "jun.": "06",
-    "juli": "07", "jul": "07", "jul.": "07",
-    "august": "08", "aug": "08", "aug.": "08",
-    "september": "09", "sep": "09", "sep.": "09", "sept": "09", "sept.": "09",
-    "oktober": "10", "okt": "10", "okt.": "10",
-    "november": "11", "nov": "11", "nov.": "11",
-    "dezember": "12", "dez": "12", "dez.": "12",
-
-    # Englisch
-    "january": "01",
-    "february": "02",
-    "march": "03",
-    "april": "04",
-    "may": "05",
-    "june": "06",
-    "july": "07",
-    "august": "08",
-    "september": "09",
-    "october": "10", "oct": "10", "oct.": "10",
-    "november": "11",
-    "december": "12", "dec": "12", "dec.": "12",
-}
-
-
-def parse_date_with_month_name(text: str):
-    """Parst Datumsangaben mit ausgeschriebenem Monat (de/en).
-
-    Beispiele:
-    - '30 Oktober 2025'
-    - 'October 14, 2025'
-    - 'Invoice Date Oct 25, 2025'
-    """
+def iter_changed_documents(since=None, page_size=100):
+    """Yield pages of Paperless documents modified at or after `since`.
 
-    if not text:
-        return None
+    Documents are ordered by `modified` and paged by keyset (the `modified`
+    value of the last document of a page becomes the next lower bound), so
+    documents changed while the sync is running are neither skipped nor
+    returned twice.
+    """
+    client = get_client()
+    cursor = since
+    seen = set()
+    page = 1
+    while True:
+        params = {"ordering": "modified,id", "page_size": page_size, "page": page}
+        if cursor:
+            params["modified__gte"] = cursor
+        response = client.get("documents/", params=params)
+        response.raise_for_status()
+        data = response.json()
+        results = data.get("results") or []
 
-    s = text.lower()
+        yield [r for r in results if r["id"] not in seen]
 
-    # Satzzeichen / Trenner in Spaces umwandeln
-    for ch in [",", ";", "(", ")", "|", "-", "/", "."]:
-        s = s.replace(ch, " ")
+        if not data.get("next") or not results:
+            break
 
-    # aus mehreren Whitespaces eins machen
-    s = " ".join(s.split())
+        last_modified = results[-1]["modified"]
+        if last_modified != cursor:
+            cursor, page, seen = last_modified, 1, set()
+        else:
+            # ganze Seite mit gleichem Zeitstempel -> weiterblaettern
+            page += 1
+        seen.update(r["id"] for r in results if r["modified"] == cursor)
 
-    # Regex-Baustein für alle bekannten Monatsnamen
-    month_alternatives = "|".join(re.escape(m) for m in MONTH_NAME_MAP.keys())
 
-    # Variante 1: 14 oktober 2025
-    pattern1 = re.compile(
-        rf"(\d{{1,2}})\s+({month_alternatives})\s+(\d{{2,4}})",
-        re.IGNORECASE,
-    )
-    # Variante 2: october 14 2025  / october 14, 2025
-    pattern2 = re.compile(
-        rf"({month_alternatives})\s+(\d{{1,2}})\s+(\d{{2,4}})",
-        re.IGNORECASE,
+def get_paperless_high_water_mark():
+    """Return the `modified` timestamp of the most recently changed document."""
+    response = get_client().get_json(
+        "documents/", params={"ordering": "-modified", "page_size": 1, "fields": "id,modified"}
     )
+    if response and response.get("results"):
+        return response["results"][0]["modified"]
+    return None
 
-    m = pattern1.search(s)
-    if not m:
-        m = pattern2.search(s)
 
-    if not m:
-        return None
+def get_sync_cursor():
+    return frappe.db.get_single_value(SETTINGS_DOCTYPE, "sync_cursor")
 
-    if m.re is pattern1:
-        day, month_name, year = m.groups()
-    else:
-        month_name, day, year = m.groups()
 
-    month_name = month_name.lower()
-    month = MONTH_NAME_MAP.get(month_name)
-    if not month:
-        return None
+def set_sync_cursor(cursor):
+    frappe.db.set_single_value(SETTINGS_DOCTYPE, "sync_cursor", cursor)
+    frappe.db.commit()
 
-    day = int(day)
-    if not (1 <= day <= 31):
-        return None
 
-    # zwei-stellige Jahre -> 20xx
-    if len(year) == 2:
-        year = "20" + year
-    year = int(year)
+def build_paperless_document(payload, lookups, thumbnail_proxy=False):
+    """Build a new (unsaved) Paperless Document from a Paperless API payload.
 
-    try:
-        return frappe.utils.getdate(f"{year:04d}-{month}-{day:02d}")
-    except Exception:
-        return None
+    With `thumbnail_proxy` the thumbprint points to the on-demand thumbnail
+    endpoint instead of a File that has to be attached later.
+    """
+    # Get frappe doctype by Paperless doctype
+    paperless_doctype = lookups.document_type_name(payload["document_type"])
+
+    new_doc = frappe.new_doc("Paperless Document")
+    new_doc.paperless_document_id = payload["id"]
+    new_doc.paperless_correspondent = lookups.correspondent_name(payload["correspondent"])
+    new_doc.paperless_documenttype = paperless_doctype
+    new_doc.status = "new"
+    new_doc.frappe_doctype = lookups.frappe_doctype(paperless_doctype)
+    set_fulltext(new_doc, payload["content"])
+    # -> Rechnungsdatum aus Custom Field / created, sonst aus dem Volltext
+    #    (auch wenn nur ein Auszug gespeichert wird)
+    set_invoice_date(new_doc, payload["content"], lookups.invoice_date_metadata(payload))
+    if thumbnail_proxy:
+        new_doc.thumbprint = thumbnail_url(payload["id"])
+    return new_doc
+
+
+def update_paperless_document(name, payload, lookups):
+    """Apply changes of a Paperless payload to an existing Paperless Document.
+
+    Returns True if the document had to be saved.
+    """
+    doc = frappe.get_doc("Paperless Document", name)
+    paperless_doctype = lookups.document_type_name(payload["document_type"])
+
+    changes = {
+        "paperless_correspondent": lookups.correspondent_name(payload["correspondent"]),
+        "paperless_documenttype": paperless_doctype,
+    }
+    # Doctype nur aendern, solange noch kein Frappe-Dokument verknuepft ist
+    if not doc.frappe_document:
+        changes["frappe_doctype"] = lookups.frappe_doctype(paperless_doctype)
+
+    changes = {k: v for k, v in changes.items() if (doc.get(k) or None) != (v or None)}
 
-def extract_invoice_date_from_text(text: str):
-    """Einfache, robuste Datumserkennung für Rechnungen/Quittungen.
+    content = payload["content"] or ""
+    if doc.fulltext_hash:
+        text_changed = doc.fulltext_hash != content_hash(content)
+    else:
+        text_changed = (doc.document_fulltext or "") != content
+    resolved = lookups.invoice_date_metadata(payload)
+    if not changes and not text_changed and not invoice_date_outdated(doc, resolved):
+        return False
 
-    Strategie:
-    1. Suche nach 'Rechnungsdatum', 'Quittungsdatum', 'Invoice Date',
-       'due', 'Belegdatum', 'Datum', usw. und nimm das erste Datum danach.
-    2. Falls dort nichts gefunden wird: nimm das erste plausible Datum im Text.
+    doc.update(changes)
+    if text_changed:
+        set_fulltext(doc, content)
+    # neuer Hash oder andere Metadaten -> neu bestimmen, ein von Hand gesetztes Datum bleibt
+    set_invoice_date(doc, content, resolved)
+    doc.save()
+    invalidate_thumbnail(payload["id"])
+    return True
+
+
+def sync_document_page(page, lookups, result, pipeline):
+    """Import new and update existing documents of one page of payloads.
+
+    Updates are written directly, new documents go through `pipeline`, which
+    downloads their thumbnails concurrently. The page is committed once at the
+    end. Counts are added to `result`; returns False if any document failed.
     """
+    existing = {
+        cint(d.paperless_document_id): d.name
+        for d in frappe.get_all(
+            "Paperless Document",
+            filters={"paperless_document_id": ["in", [p["id"] for p in page]]},
+            fields=["name", "paperless_document_id"],
+        )
+    } if page else {}
 
-    if not text:
-        return None
-
-    # Normalisieren
-    normalized = " ".join(text.replace("\n", " ").split())
-    normalized = re.sub(r"(?<=\d),(?=\d)", ".", normalized)
-    lower = normalized.lower()
-
-    # Keywords, nach denen wir bevorzugt in der Nähe suchen
-    keywords = [
-        "rechnungsdatum",
-        "quittungsdatum",
-        "invoice date",
-        "belegdatum",
-        "rechnung vom",
-        "due",
-        "datum",
-    ]
-
-    # Muster
-    numeric_pattern = re.compile(r"(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4}\.?)")  # 20.10.25.
-    iso_pattern = re.compile(r"(\d{4}-\d{2}-\d{2})")                        # 2025-11-05
-
-    def _parse_numeric(raw: str):
-        # Punkt am Ende abschneiden, z. B. 20.10.25.
-        raw = raw.strip().rstrip(".")
-        parts = re.split(r"[.\-/]", raw)
-        if len(parts) != 3:
-            return None
-        d, m, y = parts
-        d = int(d)
-        m = int(m)
-        if len(y) == 2:
-            y = 2000 + int(y)
-        else:
-            y = int(y)
+    failed_before = result["failed"]
+    for get_document in page:
+        name = existing.get(get_document["id"])
+        if not name:
+            pipeline.submit(get_document)
+            continue
+        frappe.db.savepoint("paperless_import")
         try:
-            return frappe.utils.getdate(f"{y:04d}-{m:02d}-{d:02d}")
-        except Exception:
-            return None
+            with metrics.stage("save"):
+                updated = update_paperless_document(name, get_document, lookups)
+            if updated:
+                result["updated"] += 1
+                frappe.logger("paperless").info(f"Document updated -> {get_document['title']}")
+        except Exception as e:
+            _log_import_error(get_document, e, result)
 
-    def _is_plausible(d):
-        return d and str(d) >= "2010-01-01"
+    pipeline.drain()
+    with metrics.stage("commit"):
+        frappe.db.commit()
+    return result["failed"] == failed_before
 
-    # 1) Erst in der Nähe der Keywords suchen
-    for kw in keywords:
-        idx = lower.find(kw)
-        if idx == -1:
-            continue
 
-        snippet = normalized[idx: idx + 200]
-
-        # 1a) numerische Formate (20.10.25., 20-10-2025)
-        for raw in numeric_pattern.findall(snippet):
-            parsed = _parse_numeric(raw)
-            if _is_plausible(parsed):
-                return parsed
-
-        # 1b) ISO in der Nähe (2025-11-05)
-        m = iso_pattern.search(snippet)
-        if m:
-            try:
-                parsed = frappe.utils.getdate(m.group(1))
-            except Exception:
-                parsed = None
-            if _is_plausible(parsed):
-                return parsed
-
-
-        # 1c) ausgeschriebener Monat in der Nähe (October 14, 2025 / 30 Oktober 2025)
-        parsed = parse_date_with_month_name(snippet)
-        if _is_plausible(parsed):
-            return parsed
-
-    # 2) Fallback: irgendwo im Text numerisch
-    for raw in numeric_pattern.findall(normalized):
-        parsed = _parse_numeric(raw)
-        if _is_plausible(parsed):
-            return parsed
-
-    # 3) Fallback: ISO-Date im ganzen Text (z. B. '2025-11-05 11:16AM PST')
-    m = iso_pattern.search(normalized)
-    if m:
+def _log_import_error(payload, error, result):
+    # Handle HTTP errors - nur dieses Dokument zuruecknehmen, nicht den ganzen Batch
+    frappe.db.rollback(save_point="paperless_import")
+    result["failed"] += 1
+    frappe.log_error(f"Failed to import document {payload.get('id')} from Paperless-ngx: {error}")
+
+
+def _import_pipeline(lookups, result):
+    """Pipeline that downloads thumbnails concurrently and inserts new documents.
+
+    Each document is inserted once; the thumbnails of a batch are attached
+    together when the pipeline is drained. In "On Demand" thumbnail mode
+    nothing is downloaded, the thumbnail proxy fetches them on first view.
+    """
+    with metrics.stage("settings"):
+        client = get_client()
+        thumbnail_proxy = thumbnails_on_demand()
+        workers = cint(
+            frappe.db.get_single_value(SETTINGS_DOCTYPE, "import_workers")
+        ) or 4
+    thumbnails = []
+
+    def fetch(payload):
+        if thumbnail_proxy:
+            return None
+        with metrics.stage("thumbnail"):
+            return fetch_paperless_docthumb(payload["id"], client=client)
+
+    def write(payload, thumbnail, error):
+        frappe.db.savepoint("paperless_import")
         try:
-            parsed = frappe.utils.getdate(m.group(1))
-        except Exception:
-            parsed = None
-        if _is_plausible(parsed):
-            return parsed
+            if error:
+                raise error
+            with metrics.stage("save"):
+                new_doc = build_paperless_document(payload, lookups, thumbnail_proxy)
+                new_doc.insert()
+            if thumbnail:
+                thumbnails.append((payload["id"], new_doc.name, thumbnail))
+            result["added"] += 1
+            frappe.logger("paperless").info(f"Document added -> {payload['title']}")
+        except frappe.UniqueValidationError:
+            # ein parallel laufender Sync hat das Dokument schon angelegt
+            frappe.db.rollback(save_point="paperless_import")
+        except Exception as e:
+            _log_import_error(payload, e, result)
 
+    def flush():
+        with metrics.stage("thumbnail_attach"):
+            attach_paperless_docthumbs(thumbnails)
+        thumbnails.clear()
 
-    # 4) Fallback: ausgeschriebene Monate irgendwo im Text
-    parsed = parse_date_with_month_name(normalized)
-    if _is_plausible(parsed):
-        return parsed
+    return ImportPipeline(fetch, write, workers=workers, flush=flush)
+
+
+def get_sync_page_size(page_size=None):
+    return cint(page_size) or cint(
+        frappe.db.get_single_value(SETTINGS_DOCTYPE, "sync_page_size")
+    ) or 100
+
+
+def get_missing_document_ids(ids, chunk_size=1000):
+    """Return the Paperless IDs that have no Paperless Document yet.
+
+    The IDs are looked up in chunks on the unique paperless_document_id
+    index, so only matching index entries are read instead of the table.
+    """
+    ids = sorted(set(ids))
+    missing = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start: start + chunk_size]
+        existing = set(
+            frappe.get_all(
+                "Paperless Document",
+                filters={"paperless_document_id": ["in", chunk]},
+                pluck="paperless_document_id",
+            )
+        )
+        missing.extend(id for id in chunk if id not in existing)
+    return missing
 
-    return None
 
+def sync_document_ids(ids, page_size=None, result=None, lookups=None):
+    """Import (or update) the Paperless documents with the given IDs.
+
+    Returns the counts in `result`.
+    """
+    result = result if result is not None else {"added": 0, "updated": 0, "failed": 0}
+    lookups = lookups or SyncLookups(preload=len(ids) > 1)
+    with _import_pipeline(lookups, result) as pipeline:
+        pages = iter_paperless_documents(ids, page_size=get_sync_page_size(page_size), result=result)
+        for page in metrics.timed_iter("fetch", pages):
+            sync_document_page(page, lookups, result, pipeline)
+    lookups.record_metrics()
+    return result
 
 
 @frappe.whitelist()
-def backfill_paperless_invoice_date(limit=10000, docname=None):
-    """Setzt invoice_date für Paperless Document anhand von document_fulltext.
+def sync_documents(paperless_document=None, page_size=None, full=False):
+    """Import new and changed documents from Paperless-ngx.
 
-    - limit: Anzahl der Dokumente in einem Lauf (wird nur benutzt, wenn docname nicht gesetzt ist)
-    - docname: wenn gesetzt, wird NUR dieses eine Paperless Document verarbeitet (Debug-Helfer)
+    - paperless_document: nur dieses eine Dokument importieren/aktualisieren
+    - full: alle IDs mit Frappe abgleichen statt nur die seit dem letzten Lauf
+      geaenderten Dokumente zu holen (wird auch ohne gespeicherten Cursor gemacht)
+
+    Timings and counters of the run are collected in `metrics`.
     """
+    with metrics.collect():
+        result = _sync_documents(paperless_document, page_size, full)
+        if result:
+            count_documents(result)
+        return result
 
-    docs = []
 
-    if docname:
-        # Nur ein Dokument gezielt bearbeiten
-        row = frappe.db.get_value(
-            "Paperless Document",
-            docname,
-            ["name", "document_fulltext", "invoice_date"],
-            as_dict=True,
-        )
-        if not row:
-            return {"total": 0, "updated": 0, "skipped": 0, "info": f"{docname} nicht gefunden"}
-        docs = [row]
-    else:
-        # Alle ohne gesetztes invoice_date
-        docs = frappe.get_all(
-            "Paperless Document",
-            filters={"invoice_date": ["is", "not set"]},
-            fields=["name", "document_fulltext"],
-            limit_page_length=limit,
+def count_documents(result):
+    for key, value in result.items():
+        metrics.count(f"documents_{key}", value)
+
+
+def _sync_documents(paperless_document=None, page_size=None, full=False):
+    with metrics.stage("settings"):
+        page_size = get_sync_page_size(page_size)
+        cursor = get_sync_cursor()
+
+    if paperless_document:
+        return sync_document_ids([int(paperless_document)], page_size=page_size)
+
+    if cint(full) or not cursor:
+        with metrics.stage("ids"):
+            # Stand merken, bevor die vollstaendige Liste geholt wird
+            high_water_mark = get_paperless_high_water_mark()
+            # Get all ids from paperless
+            ids = get_paperless_ids()
+            missing = get_missing_document_ids(ids) if ids else None
+        if not ids:
+            return False
+        result = sync_document_ids(missing, page_size=page_size)
+        if not result["failed"] and high_water_mark:
+            set_sync_cursor(high_water_mark)
+        return result
+
+    result = {"added": 0, "updated": 0, "failed": 0}
+    lookups = SyncLookups()
+    with _import_pipeline(lookups, result) as pipeline:
+        pages = iter_changed_documents(cursor, page_size=page_size)
+        for page in metrics.timed_iter("fetch", pages):
+            if not sync_document_page(page, lookups, result, pipeline):
+                # Cursor nicht ueber fehlgeschlagene Dokumente hinaus schieben,
+                # der naechste Lauf versucht sie erneut
+                cursor = None
+            if cursor and page:
+                cursor = page[-1]["modified"]
+                set_sync_cursor(cursor)
+
+    lookups.record_metrics()
+    return result
+
+
+@frappe.whitelist()
+def job_status(jobid):
+    # Paperless Sync Run: Fortschritt ueber alle Shards zusammengefasst
+    if jobid and frappe.db.exists("Paperless Sync Run", jobid):
+        from frappe_goes_paperless.frappe_goes_paperless.doctype.paperless_sync_run.paperless_sync_run import (
+            get_sync_run_status,
         )
 
-    updated = 0
-    skipped = 0
+        return get_sync_run_status(jobid)
 
-    for row in docs:
-        text = row.get("document_fulltext") or ""
-        parsed = extract_invoice_date_from_text(text)
+    # Backfill-Jobs melden ihren Fortschritt zusaetzlich per Realtime
+    # (progress.publish_progress), hier nur der Status
+    return get_rq_job_status(jobid) if jobid else None
 
-        # Debug-Ausgabe in die Konsole / Log
-        print(f"[backfill] Doc {row['name']}: parsed={parsed}")
 
-        if not parsed:
-            skipped += 1
-            continue
+@frappe.whitelist()
+def backfill_paperless_invoice_date(limit=10000, docname=None, force=False):
+    """Setzt invoice_date für Paperless Document anhand von document_fulltext.
 
-        doc = frappe.get_doc("Paperless Document", row["name"])
-        doc.invoice_date = parsed
-        doc.save(ignore_permissions=True)
-        updated += 1
+    - limit: Anzahl der Dokumente in einem Lauf (wird nur benutzt, wenn docname nicht gesetzt ist)
+    - docname: wenn gesetzt, wird NUR dieses eine Paperless Document verarbeitet (Debug-Helfer)
+    - force: mit docname auch dann neu extrahieren, wenn sich weder Volltext
+      noch EXTRACTOR_VERSION geändert haben oder das Datum aus den
+      Paperless-Metadaten stammt; ein von Hand geändertes Datum bleibt wie
+      beim Batch-Lauf erhalten
 
-    frappe.db.commit()
+    Dokumente, deren Volltext und Extraktor-Version sich seit dem letzten Lauf
+    nicht geändert haben, werden übersprungen.
+    """
+
+    if docname:
+        if not frappe.db.exists("Paperless Document", docname):
+            return {"total": 0, "updated": 0, "skipped": 0, "info": f"{docname} nicht gefunden"}
+        doc = frappe.get_doc("Paperless Document", docname)
+        if not cint(force) and doc.invoice_date_source in METADATA_SOURCES + (SOURCE_MANUAL,):
+            return {"total": 1, "updated": 0, "skipped": 1, "info": f"Quelle: {doc.invoice_date_source}"}
+
+        # wie der Batch-Lauf: von Hand geaenderte Daten bleiben, auch mit force
+        if not set_invoice_date(doc, get_document_fulltext(doc), force=cint(force)):
+            return {"total": 1, "updated": 0, "skipped": 1, "info": "unveraendert"}
+        frappe.db.set_value(
+            "Paperless Document",
+            docname,
+            {field: doc.get(field) for field in INVOICE_DATE_FIELDS},
+            update_modified=False,
+        )
+        frappe.db.commit()
+        updated = 1 if doc.invoice_date_extracted else 0
+        return {"total": 1, "updated": updated, "skipped": 1 - updated}
 
+    res = run_backfill(batch_size=min(cint(limit) or DEFAULT_BATCH_SIZE, DEFAULT_BATCH_SIZE), limit=limit)
     return {
-        "total": len(docs),
-        "updated": updated,
-        "skipped": skipped,
+        "total": res["total_seen"],
+        "updated": res["total_updated"],
+        "skipped": res["total_skipped"],
     }
 
 
 @frappe.whitelist()
-def backfill_paperless_invoice_date_batch(batch_size=1000, max_batches=0):
-    """Führt backfill_paperless_invoice_date in Batches aus, bis nichts mehr übrig ist
+def backfill_paperless_invoice_date_batch(batch_size=1000, max_batches=0, processes=None):
+    """Führt den Backfill in Batches aus, bis nichts mehr übrig ist
     oder max_batches erreicht ist.
 
     - batch_size: Anzahl Dokumente pro Batch
     - max_batches: 0 = unbegrenzt, sonst Abbruch nach so vielen Batches
-    """
+    - processes: Anzahl Worker-Prozesse fürs Parsen (Standard: CPU-Kerne, max. 8)
 
-    batch_size = int(batch_size)
-    max_batches = int(max_batches or 0)
-
-    total_seen = 0
-    total_updated = 0
-    total_skipped = 0
-    batch_no = 0
-
-    while True:
-        batch_no += 1
-        res = backfill_paperless_invoice_date(limit=batch_size)
-
-        batch_total = res.get("total") or 0
-        batch_updated = res.get("updated") or 0
-        batch_skipped = res.get("skipped") or 0
+    Dokumente ohne erkennbares Datum werden markiert und erst nach einer
+    Änderung des Volltexts oder der EXTRACTOR_VERSION erneut gelesen.
+    """
 
-        total_seen += batch_total
-        total_updated += batch_updated
-        total_skipped += batch_skipped
+    return run_backfill(batch_size=batch_size, max_batches=max_batches, processes=processes)
 
-        # etwas Feedback in der Console
-        print(f"Batch {batch_no}: total={batch_total}, updated={batch_updated}, skipped={batch_skipped}")
 
-        # wenn weniger als batch_size Dokumente im Batch waren, ist nichts mehr übrig
-        if batch_total < batch_size:
-            break
+@frappe.whitelist()
+def enqueue_backfill(batch_size=1000, max_batches=0, processes=None):
+    """Run the batch backfill as background job; progress is pushed per batch.
 
-        # Sicherheitsbremse
-        if max_batches and batch_no >= max_batches:
-            break
+    Returns the job ID for `job_status` / `frappe_goes_paperless.watch_job`.
+    """
+    frappe.only_for("System Manager")
+    job_id = BACKFILL_JOB_ID
+    frappe.enqueue(
+        _run_backfill_job,
+        queue="long",
+        timeout=6 * 3600,
+        job_id=job_id,
+        deduplicate=True,
+        batch_size=batch_size,
+        max_batches=max_batches,
+        processes=processes,
+        user=frappe.session.user,
+    )
+    return job_id
 
-    return {
-        "batches": batch_no,
-        "total_seen": total_seen,
-        "total_updated": total_updated,
-        "total_skipped": total_skipped,
-    }
 
+def _run_backfill_job(batch_size=1000, max_batches=0, processes=None, user=None):
+    try:
+        return run_backfill(
+            batch_size=batch_size,
+            max_batches=max_batches,
+            processes=processes,
+            job_id=BACKFILL_JOB_ID,
+            user=user,
+        )
+    except Exception:
+        frappe.db.rollback()
+        publish_progress(BACKFILL_JOB_ID, {"status": "failed"}, user=user)
+        frappe.db.commit()
+        raise
@@ -0,0 +1,114 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import hmac
+import re
+
+import frappe
+from frappe.utils import cint
+from frappe.utils.password import get_decrypted_password
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE
+from frappe_goes_paperless.frappe_goes_paperless.tools import sync_documents
+
+# Redis-Key mit dem Import-Zustand eines Dokuments: fehlt = kein Job,
+# RUNNING = Job importiert, PENDING = Event, das noch nicht importiert ist
+STATE_KEY = "paperless_webhook_state::{}"
+STATE_TTL = 3600
+RUNNING = "running"
+PENDING = "pending"
+# Zustand nur loeschen, wenn er noch RUNNING ist (atomar)
+_RELEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_DOC_URL_ID = re.compile(r"/documents/(\d+)")
+
+
+def get_webhook_token():
+    return get_decrypted_password(SETTINGS_DOCTYPE, SETTINGS_DOCTYPE, "webhook_token", raise_exception=False)
+
+
+def _request_token():
+    auth = frappe.get_request_header("Authorization") or ""
+    if auth.lower().startswith("bearer "):
+        return auth[7:].strip()
+    return frappe.get_request_header("X-Paperless-Token") or frappe.form_dict.get("token")
+
+
+def parse_document_id(data):
+    """Read the document ID from a webhook payload.
+
+    Accepts `document_id`, `doc_id` or `id`, or takes it from `doc_url`
+    (the URL placeholder Paperless workflows offer).
+    """
+    for key in ("document_id", "doc_id", "id"):
+        if cint(data.get(key)) > 0:
+            return cint(data.get(key))
+    match = _DOC_URL_ID.search(str(data.get("doc_url") or ""))
+    return int(match.group(1)) if match else None
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def document_event(**kwargs):
+    """Webhook for Paperless-ngx workflows (document added / updated).
+
+    Authenticated with the webhook token from the settings, sent as
+    `Authorization: Bearer <token>`, `X-Paperless-Token` header or `token`
+    parameter. Queues an import of the single document; events for a
+    document that is queued or being imported are merged into that job.
+    """
+    expected = get_webhook_token()
+    given = _request_token() or ""
+    if not expected or not hmac.compare_digest(given.encode(), expected.encode()):
+        raise frappe.AuthenticationError
+
+    document_id = parse_document_id(frappe.form_dict)
+    if not document_id:
+        frappe.throw("No document ID in webhook payload", frappe.ValidationError)
+
+    enqueue_document_import(document_id)
+    return {"queued": document_id}
+
+
+def _state_key(document_id):
+    return frappe.cache().make_key(STATE_KEY.format(document_id))
+
+
+def enqueue_document_import(document_id):
+    """Queue an import of the document unless one is queued or running.
+
+    The state key is set to `pending` atomically; only the event that finds
+    no state starts a job. A running job sees `pending` and imports again.
+    """
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.getset(_state_key(document_id), PENDING)
+    pipe.expire(_state_key(document_id), STATE_TTL)
+    if pipe.execute()[0] is None:
+        # kein Job fuer das Dokument. Ohne job_id/deduplicate: ein gerade
+        # endender Job steht in RQ noch auf "started"
+        frappe.enqueue(import_document, queue="short", document_id=document_id)
+
+
+def import_document(document_id):
+    """Background job: import one document as long as new events arrive for it."""
+    # der Webhook kommt als Guest
+    frappe.set_user("Administrator")
+    cache = frappe.cache()
+    key = _state_key(document_id)
+    try:
+        while True:
+            # Events ab hier landen im naechsten Durchlauf
+            cache.set(key, RUNNING, ex=STATE_TTL)
+            sync_documents(paperless_document=document_id)
+            # nur freigeben, wenn waehrenddessen kein Event kam
+            if cache.eval(_RELEASE, 1, key, RUNNING):
+                return
+    except Exception:
+        # naechstes Event startet einen neuen Job
+        cache.delete(key)
+        raise
@@ -0,0 +1,201 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+"""Write the processing state of Paperless Documents back to Paperless-ngx.
+
+Status changes and links to Frappe documents are queued per Paperless
+document ID in a Redis hash (a later change of the same document replaces
+the earlier one) and pushed by `flush_writeback` through
+`documents/bulk_edit/`: one request per status tag and per linked doctype
+for up to `BULK_SIZE` documents, instead of one PATCH per document.
+
+In Paperless the status becomes a tag (`Frappe: Workflow Successful`, the
+tags of the other states are removed) and the doctype of the linked Frappe
+document the value of the custom field `Frappe Document Type`. The name of
+the linked document is not written back: it differs per document, so it
+would need one request per document.
+"""
+
+import json
+
+import frappe
+from frappe.utils import cint
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE, get_client
+
+DOCTYPE = "Paperless Document"
+QUEUE_KEY = "paperless_writeback"
+# Dokumente pro bulk_edit-Request
+BULK_SIZE = 500
+DEFAULT_TAG_PREFIX = "Frappe: "
+LINK_FIELD = "Frappe Document Type"
+
+
+def writeback_enabled():
+    return cint(frappe.db.get_single_value(SETTINGS_DOCTYPE, "writeback_enabled"))
+
+
+def on_document_update(doc, method=None):
+    """doc_event for Paperless Document: queue status and link changes."""
+    # negative IDs sind Platzhalter aus der Migration, nicht in Paperless vorhanden
+    if cint(doc.paperless_document_id) <= 0 or not writeback_enabled():
+        return
+    # frisch importierte Dokumente haben noch keinen Bearbeitungsstand
+    if doc.get_doc_before_save() is None:
+        return
+    if not (
+        doc.has_value_changed("status")
+        or doc.has_value_changed("frappe_document")
+        or doc.has_value_changed("frappe_doctype")
+    ):
+        return
+    queue_writeback(
+        doc.paperless_document_id,
+        doc.status,
+        doc.frappe_doctype if doc.frappe_document else None,
+    )
+
+
+def queue_writeback(paperless_document_id, status, linked_doctype=None):
+    cache = frappe.cache()
+    key = cache.make_key(QUEUE_KEY)
+    state = json.dumps({"status": status, "doctype": linked_doctype})
+    # roh schreiben, flush liest den Hash in einer Transaktion
+    pipe = cache.pipeline()
+    pipe.hset(key, str(paperless_document_id), state)
+    pipe.hlen(key)
+    queued = pipe.execute()[1]
+    if queued >= BULK_SIZE:
+        # voller Batch -> nicht auf den Timer warten
+        frappe.enqueue(
+            flush_writeback,
+            queue="short",
+            job_id="paperless_writeback",
+            deduplicate=True,
+            enqueue_after_commit=True,
+        )
+
+
+def _take_queue():
+    cache = frappe.cache()
+    key = cache.make_key(QUEUE_KEY)
+    pipe = cache.pipeline()
+    pipe.hgetall(key)
+    pipe.delete(key)
+    entries = pipe.execute()[0] or {}
+    return {
+        int(id.decode() if isinstance(id, bytes) else id): json.loads(state)
+        for id, state in entries.items()
+    }
+
+
+def _requeue(states):
+    # fehlgeschlagene Eintraege zurueck, neuere Aenderungen nicht ueberschreiben
+    cache = frappe.cache()
+    key = cache.make_key(QUEUE_KEY)
+    pipe = cache.pipeline()
+    for id, state in states.items():
+        pipe.hsetnx(key, str(id), json.dumps(state))
+    pipe.execute()
+
+
+def plan_bulk_edits(states, tag_ids, link_field_id):
+    """Group queued states into bulk_edit payloads.
+
+    `tag_ids` maps every status to its tag ID. Returns a list of
+    `(document_ids, payload)`, at most `BULK_SIZE` documents each.
+    """
+    by_status = {}
+    by_doctype = {}
+    for id, state in sorted(states.items()):
+        if state["status"] in tag_ids:
+            by_status.setdefault(state["status"], []).append(id)
+        by_doctype.setdefault(state.get("doctype"), []).append(id)
+
+    edits = []
+    for status, ids in by_status.items():
+        parameters = {
+            "add_tags": [tag_ids[status]],
+            "remove_tags": [tag for other, tag in tag_ids.items() if other != status],
+        }
+        edits += _chunked(ids, "modify_tags", parameters)
+    for doctype, ids in by_doctype.items():
+        if doctype:
+            parameters = {"add_custom_fields": {str(link_field_id): doctype}, "remove_custom_fields": []}
+        else:
+            parameters = {"add_custom_fields": {}, "remove_custom_fields": [link_field_id]}
+        edits += _chunked(ids, "modify_custom_fields", parameters)
+    return edits
+
+
+def _chunked(ids, method, parameters):
+    return [
+        (ids[i: i + BULK_SIZE], {"documents": ids[i: i + BULK_SIZE], "method": method, "parameters": parameters})
+        for i in range(0, len(ids), BULK_SIZE)
+    ]
+
+
+def _status_options():
+    options = frappe.get_meta(DOCTYPE).get_field("status").options or ""
+    return [o for o in options.split("\n") if o]
+
+
+def _ensure(client, place, names, params, **values):
+    """IDs of the tags/custom fields with the given names, created if missing.
+
+    `params` filters the list request down to the candidates.
+    """
+    ids = {}
+    for entry in client.iter_results(f"{place}/", params=params, page_size=100):
+        if entry["name"] in names:
+            ids[entry["name"]] = entry["id"]
+    for name in names:
+        if name not in ids:
+            response = client.post(f"{place}/", json={"name": name, **values})
+            response.raise_for_status()
+            ids[name] = response.json()["id"]
+    return ids
+
+
+def flush_writeback():
+    """Scheduler job: push all queued states to Paperless-ngx."""
+    if not writeback_enabled():
+        return None
+    states = _take_queue()
+    if not states:
+        return None
+
+    failed = {}
+    sent = 0
+    try:
+        client = get_client()
+        prefix = frappe.db.get_single_value(SETTINGS_DOCTYPE, "writeback_tag_prefix") or DEFAULT_TAG_PREFIX
+        statuses = _status_options()
+        tags = _ensure(
+            client,
+            "tags",
+            [prefix + s for s in statuses],
+            {"name__istartswith": prefix},
+            matching_algorithm=0,
+        )
+        tag_ids = {s: tags[prefix + s] for s in statuses}
+        link_field_id = _ensure(
+            client, "custom_fields", [LINK_FIELD], {"name__iexact": LINK_FIELD}, data_type="string"
+        )[LINK_FIELD]
+    except Exception:
+        _requeue(states)
+        raise
+
+    for ids, payload in plan_bulk_edits(states, tag_ids, link_field_id):
+        try:
+            response = client.post("documents/bulk_edit/", json=payload)
+            response.raise_for_status()
+            sent += 1
+        except Exception as e:
+            for id in ids:
+                failed[id] = states[id]
+            frappe.log_error(f"Paperless write-back of {len(ids)} documents failed", str(e))
+
+    if failed:
+        _requeue(failed)
+    return {"documents": len(states), "requests": sent, "failed": len(failed)}
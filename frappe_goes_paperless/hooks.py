@@ -12,6 +12,7 @@ app_license = "gpl-3.0"
 # include js, css files in header of desk.html
 # app_include_css = "/assets/frappe_goes_paperless/css/frappe_goes_paperless.css"
 # app_include_js = "/assets/frappe_goes_paperless/js/frappe_goes_paperless.js"
+app_include_js = "/assets/frappe_goes_paperless/js/paperless_jobs.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/frappe_goes_paperless/css/frappe_goes_paperless.css"
@@ -64,11 +65,16 @@ app_license = "gpl-3.0"
 # 	"filters": "frappe_goes_paperless.utils.jinja_filters"
 # }
 
+# Session
+# -------
+
+boot_session = "frappe_goes_paperless.frappe_goes_paperless.boot.boot_session"
+
 # Installation
 # ------------
 
 # before_install = "frappe_goes_paperless.install.before_install"
-# after_install = "frappe_goes_paperless.install.after_install"
+after_install = "frappe_goes_paperless.frappe_goes_paperless.search.ensure_fulltext_index"
 
 # Uninstallation
 # ------------
@@ -76,6 +82,15 @@ app_license = "gpl-3.0"
 # before_uninstall = "frappe_goes_paperless.uninstall.before_uninstall"
 # after_uninstall = "frappe_goes_paperless.uninstall.after_uninstall"
 
+# Migration
+# ---------
+
+after_migrate = [
+	"frappe_goes_paperless.frappe_goes_paperless.search.ensure_fulltext_index",
+	# installierte Integrationen koennen sich geaendert haben
+	"frappe_goes_paperless.frappe_goes_paperless.boot.clear_boot_config",
+]
+
 # Integration Setup
 # ------------------
 # To set up dependencies/integrations with other apps
@@ -130,6 +145,24 @@ app_license = "gpl-3.0"
 # 	}
 # }
 
+doc_events = {
+	"Customer": {
+		"on_update": "frappe_goes_paperless.frappe_goes_paperless.correspondents.on_party_update",
+		"after_rename": "frappe_goes_paperless.frappe_goes_paperless.correspondents.on_party_update",
+	},
+	"Supplier": {
+		"on_update": "frappe_goes_paperless.frappe_goes_paperless.correspondents.on_party_update",
+		"after_rename": "frappe_goes_paperless.frappe_goes_paperless.correspondents.on_party_update",
+	},
+	"Paperless Document": {
+		"on_update": "frappe_goes_paperless.frappe_goes_paperless.writeback.on_document_update",
+	},
+	# Standard-KI fuer den "Query AI"-Dialog (ai_workflows)
+	"AI Settings": {
+		"on_update": "frappe_goes_paperless.frappe_goes_paperless.boot.clear_boot_config",
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -151,6 +184,19 @@ app_license = "gpl-3.0"
 # 	],
 # }
 
+scheduler_events = {
+	"cron": {
+		# checks the "Automatic Sync" settings, the interval is configured there
+		"*/5 * * * *": [
+			"frappe_goes_paperless.frappe_goes_paperless.doctype.paperless_sync_run.paperless_sync_run.scheduled_sync"
+		],
+		# gesammelte Status-Aenderungen per bulk_edit an Paperless
+		"* * * * *": [
+			"frappe_goes_paperless.frappe_goes_paperless.writeback.flush_writeback"
+		],
+	},
+}
+
 # Testing
 # -------
 
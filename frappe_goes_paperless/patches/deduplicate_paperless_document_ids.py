@@ -0,0 +1,90 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def plan_deduplication(rows):
+    """Decide what happens to each Paperless Document before the ID becomes unique.
+
+    `rows` are `name, paperless_document_id, frappe_document` in creation
+    order. Of several documents with the same ID the one linked to a Frappe
+    document is kept, otherwise the oldest. Returns `(normalize, quarantine,
+    conflicts)`: the IDs to write back as clean integers (`{name: id}`), the
+    documents that get a negative placeholder ID (`[(name, old_id)]`, invalid
+    IDs and unlinked duplicates) and the IDs with more than one linked
+    document (`{id: [names]}`), which have to be resolved by hand.
+    """
+    kept = {}
+    quarantine = []
+    linked = {}
+    for row in rows:
+        raw = str(row.paperless_document_id or "").strip()
+        if not raw.isdigit() or int(raw) <= 0:
+            quarantine.append((row.name, row.paperless_document_id))
+            continue
+
+        id = int(raw)
+        if row.frappe_document:
+            linked.setdefault(id, []).append(row.name)
+        other = kept.get(id)
+        if other is None:
+            kept[id] = row
+        elif row.frappe_document and not other.frappe_document:
+            quarantine.append((other.name, other.paperless_document_id))
+            kept[id] = row
+        else:
+            quarantine.append((row.name, row.paperless_document_id))
+
+    conflicts = {id: names for id, names in linked.items() if len(names) > 1}
+    # Leerzeichen o.ae. entfernen, damit die Spalte verlustfrei umgewandelt wird
+    normalize = {row.name: id for id, row in kept.items() if row.paperless_document_id != str(id)}
+    return normalize, quarantine, conflicts
+
+
+def execute():
+    """Prepare Paperless Document for the unique integer paperless_document_id.
+
+    Runs before the column is converted. No document is deleted: documents
+    without a numeric ID and duplicates get a negative placeholder ID, which
+    the sync never matches. Several documents with the same ID that are all
+    linked to Frappe documents stop the migration until they are resolved.
+    """
+    if not frappe.db.table_exists("Paperless Document"):
+        return
+
+    rows = frappe.db.sql(
+        """
+        select name, paperless_document_id, frappe_document
+        from `tabPaperless Document`
+        order by creation asc
+        """,
+        as_dict=True,
+    )
+    normalize, quarantine, conflicts = plan_deduplication(rows)
+
+    if conflicts:
+        report = "\n".join(f"{id}: {', '.join(names)}" for id, names in sorted(conflicts.items()))
+        raise frappe.ValidationError(
+            "Several Paperless Documents with the same Paperless ID are linked to Frappe documents. "
+            "Keep one per ID (delete the others or clear their Paperless Document ID) "
+            "and run the migration again:\n" + report
+        )
+
+    for name, id in normalize.items():
+        frappe.db.set_value(
+            "Paperless Document", name, "paperless_document_id", id, update_modified=False
+        )
+    for placeholder, (name, _old_id) in enumerate(quarantine, 1):
+        frappe.db.set_value(
+            "Paperless Document", name, "paperless_document_id", -placeholder, update_modified=False
+        )
+
+    if quarantine:
+        frappe.log_error(
+            "Paperless Document IDs quarantined",
+            "Invalid or duplicate paperless_document_id replaced by a negative placeholder "
+            "before making it unique (name: old ID -> placeholder):\n"
+            + "\n".join(f"{name}: {old_id!r} -> {-i}" for i, (name, old_id) in enumerate(quarantine, 1)),
+        )
+    frappe.db.commit()
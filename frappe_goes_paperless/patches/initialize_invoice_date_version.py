@@ -0,0 +1,22 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+    """Keep the invoice dates that were already extracted.
+
+    Documents checked before the extraction results were versioned count as
+    extracted with version 1 from their current fulltext, so the next backfill
+    does not parse them again. Unchecked documents stay at version 0.
+    """
+    frappe.db.sql(
+        """
+        update `tabPaperless Document`
+        set invoice_date_extracted = invoice_date,
+            invoice_date_hash = fulltext_hash,
+            invoice_date_version = 1
+        where invoice_date_checked = 1 and invoice_date_version = 0
+        """
+    )
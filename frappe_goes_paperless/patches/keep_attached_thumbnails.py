@@ -0,0 +1,19 @@
+# Copyright (c) 2024, itsdave GmbH and contributors
+# For license information, please see license.txt
+
+import frappe
+
+from frappe_goes_paperless.frappe_goes_paperless.client import SETTINGS_DOCTYPE
+
+
+def execute():
+    """Keep storing thumbnails as File on sites that already imported documents.
+
+    New installations load thumbnails on demand. Existing ones keep the old
+    behaviour until an administrator changes the Thumbnail Mode.
+    """
+    if frappe.db.get_single_value(SETTINGS_DOCTYPE, "thumbnail_mode"):
+        return
+    if not frappe.db.count("Paperless Document"):
+        return
+    frappe.db.set_single_value(SETTINGS_DOCTYPE, "thumbnail_mode", "Attach File")
@@ -0,0 +1,61 @@
+frappe.provide("frappe_goes_paperless");
+
+// Hintergrund-Jobs (Sync Runs, Backfill) melden ihren Fortschritt per Realtime
+// (progress.py). job_status wird nur beim Start und als Rueckfall abgefragt,
+// z.B. fuer Jobs anderer Apps, die keine Events senden.
+frappe_goes_paperless.JOB_EVENT = "paperless_job_progress";
+frappe_goes_paperless.JOB_FALLBACK_INTERVAL = 30000;
+// "unknown": job_status kennt den Job nicht (mehr), z.B. abgelaufener RQ-Job
+frappe_goes_paperless.JOB_DONE_STATES = ["finished", "failed", "unknown"];
+
+frappe_goes_paperless.is_job_done = function (job) {
+    return frappe_goes_paperless.JOB_DONE_STATES.includes(job.status);
+};
+
+frappe_goes_paperless.watch_job = function (job_id, on_update) {
+    let done = false;
+    let timer = null;
+
+    const handle = function (job) {
+        if (done || !job) {
+            return;
+        }
+        // RQ-Jobs liefern nur den Status als String
+        job = typeof job === "object" ? job : { status: job };
+        on_update(job);
+        if (frappe_goes_paperless.is_job_done(job)) {
+            stop();
+        } else {
+            schedule();
+        }
+    };
+    const listener = function (data) {
+        if (data.job_id === job_id) {
+            handle(data);
+        }
+    };
+    const check = function () {
+        frappe.call({
+            method: "frappe_goes_paperless.frappe_goes_paperless.tools.job_status",
+            args: { jobid: job_id },
+            callback: function (r) {
+                // ohne Antwort nicht weiter warten, sonst bleibt die Anzeige auf "laeuft"
+                handle(r.message || { status: "unknown" });
+            }
+        });
+    };
+    const schedule = function () {
+        clearTimeout(timer);
+        timer = setTimeout(check, frappe_goes_paperless.JOB_FALLBACK_INTERVAL);
+    };
+    const stop = function () {
+        done = true;
+        clearTimeout(timer);
+        frappe.realtime.off(frappe_goes_paperless.JOB_EVENT, listener);
+    };
+
+    frappe.realtime.on(frappe_goes_paperless.JOB_EVENT, listener);
+    // falls der Job schon vor dem Abonnieren fertig war
+    check();
+    return stop;
+};